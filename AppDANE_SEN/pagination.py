@@ -0,0 +1,92 @@
+"""
+Paginación de los listados de la API.
+
+`CreatedAtCursorPagination` pagina por cursor sobre `(created_at, id)`: cada página se obtiene
+filtrando desde el `created_at` de la última fila vista, sin `COUNT(*)`, así que su costo no
+depende de la profundidad de la página. El cursor solo guarda un desplazamiento cuando varias
+filas comparten `created_at`, y este se limita a esas filas. Los modelos paginados tienen un
+índice sobre `(created_at, id)`.
+
+Donde la paginación por número de página es inevitable (listados del admin y clientes
+antiguos), `ApproximateCountPaginator` evita el `COUNT(*)` exacto sobre tablas grandes: si el
+listado no tiene filtros y la estadística de la tabla supera `APPROXIMATE_COUNT_THRESHOLD`
+filas, usa esa estimación como total.
+"""
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+DEFAULT_APPROXIMATE_COUNT_THRESHOLD = 100000
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Listados del más reciente al más antiguo. `?page_size=` permite pedir páginas de hasta
+    `API_MAX_PAGE_SIZE` elementos.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        # Se leen en cada petición para respetar cambios de configuración (y `override_settings`)
+        self.page_size = settings.API_PAGE_SIZE
+        self.max_page_size = settings.API_MAX_PAGE_SIZE
+        return super().get_page_size(request)
+
+
+# Consulta de la estimación de filas de una tabla por motor; recibe el nombre de la tabla.
+# En MySQL (InnoDB) `TABLE_ROWS` es la estimación que mantiene el motor, no un conteo.
+ROW_ESTIMATE_QUERIES = {
+    'mysql': (
+        "SELECT TABLE_ROWS FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+    ),
+    'postgresql': "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+}
+
+
+def estimated_row_count(model, using='default'):
+    """
+    Filas de la tabla del modelo según las estadísticas del motor (`ROW_ESTIMATE_QUERIES`),
+    o `None` si el motor no las ofrece o la tabla aún no tiene estadística.
+    """
+    connection = connections[using]
+    sql = ROW_ESTIMATE_QUERIES.get(connection.vendor)
+    if sql is None:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [model._meta.db_table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    `Paginator` que toma el total de las estadísticas de la tabla cuando el listado no está
+    filtrado y la tabla supera el umbral; en otro caso cuenta exacto. Con el total estimado la
+    última página puede quedar vacía o faltar, a cambio de no recorrer la tabla en cada carga.
+    En el admin se usa con `show_full_result_count=False`, que evita el segundo `COUNT(*)`
+    (el total sin filtros que muestra el listado).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.has_filters() and not queryset.query.is_sliced:
+            threshold = getattr(settings, 'APPROXIMATE_COUNT_THRESHOLD', DEFAULT_APPROXIMATE_COUNT_THRESHOLD)
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > threshold:
+                return estimate
+        return super().count
+
+
+class ApproximateCountPageNumberPagination(PageNumberPagination):
+    """
+    Paginación por número de página de DRF con el total de `ApproximateCountPaginator`.
+    """
+    django_paginator_class = ApproximateCountPaginator
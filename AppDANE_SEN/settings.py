@@ -101,12 +101,18 @@ CORS_ALLOW_HEADERS = [
     'content-type',
     'authorization',
     'x-csrftoken',
+    'idempotency-key',
+]
+
+CORS_EXPOSE_HEADERS = [
+    'idempotent-replayed',
 ]
 
 CORS_ALLOW_METHODS = [
     "GET",
     "POST",
     "PUT",
+    "PATCH",
     "DELETE",
     "OPTIONS",
 ]
@@ -159,7 +165,7 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'AppDANE_SEN.pagination.ApproximateCountPageNumberPagination',
 }
 
 SIMPLE_JWT = {
@@ -171,3 +177,43 @@ SIMPLE_JWT = {
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+
+# Tiempo máximo (segundos) que cada proceso conserva la definición compilada de una encuesta
+SURVEY_SCHEMA_TTL = config('SURVEY_SCHEMA_TTL', default=300, cast=int)
+
+# Tiempo (segundos) que se conserva en caché el documento renderizado de cada versión de una encuesta
+SURVEY_DOCUMENT_CACHE_TIMEOUT = config('SURVEY_DOCUMENT_CACHE_TIMEOUT', default=86400, cast=int)
+
+# Tiempo (segundos) que se conservan en caché los catálogos geográficos compartidos
+GEO_CATALOG_CACHE_TIMEOUT = config('GEO_CATALOG_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Tiempo máximo (segundos) que cada proceso conserva el nomenclátor geográfico en memoria
+GEO_GAZETTEER_TTL = config('GEO_GAZETTEER_TTL', default=3600, cast=int)
+
+# Filas que se leen por lote de la base de datos durante las exportaciones
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Exportaciones asíncronas: directorio de archivos generados, horas que se conservan y
+# segundos de espera del worker cuando la cola está vacía
+EXPORT_SPOOL_DIR = config('EXPORT_SPOOL_DIR', default=os.path.join(BASE_DIR, 'export_spool'))
+EXPORT_RETENTION_HOURS = config('EXPORT_RETENTION_HOURS', default=24, cast=int)
+EXPORT_WORKER_POLL_INTERVAL = config('EXPORT_WORKER_POLL_INTERVAL', default=5, cast=float)
+
+# Tiempo (segundos) que se conservan en caché las tabulaciones (frecuencias y tablas cruzadas)
+TABULATION_CACHE_TIMEOUT = config('TABULATION_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Resultados de envíos idempotentes que cada proceso conserva en memoria (LRU)
+IDEMPOTENCY_CACHE_SIZE = config('IDEMPOTENCY_CACHE_SIZE', default=1024, cast=int)
+
+# Máximo de intentos que se aceptan en un envío por lotes (`submit-response/batch/`)
+SUBMIT_BATCH_MAX_ATTEMPTS = config('SUBMIT_BATCH_MAX_ATTEMPTS', default=500, cast=int)
+
+# Margen (segundos) antes de la hora actual con que termina cada sincronización incremental de definiciones
+DEFINITION_SYNC_LAG = config('DEFINITION_SYNC_LAG', default=5, cast=int)
+
+# Tamaño por defecto y máximo (`?page_size=`) de las páginas de los listados paginados por cursor
+API_PAGE_SIZE = config('API_PAGE_SIZE', default=100, cast=int)
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=1000, cast=int)
+
+# Filas a partir de las cuales los listados sin filtros por número de página (admin, API) usan el total estimado
+APPROXIMATE_COUNT_THRESHOLD = config('APPROXIMATE_COUNT_THRESHOLD', default=100000, cast=int)
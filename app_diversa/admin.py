@@ -1,11 +1,14 @@
 from django.contrib import admin
-from .models import SurveyAttempt, Survey, Chapter, Question, SubQuestion, Option, SurveyText, Response, SystemMessage
+from AppDANE_SEN.pagination import ApproximateCountPaginator
+from .models import SurveyAttempt, Survey, Chapter, Question, SubQuestion, Option, SurveyText, Response, SystemMessage, ExportJob, EligibilityRule, ArchivedResponse
 
 @admin.register(SurveyAttempt)
 class SurveyAttemptAdmin(admin.ModelAdmin):
-    list_display = ('user', 'survey', 'has_lived_in_colombia', 'birth_date', 'rejection_note', 'success_note', 'created_at')
+    list_display = ('user', 'survey', 'status', 'has_lived_in_colombia', 'birth_date', 'rejection_note', 'success_note', 'created_at')
     search_fields = ('user__email', 'survey__name', 'rejection_note', 'success_note')
-    list_filter = ('created_at', 'has_lived_in_colombia', 'birth_date')
+    list_filter = ('status', 'created_at', 'has_lived_in_colombia', 'birth_date')
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
 
 @admin.register(Survey)
 class SurveyAdmin(admin.ModelAdmin):
@@ -123,4 +126,47 @@ class ResponseAdmin(admin.ModelAdmin):
     )
     list_filter = ('created_at', 'department', 'municipality')
     ordering = ('-created_at',)
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
 
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    """
+    Seguimiento de las exportaciones asíncronas (ExportJob).
+    """
+    list_display = (
+        'id', 'user', 'export_format', 'layout', 'survey', 'status', 'row_count', 'size_bytes',
+        'elapsed_seconds', 'created_at', 'expires_at'
+    )
+    list_filter = ('status', 'export_format', 'layout', 'created_at')
+    readonly_fields = (
+        'file_path', 'row_count', 'size_bytes', 'elapsed_seconds', 'error', 'created_at', 'started_at',
+        'finished_at', 'expires_at'
+    )
+    ordering = ('-created_at',)
+
+
+@admin.register(EligibilityRule)
+class EligibilityRuleAdmin(admin.ModelAdmin):
+    """
+    Configuración de las reglas de elegibilidad (EligibilityRule) de cada encuesta.
+    """
+    list_display = ('survey', 'order', 'rule_type', 'question', 'option', 'min_age', 'is_active')
+    list_filter = ('survey', 'rule_type', 'is_active')
+    raw_id_fields = ('question', 'option')
+    ordering = ('survey', 'order', 'id')
+
+
+@admin.register(ArchivedResponse)
+class ArchivedResponseAdmin(admin.ModelAdmin):
+    """
+    Respuestas duplicadas retiradas al crear la llave única de `Response` (solo lectura).
+    """
+    list_display = ('response_id', 'survey_attempt_id', 'question_id', 'subquestion_key', 'kept_response_id', 'archived_at')
+    search_fields = ('=survey_attempt_id', '=response_id')
+    readonly_fields = ('response_id', 'survey_attempt_id', 'question_id', 'subquestion_key', 'kept_response_id', 'data', 'archived_at')
+
+    def has_add_permission(self, request):
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AppDiversaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_diversa'
+
+    def ready(self):
+        # Registra los receptores de señales del módulo `signals`
+        from . import signals  # noqa: F401
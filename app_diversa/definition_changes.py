@@ -0,0 +1,100 @@
+"""
+Sincronización incremental de la definición de una encuesta para los clientes móviles.
+
+La versión es la hora de la última modificación, en microsegundos desde 1970 (UTC). Con
+`since_version`, `definition_changes` devuelve las filas de capítulos, preguntas, subpreguntas,
+opciones y textos con `updated_at` posterior, más los ids eliminados registrados en
+`DefinitionTombstone`. Las filas van planas (sin anidar) y con sus llaves foráneas.
+
+La ventana de cada consulta termina `DEFINITION_SYNC_LAG` segundos antes de la hora actual:
+una fila guardada por una transacción aún abierta tiene `updated_at` anterior a su confirmación,
+y sin ese margen un cliente podría avanzar su versión y no recibirla nunca.
+"""
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.db.models import Q
+from django.utils.timezone import now
+from .models import Chapter, DefinitionTombstone, Option, Question, SubQuestion, SurveyText
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+DEFAULT_DEFINITION_SYNC_LAG = 5
+
+# Nombre en el documento de cambios -> (modelo, filtro por encuesta)
+DEFINITION_FEEDS = {
+    'chapters': (Chapter, lambda survey_id: Q(survey_id=survey_id)),
+    'questions': (Question, lambda survey_id: Q(survey_id=survey_id)),
+    'subquestions': (SubQuestion, lambda survey_id: Q(parent_question__survey_id=survey_id)),
+    'options': (Option, lambda survey_id: (
+        Q(question__survey_id=survey_id) | Q(subquestion__parent_question__survey_id=survey_id)
+    )),
+    'texts': (SurveyText, lambda survey_id: Q(survey_id=survey_id)),
+}
+
+
+def feed_name(model):
+    """
+    Nombre del tipo de elemento en el documento de cambios, o `None` si el modelo no se sincroniza.
+    """
+    return next((name for name, (feed_model, _) in DEFINITION_FEEDS.items() if feed_model is model), None)
+
+
+def version_from_datetime(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def datetime_from_version(version):
+    return EPOCH + timedelta(microseconds=version)
+
+
+def parse_version(value):
+    """
+    Convierte el parámetro `since_version` a entero; lanza `ValueError` si no es válido.
+    """
+    try:
+        version = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("`since_version` debe ser un entero (microsegundos).")
+    if version < 0:
+        raise ValueError("`since_version` debe ser un entero (microsegundos).")
+    return version
+
+
+def _field_names(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def definition_changes(survey_id, since_version=0):
+    """
+    Documento con los elementos de la encuesta modificados (`changed`) y eliminados (`deleted`)
+    entre `since_version` y la versión devuelta en `version`, que el cliente envía en la
+    siguiente sincronización. `since_version=0` devuelve la definición completa.
+    """
+    lag = getattr(settings, 'DEFINITION_SYNC_LAG', DEFAULT_DEFINITION_SYNC_LAG)
+    until = now() - timedelta(seconds=lag)
+    version = max(since_version, version_from_datetime(until))
+    window = dict(gt=datetime_from_version(since_version), lte=datetime_from_version(version))
+
+    changed = {
+        name: list(
+            model.objects.filter(survey_filter(survey_id), updated_at__gt=window['gt'], updated_at__lte=window['lte'])
+            .order_by('id').values(*_field_names(model))
+        )
+        for name, (model, survey_filter) in DEFINITION_FEEDS.items()
+    }
+
+    deleted = {name: [] for name in DEFINITION_FEEDS}
+    if since_version:
+        tombstones = DefinitionTombstone.objects.filter(
+            survey_id=survey_id, deleted_at__gt=window['gt'], deleted_at__lte=window['lte']
+        ).order_by('id').values_list('model_name', 'object_id')
+        for name, object_id in tombstones:
+            deleted[name].append(object_id)
+
+    return {
+        "survey_id": survey_id,
+        "since_version": since_version,
+        "version": version,
+        "changed": changed,
+        "deleted": deleted,
+    }
@@ -0,0 +1,106 @@
+"""
+Evaluación de las reglas de elegibilidad (`EligibilityRule`) de una encuesta.
+
+Las reglas llegan ya compiladas en el `SurveySchema`, así que el tamizaje de un envío se
+resuelve en memoria y antes de cualquier escritura. Las reglas se evalúan en orden y la
+primera que no se cumple rechaza al participante.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime
+from .models import EligibilityRule
+
+
+class EligibilityError(Exception):
+    """
+    La respuesta a una pregunta de tamizaje falta o es inválida.
+    `payload` y `status` son el cuerpo y el código HTTP que se devuelven al cliente.
+    """
+
+    def __init__(self, payload, status):
+        super().__init__(next(iter(payload.values())))
+        self.payload = payload
+        self.status = status
+
+
+@dataclass(frozen=True)
+class EligibilityResult:
+    rejected_by: object = None
+    birth_date: date = None
+    age: int = None
+
+    @property
+    def is_eligible(self):
+        return self.rejected_by is None
+
+    def attempt_fields(self):
+        """
+        Campos de tamizaje del `SurveyAttempt` a registrar. `has_lived_in_colombia` solo es
+        falso cuando el rechazo vino de una regla de opción (la residencia del tamizaje original).
+        """
+        fields = {
+            "has_lived_in_colombia": (
+                self.rejected_by is None or self.rejected_by.rule_type != EligibilityRule.RULE_REJECT_OPTION
+            ),
+            "birth_date": self.birth_date,
+        }
+        if self.rejected_by is not None:
+            fields["rejection_note"] = self.rejected_by.rejection_note.replace("{age}", str(self.age))
+        return fields
+
+
+def calculate_age(birth_date, today):
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+
+def _check_reject_option(rule, answer, schema, today):
+    option_id = answer.get("option_selected")
+    if not option_id:
+        raise EligibilityError({"error": "Debe seleccionar una opción válida."}, 400)
+    if option_id not in schema.options:
+        raise EligibilityError({"error": f"La opción con ID {option_id} no existe."}, 404)
+    return option_id != rule.option_id, {}
+
+
+def _check_min_age(rule, answer, schema, today):
+    try:
+        birth_date = datetime.strptime(answer.get("answer") or "", "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise EligibilityError({"error": "Formato de fecha inválido. Debe ser YYYY-MM-DD."}, 400)
+    if birth_date > today:
+        raise EligibilityError({"error": "Fecha futura inválida, seleccione una fecha de nacimiento correcta."}, 400)
+    age = calculate_age(birth_date, today)
+    return age >= rule.min_age, {"birth_date": birth_date, "age": age}
+
+
+RULE_CHECKS = {
+    EligibilityRule.RULE_REJECT_OPTION: _check_reject_option,
+    EligibilityRule.RULE_MIN_AGE: _check_min_age,
+}
+
+# Respuesta cuando falta la pregunta de la regla. La fecha de nacimiento se pide en un segundo
+# paso del formulario, por eso su ausencia devuelve 206 y no un error.
+MISSING_ANSWER_RESPONSES = {
+    EligibilityRule.RULE_REJECT_OPTION: ("error", 400),
+    EligibilityRule.RULE_MIN_AGE: ("message", 206),
+}
+
+
+def evaluate_eligibility(schema, answers_by_question, today=None):
+    """
+    Evalúa las reglas de la encuesta contra las respuestas enviadas (`{question_id: respuesta}`).
+    Devuelve un `EligibilityResult`; lanza `EligibilityError` si falta o es inválida una
+    respuesta de tamizaje.
+    """
+    today = today or date.today()
+    details = {}
+    for rule in schema.eligibility_rules:
+        answer = answers_by_question.get(rule.question_id)
+        if not answer:
+            key, status = MISSING_ANSWER_RESPONSES[rule.rule_type]
+            raise EligibilityError({key: rule.missing_message}, status)
+
+        passed, found = RULE_CHECKS[rule.rule_type](rule, answer, schema, today)
+        details.update(found)
+        if not passed:
+            return EligibilityResult(rejected_by=rule, **details)
+    return EligibilityResult(**details)
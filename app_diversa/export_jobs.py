@@ -0,0 +1,138 @@
+"""
+Procesamiento de `ExportJob` fuera de la petición web.
+
+La cola es la propia tabla `ExportJob`: `claim_next_job` toma el trabajo pendiente más antiguo
+con `select_for_update(skip_locked=True)`, de modo que varios workers pueden convivir sin
+broker externo. Los archivos se escriben en `EXPORT_SPOOL_DIR` y se eliminan al expirar.
+"""
+import logging
+import os
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+from .exports import (
+    EXPORT_WRITERS, RESPONSE_EXPORT_HEADERS, last_attempt_id, response_export_rows, select_response_delta,
+    wide_export_rows
+)
+from .models import ExportJob, Response
+from .survey_schema import survey_schemas
+
+logger = logging.getLogger(__name__)
+
+
+class _CountingRows:
+    """
+    Envuelve un iterable de filas y cuenta las que se consumen.
+    """
+
+    def __init__(self, rows):
+        self._rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self._rows:
+            self.count += 1
+            yield row
+
+
+def get_spool_dir():
+    os.makedirs(settings.EXPORT_SPOOL_DIR, exist_ok=True)
+    return settings.EXPORT_SPOOL_DIR
+
+
+def get_export_rows(job):
+    """
+    Devuelve `(encabezados, filas, siguiente cursor)` de la exportación pedida por el trabajo.
+    """
+    if job.layout == 'wide':
+        schema = survey_schemas.get(job.survey_id)
+        if schema is None:
+            raise ValueError("Encuesta inválida o no existente.")
+        until_id = None
+        if job.since_id is not None:
+            until_id = max(job.since_id, last_attempt_id(schema.survey_id, job.since_id))
+        rows = wide_export_rows(schema, since_id=job.since_id, until_id=until_id)
+        return next(rows), rows, str(until_id) if until_id is not None else ''
+
+    delta = select_response_delta(Response.objects.all(), since=job.since, since_id=job.since_id)
+    return RESPONSE_EXPORT_HEADERS, response_export_rows(delta.queryset, delta.ordering), delta.next_cursor or ''
+
+
+def claim_next_job():
+    """
+    Marca como "en proceso" y devuelve el trabajo pendiente más antiguo, o `None`.
+    """
+    with transaction.atomic():
+        job = (
+            ExportJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ExportJob.STATUS_PENDING)
+            .order_by('created_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = ExportJob.STATUS_RUNNING
+        job.started_at = now()
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def run_export_job(job):
+    """
+    Genera el archivo del trabajo en el directorio de spool y registra filas, tamaño y duración.
+    El archivo se escribe con un nombre temporal y se renombra al terminar.
+    """
+    path = os.path.join(get_spool_dir(), f"export_{job.id}.{job.export_format}")
+    partial_path = f"{path}.part"
+    started = time.monotonic()
+
+    try:
+        headers, rows, next_cursor = get_export_rows(job)
+        counted_rows = _CountingRows(rows)
+        with open(partial_path, 'wb') as target:
+            EXPORT_WRITERS[job.export_format](headers, counted_rows, target)
+        os.replace(partial_path, path)
+    except Exception as exc:
+        logger.exception("Falló la exportación %s", job.id)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        job.status = ExportJob.STATUS_FAILED
+        job.error = str(exc)
+        job.finished_at = now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+
+    job.status = ExportJob.STATUS_DONE
+    job.next_cursor = next_cursor
+    job.file_path = path
+    job.row_count = counted_rows.count
+    job.size_bytes = os.path.getsize(path)
+    job.elapsed_seconds = time.monotonic() - started
+    job.finished_at = now()
+    job.expires_at = job.finished_at + timedelta(hours=settings.EXPORT_RETENTION_HOURS)
+    job.save(update_fields=[
+        'status', 'next_cursor', 'file_path', 'row_count', 'size_bytes', 'elapsed_seconds', 'finished_at', 'expires_at'
+    ])
+    return job
+
+
+def purge_expired_exports():
+    """
+    Elimina los archivos vencidos y marca sus trabajos como expirados.
+    Los trabajos que siguen "en proceso" después del periodo de retención (por ejemplo, porque
+    el worker se detuvo) se marcan como fallidos. Devuelve el número de trabajos expirados.
+    """
+    current_time = now()
+    expired = list(ExportJob.objects.filter(status=ExportJob.STATUS_DONE, expires_at__lte=current_time))
+    for job in expired:
+        if job.file_path and os.path.exists(job.file_path):
+            os.remove(job.file_path)
+    ExportJob.objects.filter(pk__in=[job.pk for job in expired]).update(status=ExportJob.STATUS_EXPIRED, file_path='')
+
+    ExportJob.objects.filter(
+        status=ExportJob.STATUS_RUNNING,
+        started_at__lte=current_time - timedelta(hours=settings.EXPORT_RETENTION_HOURS),
+    ).update(status=ExportJob.STATUS_FAILED, error="El trabajo fue interrumpido.", finished_at=current_time)
+    return len(expired)
@@ -0,0 +1,435 @@
+"""
+Exportación de respuestas.
+
+Las filas se leen con `values_list(...)` por bloques de `EXPORT_CHUNK_SIZE` paginados por clave,
+sin instanciar modelos ni acumular la tabla completa en memoria. `stream_csv` codifica cada fila a medida que se
+produce, de modo que la memoria usada por una exportación CSV no depende del número de filas.
+
+`select_response_delta` limita la exportación a lo nuevo o modificado desde un cursor
+(`since_id` o `since`), para cargas incrementales.
+
+La exportación ancha (una fila por `SurveyAttempt`, una columna por pregunta o subpregunta y
+columnas indicadoras para las opciones de selección múltiple) procesa los intentos por bloques
+y hace el pivote con arreglos de NumPy en lugar de diccionarios por fila.
+"""
+import csv
+from collections import namedtuple
+from datetime import timezone
+import numpy as np
+import tablib
+from django.conf import settings
+from django.db.models import Max, Min, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware
+from reportlab.pdfgen import canvas
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.utils import simpleSplit
+from .models import Response, SurveyAttempt
+
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+
+RESPONSE_EXPORT_HEADERS = ['ID', 'Usuario', 'Pregunta', 'Respuesta', 'Fecha']
+
+WIDE_EXPORT_FIXED_HEADERS = ['ID_INTENTO', 'Usuario', 'Fecha']
+
+# Respuestas a exportar a partir de un cursor, su orden y el cursor para la siguiente exportación
+ResponseDelta = namedtuple('ResponseDelta', ['queryset', 'ordering', 'next_cursor'])
+
+# Maquetación del PDF: ancho relativo de cada columna (1 por defecto), márgenes y tipografía en puntos
+PDF_COLUMN_WEIGHTS = {'ID': 1, 'Usuario': 2.5, 'Pregunta': 6, 'Respuesta': 3.5, 'Fecha': 2}
+PDF_MARGIN = 36
+PDF_PADDING = 3
+PDF_FONT_SIZE = 8
+PDF_LEADING = 10
+PDF_MAX_LINES_PER_CELL = 30
+
+# Columnas de la exportación ancha. Los arreglos `*_columns` mapean id → índice de columna (-1 si no aplica).
+WideLayout = namedtuple('WideLayout', [
+    'headers', 'question_columns', 'subquestion_columns', 'option_columns', 'option_labels', 'indicator_columns'
+])
+
+
+class Echo:
+    """
+    Pseudo-búfer para `csv.writer`: devuelve la línea escrita en lugar de guardarla.
+    """
+
+    def write(self, value):
+        return value
+
+
+def parse_since(value):
+    """
+    Interpreta un cursor `since`: una fecha ISO 8601 de `updated_at`, opcionalmente seguida
+    de `,<id>` para desempatar respuestas con la misma fecha. Lanza `ValueError` si es inválido.
+    """
+    timestamp, _, last_id = value.partition(',')
+    moment = parse_datetime(timestamp.strip())
+    if moment is None:
+        raise ValueError(f"Cursor inválido: {value}")
+    if is_naive(moment):
+        moment = make_aware(moment, timezone.utc)
+    return moment, int(last_id) if last_id else 0
+
+
+def format_since(moment, last_id):
+    # Siempre en UTC con "Z", para que el cursor no lleve "+" al usarse en una URL
+    return f"{moment.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')},{last_id}"
+
+
+def select_response_delta(queryset, since=None, since_id=None):
+    """
+    Limita `queryset` a las respuestas posteriores al cursor y devuelve un `ResponseDelta`.
+    Las respuestas de intentos en borrador no se exportan.
+
+    - `since_id`: respuestas nuevas, con id mayor al último visto.
+    - `since`: respuestas nuevas o modificadas, ordenadas por `(updated_at, id)`.
+
+    El límite superior se fija antes de exportar, así el siguiente cursor es exacto aunque
+    lleguen respuestas mientras se genera el archivo. El límite queda además antes de la primera
+    respuesta de un borrador abierto: al finalizarse, el borrador conserva sus ids y fechas, y
+    la siguiente exportación debe incluirlo. Sin cursor, se exporta toda la tabla.
+    """
+    drafts = Response.objects.filter(survey_attempt__status=SurveyAttempt.STATUS_DRAFT)
+    queryset = queryset.exclude(survey_attempt__status=SurveyAttempt.STATUS_DRAFT)
+    if since:
+        moment, last_id = parse_since(since)
+        after_cursor = Q(updated_at__gt=moment) | Q(updated_at=moment, id__gt=last_id)
+        queryset = queryset.filter(after_cursor)
+        first_draft = drafts.filter(after_cursor).order_by('updated_at', 'id').values_list('updated_at', 'id').first()
+        if first_draft is not None:
+            queryset = queryset.filter(
+                Q(updated_at__lt=first_draft[0]) | Q(updated_at=first_draft[0], id__lt=first_draft[1])
+            )
+        last = queryset.order_by('-updated_at', '-id').values_list('updated_at', 'id').first()
+        if last is None:
+            return ResponseDelta(queryset.none(), ('updated_at', 'id'), since)
+        queryset = queryset.filter(Q(updated_at__lt=last[0]) | Q(updated_at=last[0], id__lte=last[1]))
+        return ResponseDelta(queryset, ('updated_at', 'id'), format_since(*last))
+
+    if since_id is not None:
+        since_id = int(since_id)
+        queryset = queryset.filter(id__gt=since_id)
+        first_draft_id = drafts.filter(id__gt=since_id).aggregate(first_id=Min('id'))['first_id']
+        if first_draft_id is not None:
+            queryset = queryset.filter(id__lt=first_draft_id)
+        last_id = queryset.aggregate(last_id=Max('id'))['last_id'] or since_id
+        return ResponseDelta(queryset.filter(id__lte=last_id), ('id',), str(last_id))
+
+    return ResponseDelta(queryset, ('id',), None)
+
+
+def response_export_rows(queryset=None, ordering=('id',)):
+    """
+    Genera las filas de la exportación de respuestas, en el orden indicado (por defecto, por id).
+    Las respuestas se leen por bloques de `EXPORT_CHUNK_SIZE` con paginación por clave (el
+    último valor de `ordering` visto), porque con MySQL `iterator()` no evita que el driver
+    cargue todo el resultado en memoria.
+    """
+    if queryset is None:
+        queryset = Response.objects.all()
+    queryset = queryset.order_by(*ordering)
+    fields = (
+        'id', 'user__username', 'question__text_question', 'response_text', 'response_number', 'created_at'
+    ) + tuple(field for field in ordering if field != 'id')
+
+    block = list(queryset.values_list(*fields)[:_chunk_size()])
+    while block:
+        for response_id, username, text_question, response_text, response_number, created_at, *_ in block:
+            yield [
+                response_id,
+                username,
+                text_question,
+                response_text or response_number,
+                # Formato YYYY/MM/DD
+                created_at.strftime('%Y/%m/%d %H:%M:%S'),
+            ]
+        block = list(_after_row(queryset, ordering, block[-1]).values_list(*fields)[:_chunk_size()])
+
+
+def _after_row(queryset, ordering, row):
+    """
+    Limita `queryset` a las filas posteriores a `row` según `ordering` (`('id',)` o `(<campo>, 'id')`).
+    """
+    if ordering == ('id',):
+        return queryset.filter(id__gt=row[0])
+    field = ordering[0]
+    value = row[-1]
+    return queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': row[0]}))
+
+
+def stream_csv(headers, rows, encoding='utf-8'):
+    """
+    Genera el CSV fila a fila, ya codificado, para usar con `StreamingHttpResponse`.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers).encode(encoding)
+    for row in rows:
+        yield writer.writerow(row).encode(encoding)
+
+
+def write_csv(headers, rows, target):
+    for chunk in stream_csv(headers, rows):
+        target.write(chunk)
+
+
+def write_xls(headers, rows, target):
+    target.write(tablib.Dataset(*rows, headers=headers).export('xls'))
+
+
+def write_pdf(headers, rows, target):
+    """
+    Escribe el PDF página por página directamente en el lienzo de reportlab: cada página recibe
+    las filas que caben, repite los encabezados y ajusta en varias líneas los textos largos.
+    A diferencia de una `Table` con todas las filas, no hay una fase de maquetación global y
+    cada fila se descarta después de dibujarse.
+    """
+    page_width, page_height = landscape(A4)
+    pdf = canvas.Canvas(target, pagesize=(page_width, page_height), pageCompression=1)
+
+    weights = [PDF_COLUMN_WEIGHTS.get(header, 1) for header in headers]
+    usable_width = page_width - 2 * PDF_MARGIN
+    widths = [usable_width * weight / sum(weights) for weight in weights]
+    bottom = PDF_MARGIN + PDF_LEADING
+    page_number = 1
+
+    def wrap(values, font_name):
+        cells = []
+        for value, width in zip(values, widths):
+            text = str(value) if value is not None else ''
+            lines = simpleSplit(text, font_name, PDF_FONT_SIZE, width - 2 * PDF_PADDING)
+            cells.append(lines[:PDF_MAX_LINES_PER_CELL] or [''])
+        return cells
+
+    def draw_row(cells, y, background, text_color, font_name):
+        height = max(len(lines) for lines in cells) * PDF_LEADING + 2 * PDF_PADDING
+        x = PDF_MARGIN
+        pdf.setFont(font_name, PDF_FONT_SIZE)
+        for lines, width in zip(cells, widths):
+            pdf.setFillColor(background)
+            pdf.rect(x, y - height, width, height, stroke=1, fill=1)
+            pdf.setFillColor(text_color)
+            for index, line in enumerate(lines):
+                pdf.drawString(x + PDF_PADDING, y - PDF_PADDING - (index + 1) * PDF_LEADING + 2, line)
+            x += width
+        return y - height
+
+    def start_page():
+        pdf.setStrokeColor(colors.black)
+        pdf.setFont('Helvetica', PDF_FONT_SIZE)
+        pdf.setFillColor(colors.black)
+        pdf.drawRightString(page_width - PDF_MARGIN, PDF_MARGIN / 2, f"Página {page_number}")
+        return draw_row(header_cells, page_height - PDF_MARGIN, colors.grey, colors.whitesmoke, 'Helvetica-Bold')
+
+    header_cells = wrap(headers, 'Helvetica-Bold')
+    y = start_page()
+    for row in rows:
+        cells = wrap(row, 'Helvetica')
+        height = max(len(lines) for lines in cells) * PDF_LEADING + 2 * PDF_PADDING
+        if y - height < bottom:
+            pdf.showPage()
+            page_number += 1
+            y = start_page()
+        y = draw_row(cells, y, colors.beige, colors.black, 'Helvetica')
+
+    pdf.showPage()
+    pdf.save()
+
+
+# Escritores por formato: reciben encabezados, un iterable de filas y un objeto con `write()`
+EXPORT_WRITERS = {
+    'csv': write_csv,
+    'xls': write_xls,
+    'pdf': write_pdf,
+}
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xls': 'application/vnd.ms-excel',
+    'pdf': 'application/pdf',
+}
+
+
+def _chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', DEFAULT_EXPORT_CHUNK_SIZE)
+
+
+def _lookup_array(mapping, fill=-1, dtype=np.int64):
+    """
+    Convierte un diccionario id → valor en un arreglo denso indexado por id.
+    """
+    array = np.full(max(mapping, default=0) + 1, fill, dtype=dtype)
+    for key, value in mapping.items():
+        array[key] = value
+    return array
+
+
+def _lookup(array, ids, fill=-1):
+    """
+    Busca cada id en un arreglo denso; los ids fuera de rango devuelven `fill`.
+    """
+    result = np.full(ids.shape, fill, dtype=array.dtype)
+    in_range = (ids >= 0) & (ids < array.size)
+    result[in_range] = array[ids[in_range]]
+    return result
+
+
+def _as_ids(values):
+    """
+    Columna de ids (con posibles `None`) como arreglo de enteros, con 0 en lugar de `None`.
+    """
+    values = np.array(values, dtype=object)
+    values[np.equal(values, None)] = 0
+    return values.astype(np.int64)
+
+
+def _first_present(*columns):
+    """
+    Para cada fila, el primer valor no vacío de las columnas dadas.
+    """
+    result = columns[0].copy()
+    for column in columns[1:]:
+        blank = np.equal(result, None) | (result == '')
+        result[blank] = column[blank]
+    return result
+
+
+def build_wide_layout(schema):
+    """
+    Define las columnas de la exportación ancha a partir de un `SurveySchema`.
+
+    Cada pregunta es una columna `P<id>`; las matriciales se abren en una columna por subpregunta,
+    `P<id>_<custom_identifier u orden>` (o `P<id>_S<id de subpregunta>` si ese nombre se repite), y las de selección múltiple en una columna indicadora (0/1) por opción, `<columna>_O<id de opción>`.
+    """
+    headers = list(WIDE_EXPORT_FIXED_HEADERS)
+    question_columns, subquestion_columns, option_columns = {}, {}, {}
+    subquestion_names = set()
+
+    options_by_owner = {}
+    for option in sorted(schema.options.values(), key=lambda option: (option.order_option or 0, option.id)):
+        owner = ('subquestion', option.subquestion_id) if option.subquestion_id else ('question', option.question_id)
+        options_by_owner.setdefault(owner, []).append(option)
+
+    def add_column(name):
+        headers.append(name)
+        return len(headers) - 1
+
+    def add_indicators(name, owner):
+        for option in options_by_owner.get(owner, ()):
+            option_columns[option.id] = add_column(f"{name}_O{option.id}")
+
+    questions = sorted(
+        schema.questions.values(),
+        key=lambda question: (question.chapter_id or 0, question.order_question or 0, question.id)
+    )
+    for question in questions:
+        name = f"P{question.id}"
+        subquestions = schema.subquestions_by_parent.get(question.id, ())
+        if question.is_matrix and subquestions:
+            for subquestion in subquestions:
+                subquestion_name = f"{name}_{subquestion.custom_identifier or subquestion.subquestion_order}"
+                if subquestion_name in subquestion_names:
+                    # Identificador repetido o igual al orden de otra fila de la matriz
+                    subquestion_name = f"{name}_S{subquestion.id}"
+                subquestion_names.add(subquestion_name)
+                if subquestion.is_multiple:
+                    add_indicators(subquestion_name, ('subquestion', subquestion.id))
+                else:
+                    subquestion_columns[subquestion.id] = add_column(subquestion_name)
+        elif question.is_multiple or question.question_type == 'multiple':
+            add_indicators(name, ('question', question.id))
+        else:
+            question_columns[question.id] = add_column(name)
+
+    return WideLayout(
+        headers=headers,
+        question_columns=_lookup_array(question_columns),
+        subquestion_columns=_lookup_array(subquestion_columns),
+        option_columns=_lookup_array(option_columns),
+        option_labels=_lookup_array(
+            {option.id: option.text_option for option in schema.options.values()}, fill=None, dtype=object
+        ),
+        indicator_columns=np.array(sorted(option_columns.values()), dtype=np.int64),
+    )
+
+
+def _pivot_attempts(layout, attempts):
+    """
+    Construye las filas anchas de un bloque de intentos `(id, usuario, fecha)` ordenado por id.
+    """
+    attempt_ids = np.array([attempt[0] for attempt in attempts], dtype=np.int64)
+    cells = np.empty((len(attempts), len(layout.headers)), dtype=object)
+    cells[:, 0] = attempt_ids
+    cells[:, 1] = [attempt[1] for attempt in attempts]
+    cells[:, 2] = [attempt[2].strftime('%Y/%m/%d %H:%M:%S') for attempt in attempts]
+    cells[:, layout.indicator_columns] = 0
+
+    responses = list(Response.objects.filter(survey_attempt_id__in=attempt_ids.tolist()).values_list(
+        'survey_attempt_id', 'question_id', 'subquestion_id', 'option_selected_id',
+        'response_text', 'other_text', 'response_number'
+    ))
+    if responses:
+        attempt_column, question_column, subquestion_column, option_column, text, other, number = (
+            np.array(column, dtype=object) for column in zip(*responses)
+        )
+        subquestion_ids = _as_ids(subquestion_column)
+        rows = np.searchsorted(attempt_ids, attempt_column.astype(np.int64))
+        columns = np.where(
+            subquestion_ids > 0,
+            _lookup(layout.subquestion_columns, subquestion_ids),
+            _lookup(layout.question_columns, _as_ids(question_column)),
+        )
+        values = _first_present(text, other, number, _lookup(layout.option_labels, _as_ids(option_column), fill=None))
+        answered = columns >= 0
+        cells[rows[answered], columns[answered]] = values[answered]
+
+    selected = np.array(
+        Response.options_multiple_selected.through.objects.filter(
+            response__survey_attempt_id__in=attempt_ids.tolist()
+        ).values_list('response__survey_attempt_id', 'option_id'),
+        dtype=np.int64
+    ).reshape(-1, 2)
+    if selected.size:
+        rows = np.searchsorted(attempt_ids, selected[:, 0])
+        columns = _lookup(layout.option_columns, selected[:, 1])
+        chosen = columns >= 0
+        cells[rows[chosen], columns[chosen]] = 1
+
+    return cells.tolist()
+
+
+def last_attempt_id(survey_id, since_id=0):
+    """
+    Cursor de la exportación ancha incremental: el último intento finalizado anterior al primer
+    borrador abierto con id mayor a `since_id`. Un borrador conserva su id al finalizarse, así que
+    el cursor no lo adelanta hasta que se finaliza o se elimina.
+    """
+    attempts = SurveyAttempt.objects.filter(survey_id=survey_id, id__gt=since_id or 0)
+    first_draft_id = attempts.filter(status=SurveyAttempt.STATUS_DRAFT).aggregate(first_id=Min('id'))['first_id']
+    if first_draft_id is not None:
+        attempts = attempts.filter(id__lt=first_draft_id)
+    return attempts.filter(status=SurveyAttempt.STATUS_COMPLETED).aggregate(last_id=Max('id'))['last_id'] or 0
+
+
+def wide_export_rows(schema, since_id=0, until_id=None):
+    """
+    Genera las filas de la exportación ancha de una encuesta, una por `SurveyAttempt` finalizado.
+    Los intentos se recorren por bloques de `EXPORT_CHUNK_SIZE` con paginación por id;
+    `since_id` y `until_id` limitan la exportación a los intentos en `(since_id, until_id]`.
+    """
+    layout = build_wide_layout(schema)
+    yield layout.headers
+
+    attempts = SurveyAttempt.objects.filter(
+        survey_id=schema.survey_id, status=SurveyAttempt.STATUS_COMPLETED
+    ).order_by('id')
+    if until_id is not None:
+        attempts = attempts.filter(id__lte=until_id)
+    last_id = since_id or 0
+    while True:
+        block = list(attempts.filter(id__gt=last_id).values_list('id', 'user__username', 'created_at')[:_chunk_size()])
+        if not block:
+            return
+        yield from _pivot_attempts(layout, block)
+        last_id = block[-1][0]
@@ -0,0 +1,130 @@
+"""
+Envíos idempotentes de respuestas con el encabezado `Idempotency-Key`.
+
+El intento (`SurveyAttempt`) guarda la llave junto con el código y el cuerpo de la respuesta que
+se devolvió al crearlo; la restricción única `(user, idempotency_key)` impide duplicarlo. Un
+reintento con la misma llave devuelve ese resultado sin volver a validar ni escribir: primero se
+busca en una LRU por proceso y, si no está, con una lectura por índice.
+
+Con la llave se guarda también el hash del cuerpo enviado (`body_hash`). Reusar la llave con
+otro cuerpo es un error del cliente y no se responde con el resultado del primer envío.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from .models import SurveyAttempt
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+DEFAULT_IDEMPOTENCY_CACHE_SIZE = 1024
+
+
+class IdempotencyResultCache:
+    """
+    LRU en memoria de `(user_id, llave) -> (código, cuerpo, hash del envío)`. Solo guarda resultados confirmados.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+
+    @property
+    def maxsize(self):
+        return getattr(settings, 'IDEMPOTENCY_CACHE_SIZE', DEFAULT_IDEMPOTENCY_CACHE_SIZE)
+
+    def get(self, user_id, key):
+        with self._lock:
+            result = self._results.get((user_id, key))
+            if result is not None:
+                self._results.move_to_end((user_id, key))
+            return result
+
+    def set(self, user_id, key, result):
+        with self._lock:
+            self._results[(user_id, key)] = result
+            self._results.move_to_end((user_id, key))
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+idempotency_results = IdempotencyResultCache()
+
+
+def get_idempotency_key(request):
+    """
+    Devuelve la llave enviada en `Idempotency-Key`, `None` si no hay, o lanza `ValueError`
+    si es demasiado larga.
+    """
+    key = request.META.get(IDEMPOTENCY_HEADER, '').strip()
+    if not key:
+        return None
+    if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise ValueError(f"El encabezado Idempotency-Key admite máximo {IDEMPOTENCY_KEY_MAX_LENGTH} caracteres.")
+    return key
+
+
+def body_hash(data):
+    """
+    SHA-256 del cuerpo de un envío en JSON canónico (llaves ordenadas, sin espacios).
+    """
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, cls=DjangoJSONEncoder)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def find_result(user_id, key):
+    """
+    Resultado `(código, cuerpo, hash del envío)` guardado para la llave del usuario, o `None`.
+    """
+    result = idempotency_results.get(user_id, key)
+    if result is not None:
+        return result
+
+    row = SurveyAttempt.objects.filter(
+        user_id=user_id, idempotency_key=key, result_status__isnull=False
+    ).values_list('result_status', 'result_payload', 'idempotency_body_hash').first()
+    if row is not None:
+        result = tuple(row)
+        idempotency_results.set(user_id, key, result)
+    return result
+
+
+def remember_result(user_id, key, status, payload, request_hash=None):
+    """
+    Lleva el resultado a la LRU cuando se confirma la transacción que creó el intento.
+    """
+    transaction.on_commit(lambda: idempotency_results.set(user_id, key, (status, payload, request_hash)))
+
+
+def create_attempt(idempotency_key, result_status, result_payload, request_hash=None, **fields):
+    """
+    Crea el `SurveyAttempt` guardando con él el resultado que se devolverá y el hash del envío.
+    `result_payload` puede ser una función que recibe el intento creado (cuando el cuerpo
+    incluye su id). Devuelve `(intento, None)`, o `(None, resultado guardado)` si otro envío con
+    la misma llave lo creó primero.
+    """
+    if idempotency_key is None:
+        return SurveyAttempt.objects.create(**fields), None
+
+    try:
+        with transaction.atomic():
+            attempt = SurveyAttempt.objects.create(
+                idempotency_key=idempotency_key, idempotency_body_hash=request_hash, result_status=result_status,
+                result_payload=None if callable(result_payload) else result_payload, **fields
+            )
+    except IntegrityError:
+        return None, find_result(fields['user'].id, idempotency_key)
+
+    if callable(result_payload):
+        result_payload = attempt.result_payload = result_payload(attempt)
+        attempt.save(update_fields=['result_payload'])
+
+    remember_result(attempt.user_id, idempotency_key, result_status, result_payload, request_hash)
+    return attempt, None
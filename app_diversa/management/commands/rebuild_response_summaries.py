@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from app_diversa.summaries import rebuild_response_summaries, verify_response_summaries
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los contadores de respuestas (`ResponseSummary`) o verifica que coincidan con `Response`."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Solo compara los contadores con un recálculo completo, sin modificarlos."
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            differences = verify_response_summaries()
+            for key, (stored, expected) in sorted(differences.items()):
+                survey_id, question_id, subquestion_key, option_key, department_key = key
+                self.stdout.write(
+                    f"Encuesta {survey_id}, pregunta {question_id}, subpregunta {subquestion_key}, "
+                    f"opción {option_key}, departamento {department_key}: {stored} guardado, {expected} esperado."
+                )
+            if differences:
+                raise CommandError(f"{len(differences)} contadores no coinciden.")
+            self.stdout.write(self.style.SUCCESS("Los contadores coinciden con las respuestas."))
+            return
+
+        created = rebuild_response_summaries()
+        self.stdout.write(self.style.SUCCESS(f"Contadores reconstruidos: {created} filas."))
@@ -0,0 +1,41 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from app_diversa.export_jobs import claim_next_job, purge_expired_exports, run_export_job
+
+
+class Command(BaseCommand):
+    help = "Procesa la cola de exportaciones (`ExportJob`) y elimina los archivos vencidos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Procesa los trabajos pendientes y termina, en lugar de quedarse esperando."
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.EXPORT_WORKER_POLL_INTERVAL,
+            help="Segundos de espera cuando no hay trabajos pendientes."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # El proceso no pasa por el ciclo de peticiones: se descartan aquí las conexiones
+            # caducadas (`CONN_MAX_AGE`) o cerradas por el servidor durante la espera
+            close_old_connections()
+            purged = purge_expired_exports()
+            if purged:
+                self.stdout.write(f"{purged} exportaciones expiradas eliminadas.")
+
+            job = claim_next_job()
+            while job is not None:
+                close_old_connections()
+                job = run_export_job(job)
+                self.stdout.write(
+                    f"Exportación {job.id}: {job.status} ({job.row_count or 0} filas, {job.size_bytes or 0} bytes)."
+                )
+                job = claim_next_job()
+
+            if options['once']:
+                return
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0019_response_normalized_other_text_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='content_version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Versión del contenido de la encuesta. Aumenta con cada cambio en su definición (capítulos, preguntas, subpreguntas, opciones o textos).'),
+        ),
+    ]
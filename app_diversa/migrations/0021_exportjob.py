@@ -0,0 +1,39 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0020_survey_content_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('export_format', models.CharField(choices=[('csv', 'CSV'), ('xls', 'XLS'), ('pdf', 'PDF')], help_text='Formato del archivo a generar.', max_length=10)),
+                ('layout', models.CharField(choices=[('long', 'Una fila por respuesta'), ('wide', 'Una fila por intento')], default='long', help_text='Disposición de la exportación: larga (por respuesta) o ancha (por intento).', max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En proceso'), ('done', 'Terminado'), ('failed', 'Fallido'), ('expired', 'Expirado')], default='pending', help_text='Estado del trabajo.', max_length=10)),
+                ('file_path', models.CharField(blank=True, default='', help_text='Ruta del archivo generado dentro de `EXPORT_SPOOL_DIR`.', max_length=500)),
+                ('row_count', models.PositiveIntegerField(blank=True, help_text='Número de filas exportadas.', null=True)),
+                ('size_bytes', models.PositiveBigIntegerField(blank=True, help_text='Tamaño del archivo generado, en bytes.', null=True)),
+                ('elapsed_seconds', models.FloatField(blank=True, help_text='Tiempo que tomó generar el archivo, en segundos.', null=True)),
+                ('error', models.TextField(blank=True, default='', help_text='Mensaje de error si el trabajo falló.')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Fecha y hora en que se solicitó la exportación.')),
+                ('started_at', models.DateTimeField(blank=True, help_text='Fecha y hora en que el worker empezó el trabajo.', null=True)),
+                ('finished_at', models.DateTimeField(blank=True, help_text='Fecha y hora en que terminó el trabajo.', null=True)),
+                ('expires_at', models.DateTimeField(blank=True, help_text='Fecha y hora a partir de la cual el archivo se elimina.', null=True)),
+                ('survey', models.ForeignKey(blank=True, help_text='Encuesta a exportar. Obligatoria en la disposición ancha.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to='app_diversa.survey')),
+                ('user', models.ForeignKey(help_text='Usuario que solicitó la exportación.', on_delete=django.db.models.deletion.CASCADE, related_name='export_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx')],
+            },
+        ),
+    ]
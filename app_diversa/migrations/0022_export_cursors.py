@@ -0,0 +1,35 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0021_exportjob'),
+        ('app_geo', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='next_cursor',
+            field=models.CharField(blank=True, default='', help_text='Cursor a usar en la siguiente exportación incremental.', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='since',
+            field=models.CharField(blank=True, default='', help_text='Cursor `since` (fecha ISO de `updated_at`, opcionalmente `,<id>`) para exportar solo lo nuevo o modificado.', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='since_id',
+            field=models.PositiveBigIntegerField(blank=True, help_text='Cursor `since_id` para exportar solo los registros con id mayor.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['updated_at', 'id'], name='response_updated_id_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0022_export_cursors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subquestion_key', models.PositiveIntegerField(default=0, help_text='Id de la subpregunta, o 0 si la respuesta no es de una subpregunta.')),
+                ('option_key', models.PositiveIntegerField(default=0, help_text='Id de la opción seleccionada, o 0 para el total de respuestas.')),
+                ('department_key', models.PositiveIntegerField(default=0, help_text='Id del departamento informado en el intento, o 0 si no hay.')),
+                ('count', models.BigIntegerField(default=0, help_text='Número de respuestas o selecciones.')),
+                ('question', models.ForeignKey(help_text='Pregunta respondida.', on_delete=django.db.models.deletion.CASCADE, related_name='response_summaries', to='app_diversa.question')),
+                ('survey', models.ForeignKey(help_text='Encuesta del intento.', on_delete=django.db.models.deletion.CASCADE, related_name='response_summaries', to='app_diversa.survey')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('survey', 'question', 'subquestion_key', 'option_key', 'department_key'), name='response_summary_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0023_responsesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EligibilityRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule_type', models.CharField(choices=[('reject_option', 'Rechaza si se selecciona la opción'), ('min_age', 'Edad mínima según la fecha de nacimiento')], help_text='Tipo de regla.', max_length=20)),
+                ('min_age', models.PositiveSmallIntegerField(blank=True, help_text='Edad mínima en años. Solo para reglas de edad; la pregunta debe pedir la fecha de nacimiento (YYYY-MM-DD).', null=True)),
+                ('missing_message', models.CharField(default='Debe responder las preguntas de requisitos.', help_text='Mensaje devuelto si falta la respuesta a la pregunta de la regla.', max_length=255)),
+                ('rejection_message', models.CharField(default='No cumple con los requisitos para la encuesta.', help_text='Mensaje devuelto al participante rechazado.', max_length=255)),
+                ('rejection_note', models.CharField(default='El usuario no cumple con los requisitos de la encuesta.', help_text='Nota guardada en el intento rechazado. En las reglas de edad puede incluir `{age}`.', max_length=255)),
+                ('order', models.PositiveIntegerField(default=0, help_text='Orden de evaluación de la regla dentro de la encuesta.')),
+                ('is_active', models.BooleanField(default=True, help_text='Indica si la regla se evalúa.')),
+                ('option', models.ForeignKey(blank=True, help_text='Opción que rechaza al participante. Solo para reglas de opción.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='eligibility_rules', to='app_diversa.option')),
+                ('question', models.ForeignKey(help_text='Pregunta de tamizaje evaluada por la regla.', on_delete=django.db.models.deletion.CASCADE, related_name='eligibility_rules', to='app_diversa.question')),
+                ('survey', models.ForeignKey(help_text='Encuesta a la que aplica la regla.', on_delete=django.db.models.deletion.CASCADE, related_name='eligibility_rules', to='app_diversa.survey')),
+            ],
+            options={
+                'ordering': ['survey', 'order', 'id'],
+            },
+        ),
+    ]
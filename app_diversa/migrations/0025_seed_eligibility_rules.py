@@ -0,0 +1,54 @@
+from django.db import migrations
+
+# Preguntas de tamizaje que `SubmitResponseView` tenía fijas antes de `EligibilityRule`
+LIVED_IN_COLOMBIA_QUESTION_ID = 1
+BIRTH_DATE_QUESTION_ID = 2
+
+
+def seed_eligibility_rules(apps, schema_editor):
+    """
+    Crea las reglas equivalentes al tamizaje anterior: la opción "No" de la pregunta 1 rechaza
+    y la fecha de nacimiento de la pregunta 2 exige 18 años.
+    """
+    Question = apps.get_model('app_diversa', 'Question')
+    Option = apps.get_model('app_diversa', 'Option')
+    EligibilityRule = apps.get_model('app_diversa', 'EligibilityRule')
+
+    lived = Question.objects.filter(pk=LIVED_IN_COLOMBIA_QUESTION_ID).first()
+    if lived is not None:
+        no_option = Option.objects.filter(question=lived, text_option__iexact='no').first()
+        if no_option is not None:
+            EligibilityRule.objects.create(
+                survey_id=lived.survey_id,
+                rule_type='reject_option',
+                question=lived,
+                option=no_option,
+                missing_message="Debe responder si ha vivido en Colombia los últimos 5 años.",
+                rejection_message="No cumple con los requisitos para la encuesta.",
+                rejection_note="El usuario no ha vivido en Colombia los últimos 5 años.",
+                order=1,
+            )
+
+    birth_date = Question.objects.filter(pk=BIRTH_DATE_QUESTION_ID).first()
+    if birth_date is not None:
+        EligibilityRule.objects.create(
+            survey_id=birth_date.survey_id,
+            rule_type='min_age',
+            question=birth_date,
+            min_age=18,
+            missing_message="Debe responder la fecha de nacimiento.",
+            rejection_message="No cumple con los requisitos de edad.",
+            rejection_note="El usuario tiene {age} años y no cumple con la edad mínima.",
+            order=2,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0024_eligibilityrule'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_eligibility_rules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0025_seed_eligibility_rules'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyattempt',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Valor del encabezado `Idempotency-Key` del envío que creó el intento. Los reintentos con la misma llave devuelven el resultado guardado.', max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='surveyattempt',
+            name='result_payload',
+            field=models.JSONField(blank=True, help_text='Cuerpo de la respuesta devuelta al crear el intento; se repite en los reintentos.', null=True),
+        ),
+        migrations.AddField(
+            model_name='surveyattempt',
+            name='result_status',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Código HTTP devuelto al crear el intento; se repite en los reintentos.', null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='surveyattempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('idempotency_key__isnull', False)), fields=('user', 'idempotency_key'), name='surveyattempt_user_idempotency_key'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0026_surveyattempt_idempotency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DefinitionTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('survey_id', models.PositiveIntegerField(help_text='Id de la encuesta a la que pertenecía el elemento.')),
+                ('model_name', models.CharField(help_text='Tipo de elemento eliminado (chapters, questions, subquestions, options o texts).', max_length=30)),
+                ('object_id', models.PositiveIntegerField(help_text='Id del elemento eliminado.')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, help_text='Fecha y hora de la eliminación.')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['survey_id', 'deleted_at'], name='tombstone_survey_deleted_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:27
+
+from datetime import datetime
+
+import django.core.serializers.json
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def _row_fields(model):
+    return [field.attname for field in model._meta.concrete_fields if not field.generated]
+
+
+def archive_duplicate_responses(apps, schema_editor):
+    """
+    Antes de crear la llave única, deja en `Response` solo la respuesta más reciente de cada
+    (intento, pregunta, subpregunta) y mueve las demás, con sus opciones múltiples, a
+    `ArchivedResponse`. No se pierde ningún dato: revertir la migración las restaura. Los
+    contadores de `ResponseSummary` deben reconstruirse después con
+    `python manage.py rebuild_response_summaries`.
+    """
+    Response = apps.get_model('app_diversa', 'Response')
+    ArchivedResponse = apps.get_model('app_diversa', 'ArchivedResponse')
+    through_model = Response.options_multiple_selected.through
+    fields = _row_fields(Response)
+
+    duplicates = (
+        Response.objects.filter(survey_attempt__isnull=False)
+        .values('survey_attempt_id', 'question_id', 'subquestion_key')
+        .annotate(total=Count('id'), keep_id=Max('id'))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        rows = Response.objects.filter(
+            survey_attempt_id=row['survey_attempt_id'],
+            question_id=row['question_id'],
+            subquestion_key=row['subquestion_key'],
+        ).exclude(pk=row['keep_id'])
+        for data in rows.values(*fields):
+            # `DjangoJSONEncoder` recorta las fechas a milisegundos; se guardan completas
+            data = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in data.items()}
+            data['options_multiple_selected'] = list(
+                through_model.objects.filter(response_id=data['id']).values_list('option_id', flat=True)
+            )
+            ArchivedResponse.objects.create(
+                response_id=data['id'],
+                survey_attempt_id=row['survey_attempt_id'],
+                question_id=row['question_id'],
+                subquestion_key=row['subquestion_key'],
+                kept_response_id=row['keep_id'],
+                data=data,
+            )
+        rows.delete()
+
+
+def restore_archived_responses(apps, schema_editor):
+    """
+    Devuelve a `Response` las respuestas archivadas por `archive_duplicate_responses`.
+    """
+    Response = apps.get_model('app_diversa', 'Response')
+    ArchivedResponse = apps.get_model('app_diversa', 'ArchivedResponse')
+    through_model = Response.options_multiple_selected.through
+
+    for archived in ArchivedResponse.objects.order_by('id'):
+        data = dict(archived.data)
+        option_ids = data.pop('options_multiple_selected', [])
+        Response.objects.bulk_create([Response(**data)])
+        # `bulk_create` aplica `auto_now`/`auto_now_add`; `update()` repone las fechas originales
+        Response.objects.filter(pk=data['id']).update(created_at=data['created_at'], updated_at=data['updated_at'])
+        through_model.objects.bulk_create(
+            [through_model(response_id=data['id'], option_id=option_id) for option_id in option_ids]
+        )
+    ArchivedResponse.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0027_definitiontombstone'),
+        ('app_geo', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='response',
+            name='subquestion_key',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Coalesce('subquestion', 0), help_text='Id de la subpregunta, o 0 si la respuesta es de la pregunta principal. Forma parte de la llave única de la respuesta en el intento.', output_field=models.PositiveIntegerField()),
+        ),
+        migrations.AddField(
+            model_name='surveyattempt',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Borrador'), ('completed', 'Finalizado')], default='completed', help_text='Estado del intento: borrador (respuestas en curso) o finalizado.', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ArchivedResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('response_id', models.PositiveBigIntegerField(help_text='Id que tenía la respuesta en `Response`.')),
+                ('survey_attempt_id', models.PositiveBigIntegerField(help_text='Id del intento de la respuesta.')),
+                ('question_id', models.PositiveBigIntegerField(help_text='Id de la pregunta de la respuesta.')),
+                ('subquestion_key', models.PositiveIntegerField(help_text='Id de la subpregunta, o 0 si la respuesta es de la pregunta principal.')),
+                ('kept_response_id', models.PositiveBigIntegerField(help_text='Id de la respuesta que se conservó para la misma llave.')),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Campos de la fila original y sus opciones múltiples (`options_multiple_selected`).')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, help_text='Fecha y hora en que se retiró la respuesta.')),
+            ],
+        ),
+        migrations.RunPython(archive_duplicate_responses, restore_archived_responses),
+        migrations.AddConstraint(
+            model_name='response',
+            constraint=models.UniqueConstraint(fields=('survey_attempt', 'question', 'subquestion_key'), name='response_attempt_answer_key'),
+        ),
+    ]
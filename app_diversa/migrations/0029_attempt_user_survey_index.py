@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0028_draft_attempts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='surveyattempt',
+            index=models.Index(fields=['user', 'survey', '-created_at'], name='attempt_user_survey_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0029_attempt_user_survey_index'),
+        ('app_geo', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['created_at', 'id'], name='response_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyattempt',
+            index=models.Index(fields=['created_at', 'id'], name='attempt_created_id_idx'),
+        ),
+    ]
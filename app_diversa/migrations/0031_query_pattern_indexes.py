@@ -0,0 +1,50 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0030_cursor_pagination_indexes'),
+        ('app_geo', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # Los índices compuestos se crean antes de quitar los de una columna que reemplazan
+    operations = [
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['question', 'option_selected', 'survey_attempt'], name='response_question_option_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['department', 'municipality'], name='response_geo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyattempt',
+            index=models.Index(fields=['survey', 'id'], name='attempt_survey_id_idx'),
+        ),
+        migrations.AlterField(
+            model_name='response',
+            name='department',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Departamento seleccionado.', null=True, on_delete=django.db.models.deletion.SET_NULL, to='app_geo.department'),
+        ),
+        migrations.AlterField(
+            model_name='response',
+            name='question',
+            field=models.ForeignKey(db_index=False, help_text='Pregunta a la que corresponde esta respuesta.', on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='app_diversa.question'),
+        ),
+        migrations.AlterField(
+            model_name='response',
+            name='survey_attempt',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Intento de la encuesta asociado a esta respuesta.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='app_diversa.surveyattempt'),
+        ),
+        migrations.AlterField(
+            model_name='surveyattempt',
+            name='survey',
+            field=models.ForeignKey(db_index=False, help_text='Encuesta que el usuario intentó completar.', on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='app_diversa.survey'),
+        ),
+    ]
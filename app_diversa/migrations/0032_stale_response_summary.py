@@ -0,0 +1,21 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0031_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StaleResponseSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('survey_id', models.PositiveBigIntegerField(help_text='Id de la encuesta con los contadores desactualizados.', unique=True)),
+                ('marked_at', models.DateTimeField(auto_now_add=True, help_text='Fecha y hora en que se marcó la encuesta.')),
+            ],
+        ),
+    ]
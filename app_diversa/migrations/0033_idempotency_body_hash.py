@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-17 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_diversa', '0032_stale_response_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyattempt',
+            name='idempotency_body_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 del cuerpo del envío que creó el intento; un reintento con la misma llave y otro cuerpo se rechaza.', max_length=64, null=True),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.functions import Coalesce
 from unidecode import unidecode
 from app_geo.models import Country, Department, Municipality
 
@@ -29,6 +31,10 @@ class Survey(models.Model):
     updated_at = models.DateTimeField(
         auto_now=True, help_text="Fecha y hora en que se actualizó la encuesta."
     )
+    content_version = models.PositiveIntegerField(
+        default=1, editable=False,
+        help_text="Versión del contenido de la encuesta. Aumenta con cada cambio en su definición (capítulos, preguntas, subpreguntas, opciones o textos)."
+    )
 
     def save(self, *args, **kwargs):
         # Convertir a mayúsculas antes de guardar
@@ -36,6 +42,13 @@ class Survey(models.Model):
             self.name = self.name.upper()
         if self.title:
             self.title = self.title.upper()
+        # `content_version` solo lo incrementa `bump_content_version` con `F()`: una instancia
+        # leída antes de un cambio no debe devolverle su valor anterior al guardarse
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'content_version'
+            ]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -44,15 +57,27 @@ class Survey(models.Model):
 class SurveyAttempt(models.Model):
     """
     Registra los intentos de completar una encuesta. Se usa para validar si el usuario cumple con los requisitos mínimos.
+
+    Un intento en borrador (`draft`) guarda las respuestas a medida que el participante avanza;
+    al finalizarlo pasa a `completed` sin reescribir sus respuestas.
     """
+    STATUS_DRAFT = 'draft'
+    STATUS_COMPLETED = 'completed'
+
+    STATUS_CHOICES = [
+        (STATUS_DRAFT, 'Borrador'),
+        (STATUS_COMPLETED, 'Finalizado'),
+    ]
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name='survey_attempts',
         help_text="Usuario que intentó completar la encuesta."
     )
+    # Sin índice propio: lo cubre el prefijo de `attempt_survey_id_idx`
     survey = models.ForeignKey(
-        'app_diversa.Survey', on_delete=models.CASCADE, related_name='attempts',
+        'app_diversa.Survey', on_delete=models.CASCADE, related_name='attempts', db_index=False,
         help_text="Encuesta que el usuario intentó completar."
     )
     has_lived_in_colombia = models.BooleanField(
@@ -74,6 +99,43 @@ class SurveyAttempt(models.Model):
         auto_now_add=True,
         help_text="Fecha y hora en que se registró el intento de la encuesta."
     )
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_COMPLETED,
+        help_text="Estado del intento: borrador (respuestas en curso) o finalizado."
+    )
+    idempotency_key = models.CharField(
+        max_length=255, null=True, blank=True,
+        help_text="Valor del encabezado `Idempotency-Key` del envío que creó el intento. Los reintentos con la misma llave devuelven el resultado guardado."
+    )
+    result_status = models.PositiveSmallIntegerField(
+        null=True, blank=True,
+        help_text="Código HTTP devuelto al crear el intento; se repite en los reintentos."
+    )
+    result_payload = models.JSONField(
+        null=True, blank=True,
+        help_text="Cuerpo de la respuesta devuelta al crear el intento; se repite en los reintentos."
+    )
+    idempotency_body_hash = models.CharField(
+        max_length=64, null=True, blank=True,
+        help_text="SHA-256 del cuerpo del envío que creó el intento; un reintento con la misma llave y otro cuerpo se rechaza."
+    )
+
+    class Meta:
+        indexes = [
+            # Último intento de un usuario en una encuesta (reanudación de borradores)
+            models.Index(fields=['user', 'survey', '-created_at'], name='attempt_user_survey_idx'),
+            # Cursor de la paginación del listado (`CreatedAtCursorPagination`)
+            models.Index(fields=['created_at', 'id'], name='attempt_created_id_idx'),
+            # Intentos de una encuesta en orden de id (exportación ancha por bloques, `last_attempt_id`)
+            models.Index(fields=['survey', 'id'], name='attempt_survey_id_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='surveyattempt_user_idempotency_key',
+            ),
+        ]
 
     def is_valid_participant(self):
         """Valida si el usuario cumple con los requisitos mínimos."""
@@ -409,17 +471,20 @@ class Response(models.Model):
         related_name='responses',
         help_text="Usuario que proporcionó esta respuesta."
     )
+    # Sin índice propio: lo cubre el prefijo de la restricción `response_attempt_answer_key`
     survey_attempt = models.ForeignKey(
         SurveyAttempt,
         on_delete=models.CASCADE,
         related_name='responses',
-        null=True, blank=True,
+        null=True, blank=True, db_index=False,
         help_text="Intento de la encuesta asociado a esta respuesta."
     )
+    # Sin índice propio: lo cubre el prefijo de `response_question_option_idx`
     question = models.ForeignKey(
         'Question',
         on_delete=models.CASCADE,
         related_name='responses',
+        db_index=False,
         help_text="Pregunta a la que corresponde esta respuesta."
     )
     subquestion = models.ForeignKey(
@@ -429,16 +494,23 @@ class Response(models.Model):
         null=True, blank=True,
         help_text="Subpregunta a la que corresponde esta respuesta. Puede ser nulo si la respuesta es para una pregunta principal."
     )
+    subquestion_key = models.GeneratedField(
+        expression=Coalesce('subquestion', 0),
+        output_field=models.PositiveIntegerField(),
+        db_persist=True,
+        help_text="Id de la subpregunta, o 0 si la respuesta es de la pregunta principal. Forma parte de la llave única de la respuesta en el intento."
+    )
     country = models.ForeignKey(
         Country,
         on_delete=models.SET_NULL,
         blank=True, null=True,
         help_text="País seleccionado."
     )
+    # Sin índice propio: lo cubre el prefijo de `response_geo_idx`
     department = models.ForeignKey(
         Department,
         on_delete=models.SET_NULL,
-        blank=True, null=True,
+        blank=True, null=True, db_index=False,
         help_text="Departamento seleccionado."
     )
     municipality = models.ForeignKey(
@@ -542,22 +614,46 @@ class Response(models.Model):
         super().clean()
 
 
-    def save(self, *args, **kwargs):
+    def normalize_texts(self):
         """
-        Refuerzo de validación en `save()`, asegurando que no se guarden `response_text` y `response_number` al mismo tiempo.
+        Calcula los campos normalizados (minúsculas y sin tildes) de `response_text` y `other_text`.
+        Se invoca desde `save()` y desde la inserción masiva, que no pasa por `save()`.
         """
-        
         if self.other_text:
             self.normalized_other_text = unidecode(self.other_text.lower())
         if self.response_text:
             self.normalized_response_text = unidecode(self.response_text.lower())
 
+    def save(self, *args, **kwargs):
+        """
+        Refuerzo de validación en `save()`, asegurando que no se guarden `response_text` y `response_number` al mismo tiempo.
+        """
+        self.normalize_texts()
+
         super().save(*args, **kwargs)  # Guarda el objeto primero
 
         # Validación post-guardado para preguntas múltiples
         if self.question.question_type == 'multiple' and not self.options_multiple_selected.exists():
             raise ValidationError("Debe seleccionar al menos una opción para preguntas de selección múltiple.")
 
+    class Meta:
+        indexes = [
+            # Cursor de las exportaciones incrementales (`since`)
+            models.Index(fields=['updated_at', 'id'], name='response_updated_id_idx'),
+            # Cursor de la paginación del listado (`CreatedAtCursorPagination`)
+            models.Index(fields=['created_at', 'id'], name='response_created_id_idx'),
+            # Conteos por opción de una pregunta (tabulación); incluye el intento para no leer la tabla
+            models.Index(fields=['question', 'option_selected', 'survey_attempt'], name='response_question_option_idx'),
+            # Filtros geográficos del admin y tablas cruzadas por departamento
+            models.Index(fields=['department', 'municipality'], name='response_geo_idx'),
+        ]
+        constraints = [
+            # Una respuesta por pregunta (y subpregunta) en cada intento; es la llave de los upserts de borradores
+            models.UniqueConstraint(
+                fields=['survey_attempt', 'question', 'subquestion_key'], name='response_attempt_answer_key'
+            ),
+        ]
+
     def __str__(self):
         return f"Respuesta de {self.user} a {self.question.text_question}" + (f" - {self.subquestion.text_subquestion}" if self.subquestion else "")
 
@@ -602,3 +698,311 @@ class SystemMessage(models.Model):
     def __str__(self):
         return self.key
 
+
+
+class ExportJob(models.Model):
+    """
+    Exportación de respuestas solicitada por un usuario y procesada fuera de la petición web
+    por `python manage.py run_export_worker`. La tabla funciona como cola: el worker toma los
+    trabajos pendientes en orden de creación.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_EXPIRED = 'expired'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En proceso'),
+        (STATUS_DONE, 'Terminado'),
+        (STATUS_FAILED, 'Fallido'),
+        (STATUS_EXPIRED, 'Expirado'),
+    ]
+    FORMAT_CHOICES = [('csv', 'CSV'), ('xls', 'XLS'), ('pdf', 'PDF')]
+    LAYOUT_CHOICES = [('long', 'Una fila por respuesta'), ('wide', 'Una fila por intento')]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='export_jobs',
+        help_text="Usuario que solicitó la exportación."
+    )
+    export_format = models.CharField(
+        max_length=10, choices=FORMAT_CHOICES,
+        help_text="Formato del archivo a generar."
+    )
+    layout = models.CharField(
+        max_length=10, choices=LAYOUT_CHOICES, default='long',
+        help_text="Disposición de la exportación: larga (por respuesta) o ancha (por intento)."
+    )
+    survey = models.ForeignKey(
+        Survey, on_delete=models.CASCADE, null=True, blank=True, related_name='export_jobs',
+        help_text="Encuesta a exportar. Obligatoria en la disposición ancha."
+    )
+    since = models.CharField(
+        max_length=64, blank=True, default='',
+        help_text="Cursor `since` (fecha ISO de `updated_at`, opcionalmente `,<id>`) para exportar solo lo nuevo o modificado."
+    )
+    since_id = models.PositiveBigIntegerField(
+        null=True, blank=True,
+        help_text="Cursor `since_id` para exportar solo los registros con id mayor."
+    )
+    next_cursor = models.CharField(
+        max_length=64, blank=True, default='',
+        help_text="Cursor a usar en la siguiente exportación incremental."
+    )
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING,
+        help_text="Estado del trabajo."
+    )
+    file_path = models.CharField(
+        max_length=500, blank=True, default='',
+        help_text="Ruta del archivo generado dentro de `EXPORT_SPOOL_DIR`."
+    )
+    row_count = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Número de filas exportadas."
+    )
+    size_bytes = models.PositiveBigIntegerField(
+        null=True, blank=True,
+        help_text="Tamaño del archivo generado, en bytes."
+    )
+    elapsed_seconds = models.FloatField(
+        null=True, blank=True,
+        help_text="Tiempo que tomó generar el archivo, en segundos."
+    )
+    error = models.TextField(
+        blank=True, default='',
+        help_text="Mensaje de error si el trabajo falló."
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha y hora en que se solicitó la exportación."
+    )
+    started_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Fecha y hora en que el worker empezó el trabajo."
+    )
+    finished_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Fecha y hora en que terminó el trabajo."
+    )
+    expires_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Fecha y hora a partir de la cual el archivo se elimina."
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx'),
+        ]
+
+    @property
+    def filename(self):
+        suffix = f"_wide_{self.survey_id}" if self.layout == 'wide' else ''
+        return f"responses{suffix}.{self.export_format}"
+
+    def __str__(self):
+        return f"Exportación {self.id} ({self.export_format}) - {self.status}"
+
+
+class ResponseSummary(models.Model):
+    """
+    Contador materializado de respuestas de intentos aceptados, por
+    (encuesta, pregunta, subpregunta, opción, departamento).
+
+    Las llaves opcionales son enteros con 0 como "sin valor" (y no llaves foráneas nulas), para
+    que la restricción única aplique también a ellas. Las filas con `option_key = 0` cuentan
+    respuestas; las demás, selecciones de cada opción. Se mantiene desde `SubmitResponseView`
+    (ver `app_diversa.summaries`), se recalcula por encuesta cuando queda marcada en
+    `StaleResponseSummary` y se reconstruye completo con `rebuild_response_summaries`.
+    """
+    survey = models.ForeignKey(
+        Survey, on_delete=models.CASCADE, related_name='response_summaries',
+        help_text="Encuesta del intento."
+    )
+    question = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name='response_summaries',
+        help_text="Pregunta respondida."
+    )
+    subquestion_key = models.PositiveIntegerField(
+        default=0, help_text="Id de la subpregunta, o 0 si la respuesta no es de una subpregunta."
+    )
+    option_key = models.PositiveIntegerField(
+        default=0, help_text="Id de la opción seleccionada, o 0 para el total de respuestas."
+    )
+    department_key = models.PositiveIntegerField(
+        default=0, help_text="Id del departamento informado en el intento, o 0 si no hay."
+    )
+    count = models.BigIntegerField(
+        default=0, help_text="Número de respuestas o selecciones."
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['survey', 'question', 'subquestion_key', 'option_key', 'department_key'],
+                name='response_summary_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Resumen P{self.question_id} S{self.subquestion_key} O{self.option_key} D{self.department_key}: {self.count}"
+
+
+class StaleResponseSummary(models.Model):
+    """
+    Encuesta cuyos contadores `ResponseSummary` dejaron de coincidir con `Response` porque se
+    eliminó o editó una respuesta o un intento fuera del flujo de envío (admin, cascadas). La
+    siguiente lectura de la tabulación recalcula los contadores de la encuesta y borra la marca.
+    Es un id y no una llave foránea: la marca puede crearse mientras se elimina la encuesta.
+    """
+    survey_id = models.PositiveBigIntegerField(
+        unique=True, help_text="Id de la encuesta con los contadores desactualizados."
+    )
+    marked_at = models.DateTimeField(
+        auto_now_add=True, help_text="Fecha y hora en que se marcó la encuesta."
+    )
+
+    def __str__(self):
+        return f"Contadores desactualizados - Encuesta {self.survey_id}"
+
+
+class EligibilityRule(models.Model):
+    """
+    Requisito que debe cumplir un participante para responder una encuesta. Las reglas activas
+    de cada encuesta se compilan en su `SurveySchema` y se evalúan en memoria, en orden, antes
+    de guardar cualquier respuesta (ver `app_diversa.eligibility`). Las preguntas con reglas son
+    preguntas de tamizaje: sus respuestas no se guardan como `Response`.
+    """
+    RULE_REJECT_OPTION = 'reject_option'
+    RULE_MIN_AGE = 'min_age'
+
+    RULE_TYPE_CHOICES = [
+        (RULE_REJECT_OPTION, 'Rechaza si se selecciona la opción'),
+        (RULE_MIN_AGE, 'Edad mínima según la fecha de nacimiento'),
+    ]
+
+    survey = models.ForeignKey(
+        Survey, on_delete=models.CASCADE, related_name='eligibility_rules',
+        help_text="Encuesta a la que aplica la regla."
+    )
+    rule_type = models.CharField(
+        max_length=20, choices=RULE_TYPE_CHOICES,
+        help_text="Tipo de regla."
+    )
+    question = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name='eligibility_rules',
+        help_text="Pregunta de tamizaje evaluada por la regla."
+    )
+    option = models.ForeignKey(
+        Option, on_delete=models.CASCADE, null=True, blank=True, related_name='eligibility_rules',
+        help_text="Opción que rechaza al participante. Solo para reglas de opción."
+    )
+    min_age = models.PositiveSmallIntegerField(
+        null=True, blank=True,
+        help_text="Edad mínima en años. Solo para reglas de edad; la pregunta debe pedir la fecha de nacimiento (YYYY-MM-DD)."
+    )
+    missing_message = models.CharField(
+        max_length=255, default="Debe responder las preguntas de requisitos.",
+        help_text="Mensaje devuelto si falta la respuesta a la pregunta de la regla."
+    )
+    rejection_message = models.CharField(
+        max_length=255, default="No cumple con los requisitos para la encuesta.",
+        help_text="Mensaje devuelto al participante rechazado."
+    )
+    rejection_note = models.CharField(
+        max_length=255, default="El usuario no cumple con los requisitos de la encuesta.",
+        help_text="Nota guardada en el intento rechazado. En las reglas de edad puede incluir `{age}`."
+    )
+    order = models.PositiveIntegerField(
+        default=0,
+        help_text="Orden de evaluación de la regla dentro de la encuesta."
+    )
+    is_active = models.BooleanField(
+        default=True,
+        help_text="Indica si la regla se evalúa."
+    )
+
+    class Meta:
+        ordering = ['survey', 'order', 'id']
+
+    def clean(self):
+        if self.question_id and self.survey_id and self.question.survey_id != self.survey_id:
+            raise ValidationError("La pregunta debe pertenecer a la encuesta de la regla.")
+        if self.rule_type == self.RULE_REJECT_OPTION:
+            if not self.option:
+                raise ValidationError("Las reglas de opción requieren la opción que rechaza.")
+            if self.option.question_id != self.question_id:
+                raise ValidationError("La opción debe pertenecer a la pregunta de la regla.")
+        if self.rule_type == self.RULE_MIN_AGE and self.min_age is None:
+            raise ValidationError("Las reglas de edad requieren la edad mínima.")
+
+    def __str__(self):
+        return f"Regla {self.get_rule_type_display()} - Encuesta {self.survey_id} - Pregunta {self.question_id}"
+
+
+class DefinitionTombstone(models.Model):
+    """
+    Registro de un elemento eliminado de la definición de una encuesta (capítulo, pregunta,
+    subpregunta, opción o texto). Junto con `updated_at`, permite a los clientes sincronizar
+    solo los cambios (ver `app_diversa.definition_changes`).
+    """
+    survey_id = models.PositiveIntegerField(
+        help_text="Id de la encuesta a la que pertenecía el elemento."
+    )
+    model_name = models.CharField(
+        max_length=30,
+        help_text="Tipo de elemento eliminado (chapters, questions, subquestions, options o texts)."
+    )
+    object_id = models.PositiveIntegerField(
+        help_text="Id del elemento eliminado."
+    )
+    deleted_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha y hora de la eliminación."
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['survey_id', 'deleted_at'], name='tombstone_survey_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"Eliminado {self.model_name} {self.object_id} - Encuesta {self.survey_id}"
+
+
+class ArchivedResponse(models.Model):
+    """
+    Copia de una respuesta retirada de `Response` al crear la llave única
+    `response_attempt_answer_key` (migración 0028): cuando un intento tenía varias respuestas
+    a la misma pregunta y subpregunta, se conservó la más reciente y las demás se guardaron aquí
+    con todos sus campos y sus opciones múltiples. Revertir la migración las restaura.
+    """
+    response_id = models.PositiveBigIntegerField(
+        help_text="Id que tenía la respuesta en `Response`."
+    )
+    survey_attempt_id = models.PositiveBigIntegerField(
+        help_text="Id del intento de la respuesta."
+    )
+    question_id = models.PositiveBigIntegerField(
+        help_text="Id de la pregunta de la respuesta."
+    )
+    subquestion_key = models.PositiveIntegerField(
+        help_text="Id de la subpregunta, o 0 si la respuesta es de la pregunta principal."
+    )
+    kept_response_id = models.PositiveBigIntegerField(
+        help_text="Id de la respuesta que se conservó para la misma llave."
+    )
+    data = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        help_text="Campos de la fila original y sus opciones múltiples (`options_multiple_selected`)."
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Fecha y hora en que se retiró la respuesta."
+    )
+
+    def __str__(self):
+        return f"Respuesta archivada {self.response_id} - Intento {self.survey_attempt_id}"
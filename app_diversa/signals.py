@@ -0,0 +1,192 @@
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete, pre_save
+from .models import Survey, Chapter, Question, SubQuestion, Option, SurveyText, Response, SurveyAttempt, EligibilityRule, DefinitionTombstone, StaleResponseSummary
+from .definition_changes import DEFINITION_FEEDS, feed_name
+from .summaries import mark_summaries_stale
+from .survey_schema import survey_schemas
+from .tabulation import bump_tabulation_version
+
+# Modelos que forman la definición de una encuesta
+DEFINITION_MODELS = (Survey, Chapter, Question, SubQuestion, Option, EligibilityRule)
+
+# Modelos cuyo contenido forma parte del documento publicado de una encuesta
+CONTENT_MODELS = (Survey, Chapter, Question, SubQuestion, Option, SurveyText)
+
+# Campos de `SurveyAttempt` que cambian lo que el intento aporta a `ResponseSummary`
+SUMMARY_ATTEMPT_FIELDS = {'status', 'survey'}
+
+
+def invalidate_survey_schemas(sender, **kwargs):
+    """
+    Descarta las definiciones compiladas cuando cambia cualquier parte de una encuesta.
+    """
+    survey_schemas.invalidate()
+
+
+def get_affected_survey_ids(instance):
+    """
+    Devuelve los ids de las encuestas cuyo contenido incluye `instance`.
+    """
+    if isinstance(instance, Survey):
+        return {instance.pk}
+    if isinstance(instance, (Chapter, Question, SurveyText)):
+        return {instance.survey_id}
+    if isinstance(instance, SubQuestion):
+        return set(Question.objects.filter(pk=instance.parent_question_id).values_list('survey_id', flat=True))
+    if isinstance(instance, Option):
+        survey_ids = set()
+        if instance.question_id:
+            survey_ids.update(Question.objects.filter(pk=instance.question_id).values_list('survey_id', flat=True))
+        if instance.subquestion_id:
+            survey_ids.update(
+                SubQuestion.objects.filter(pk=instance.subquestion_id).values_list('parent_question__survey_id', flat=True)
+            )
+        return survey_ids
+    return set()
+
+
+def bump_content_version(sender, instance, **kwargs):
+    """
+    Incrementa `Survey.content_version` de las encuestas afectadas por el cambio.
+    Se usa `update()` para no volver a disparar `post_save` sobre `Survey`; si el cambio es de
+    la propia encuesta, se relee la versión para que la instancia no quede con la anterior.
+    """
+    survey_ids = get_affected_survey_ids(instance) - {None}
+    if survey_ids:
+        Survey.objects.filter(pk__in=survey_ids).update(content_version=F('content_version') + 1)
+        if isinstance(instance, Survey) and kwargs['signal'] is post_save:
+            instance.refresh_from_db(fields=['content_version'])
+
+
+def record_definition_tombstone(sender, instance, **kwargs):
+    """
+    Registra la eliminación de un elemento de la definición para la sincronización incremental.
+    Se conecta a `pre_delete`: en las eliminaciones en cascada el padre puede borrarse antes que
+    sus hijos, y entonces ya no se podría resolver la encuesta de estos.
+    """
+    DefinitionTombstone.objects.bulk_create([
+        DefinitionTombstone(survey_id=survey_id, model_name=feed_name(sender), object_id=instance.pk)
+        for survey_id in get_affected_survey_ids(instance) - {None}
+    ])
+
+
+def _pending_for_deletion(origin, survey_ids, attribute):
+    """
+    En una eliminación las señales llegan una vez por fila, también por cada fila de una cascada,
+    todas con el mismo `origin` (la instancia o el queryset sobre el que se llamó `delete()`).
+    Devuelve solo las encuestas aún no procesadas en esa eliminación, recordándolas en `origin`,
+    así una cascada de miles de respuestas marca cada encuesta una vez. Si lo que se elimina es
+    la propia encuesta, no queda nada que marcar.
+    """
+    survey_ids = set(survey_ids) - {None}
+    if origin is None:
+        return survey_ids
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if issubclass(origin_model, Survey):
+        return set()
+    processed = getattr(origin, attribute, None)
+    if processed is None:
+        processed = set()
+        setattr(origin, attribute, processed)
+    survey_ids -= processed
+    processed.update(survey_ids)
+    return survey_ids
+
+
+def invalidate_tabulations(sender, instance, origin=None, **kwargs):
+    """
+    Invalida las tabulaciones de la encuesta al guardar o eliminar una respuesta, una vez
+    confirmada la transacción. Las inserciones masivas lo hacen en `bulk_insert_responses`.
+    """
+    schema = survey_schemas.for_question(instance.question_id)
+    if schema is None:
+        return
+    survey_ids = _pending_for_deletion(origin, [schema.survey_id], '_tabulation_survey_ids')
+    if survey_ids:
+        transaction.on_commit(lambda: bump_tabulation_version(survey_ids))
+
+
+def mark_response_summaries_stale(sender, instance, origin=None, **kwargs):
+    """
+    Marca los contadores de la encuesta al guardar o eliminar una respuesta de un intento fuera
+    del flujo de envío, que inserta en bloque y suma en `record_attempt_responses`.
+    """
+    if instance.survey_attempt_id is None:
+        return
+    schema = survey_schemas.for_question(instance.question_id)
+    if schema is not None:
+        mark_summaries_stale(_pending_for_deletion(origin, [schema.survey_id], '_summary_survey_ids'))
+
+
+def mark_selection_summaries_stale(sender, instance, action, reverse, **kwargs):
+    """
+    Marca los contadores al cambiar las opciones múltiples de una respuesta (o las respuestas
+    de una opción, si el cambio se hace desde `Option`).
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        mark_summaries_stale(get_affected_survey_ids(instance))
+    else:
+        mark_response_summaries_stale(sender, instance)
+
+
+def remember_attempt_survey(sender, instance, update_fields=None, **kwargs):
+    """
+    Guarda la encuesta anterior de un intento existente para marcar también sus contadores si cambia.
+    """
+    if instance.pk is not None and (update_fields is None or 'survey' in update_fields):
+        instance._previous_survey_id = (
+            SurveyAttempt.objects.filter(pk=instance.pk).values_list('survey_id', flat=True).first()
+        )
+
+
+def mark_attempt_summaries_stale(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Marca los contadores al editar el estado o la encuesta de un intento existente.
+    """
+    if created or (update_fields is not None and not SUMMARY_ATTEMPT_FIELDS & set(update_fields)):
+        return
+    mark_summaries_stale({instance.survey_id, getattr(instance, '_previous_survey_id', None)})
+
+
+def mark_deleted_attempt_summaries_stale(sender, instance, origin=None, **kwargs):
+    """
+    Marca los contadores al eliminar un intento finalizado (los borradores no se cuentan).
+    """
+    if instance.status == SurveyAttempt.STATUS_COMPLETED:
+        mark_summaries_stale(_pending_for_deletion(origin, [instance.survey_id], '_summary_survey_ids'))
+
+
+def discard_survey_summary_mark(sender, instance, **kwargs):
+    """
+    Quita la marca de una encuesta eliminada; sus contadores se eliminan en cascada.
+    """
+    StaleResponseSummary.objects.filter(survey_id=instance.pk).delete()
+
+
+for model in DEFINITION_MODELS:
+    post_save.connect(invalidate_survey_schemas, sender=model, dispatch_uid=f"survey_schema_save_{model.__name__}")
+    post_delete.connect(invalidate_survey_schemas, sender=model, dispatch_uid=f"survey_schema_delete_{model.__name__}")
+
+for model in CONTENT_MODELS:
+    post_save.connect(bump_content_version, sender=model, dispatch_uid=f"content_version_save_{model.__name__}")
+    post_delete.connect(bump_content_version, sender=model, dispatch_uid=f"content_version_delete_{model.__name__}")
+
+for model, _ in DEFINITION_FEEDS.values():
+    pre_delete.connect(record_definition_tombstone, sender=model, dispatch_uid=f"tombstone_delete_{model.__name__}")
+
+post_save.connect(invalidate_tabulations, sender=Response, dispatch_uid="tabulation_response_save")
+post_delete.connect(invalidate_tabulations, sender=Response, dispatch_uid="tabulation_response_delete")
+
+post_save.connect(mark_response_summaries_stale, sender=Response, dispatch_uid="summary_response_save")
+post_delete.connect(mark_response_summaries_stale, sender=Response, dispatch_uid="summary_response_delete")
+m2m_changed.connect(
+    mark_selection_summaries_stale, sender=Response.options_multiple_selected.through,
+    dispatch_uid="summary_response_options"
+)
+pre_save.connect(remember_attempt_survey, sender=SurveyAttempt, dispatch_uid="summary_attempt_pre_save")
+post_save.connect(mark_attempt_summaries_stale, sender=SurveyAttempt, dispatch_uid="summary_attempt_save")
+post_delete.connect(mark_deleted_attempt_summaries_stale, sender=SurveyAttempt, dispatch_uid="summary_attempt_delete")
+post_delete.connect(discard_survey_summary_mark, sender=Survey, dispatch_uid="summary_survey_delete")
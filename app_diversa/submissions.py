@@ -0,0 +1,330 @@
+"""
+Registro de un intento completo de encuesta: tamizaje, creación del `SurveyAttempt` y guardado
+masivo de sus respuestas.
+
+Lo usan el envío individual (`SubmitResponseView`) y el envío por lotes de los dispositivos de
+campo (`SubmitResponseBatchView`). Cada intento se procesa en su propia transacción, así que en
+un lote los intentos inválidos no afectan a los demás.
+
+Los borradores (`submit_attempt(..., draft=True)`, `save_draft_answers`, `finalize_draft`)
+pasan el tamizaje al crearse, guardan las respuestas a medida que cambian (upsert por
+pregunta y subpregunta) y al finalizar solo cambian de estado y suman sus respuestas a los
+contadores de tabulación.
+"""
+from dataclasses import dataclass
+from django.db import transaction
+from rest_framework.serializers import ValidationError as DRFValidationError
+from . import idempotency
+from .eligibility import EligibilityError, evaluate_eligibility
+from .models import Response, SurveyAttempt
+from .summaries import record_attempt_responses
+from .survey_schema import survey_schemas
+from .v1.serializers import ResponseSerializer
+
+SUCCESS_NOTE = "Encuesta diligenciada con éxito"
+SUCCESS_PAYLOAD = {"message": "Respuestas guardadas exitosamente."}
+DRAFT_MESSAGE = "Borrador creado."
+
+
+class SubmissionError(Exception):
+    """
+    Envío inválido. Si se lanza después de crear el intento, la transacción lo revierte.
+    """
+
+    def __init__(self, payload, status):
+        super().__init__(next(iter(payload.values())))
+        self.payload = payload
+        self.status = status
+
+
+@dataclass(frozen=True)
+class SubmissionResult:
+    status: int
+    payload: dict
+    replayed: bool = False
+
+
+def _replay(result, request_hash):
+    if result is None:
+        return SubmissionResult(409, {"error": "Ya hay un envío en proceso con esta Idempotency-Key."})
+    result_status, result_payload, stored_hash = result
+    # Los intentos guardados antes de registrar el hash no se comparan
+    if stored_hash is not None and stored_hash != request_hash:
+        return SubmissionResult(422, {"error": "La Idempotency-Key ya se usó con un envío diferente."})
+    return SubmissionResult(result_status, result_payload, replayed=True)
+
+
+def _draft_payload(attempt):
+    return {"message": DRAFT_MESSAGE, "attempt_id": attempt.id, "status": attempt.status}
+
+
+def _get_schema(survey_id, schemas):
+    """
+    Busca la definición compilada de la encuesta, reutilizando las ya usadas en el mismo lote.
+    """
+    if schemas is None:
+        return survey_schemas.get(survey_id)
+    if survey_id not in schemas:
+        schemas[survey_id] = survey_schemas.get(survey_id)
+    return schemas[survey_id]
+
+
+def _validate_items(data):
+    if not isinstance(data, list):
+        raise SubmissionError({"error": "El cuerpo de la solicitud debe ser una lista de respuestas."}, 400)
+
+    # Validar que cada elemento de `data` contenga `question_id`
+    for idx, item in enumerate(data):
+        if not isinstance(item, dict):
+            raise SubmissionError({"error": f"Cada respuesta debe ser un objeto JSON. Error en índice {idx}."}, 400)
+        if "question_id" not in item:
+            raise SubmissionError(
+                {"error": f"Cada respuesta debe contener 'question_id'. Faltante en índice {idx}."}, 400
+            )
+
+
+def _prepare_responses(data, schema, user, survey_attempt):
+    """
+    Ajusta las respuestas de la encuesta (sin las de tamizaje) antes de validarlas en lote.
+    """
+    questions = schema.questions
+    options = schema.options
+
+    # Las respuestas de tamizaje no se guardan como respuestas de la encuesta
+    screening_question_ids = schema.screening_question_ids
+    responses_data = [
+        item for item in data if item.get("question_id") and item["question_id"] not in screening_question_ids
+    ]
+
+    for response_data in responses_data:
+        question_id = response_data.get("question_id")
+
+        # Manejo de opciones `is_other`
+        option_selected_id = response_data.get("option_selected")
+        other_text = response_data.get("other_text", "").strip()
+
+        option = None
+        if option_selected_id:
+            option = options.get(option_selected_id)
+
+            if not option:
+                raise SubmissionError({"error": f"La opción con ID {option_selected_id} no existe."}, 400)
+
+            if option.is_other and not other_text:
+                response_data["other_text"] = "Opción Otro sin responder"
+            elif not option.is_other:
+                response_data.pop("other_text", None)
+
+        # Manejo de subpreguntas `is_other`
+        subquestion_id = response_data.get("subquestion_id")
+        if subquestion_id:
+            subquestion = schema.subquestions.get(subquestion_id)
+            if not subquestion:
+                raise SubmissionError({"error": f"La subpregunta con ID {subquestion_id} no existe."}, 404)
+            if subquestion.is_other and not other_text:
+                response_data["other_text"] = "Opción Otro sin responder"
+            elif not subquestion.is_other:
+                response_data.pop("other_text", None)
+
+        # Validación de preguntas tipo matriz
+        question = questions.get(question_id)
+        if not question:
+            raise SubmissionError({"error": f"Pregunta con ID {question_id} no encontrada."}, 400)
+
+        if question.question_type == "matrix" and not subquestion_id:
+            responses_data.append({
+                "user": user.id,
+                "survey_attempt": survey_attempt.id,
+                "question": question_id,
+                "subquestion": subquestion_id,
+                "option_selected": option_selected_id,
+                "other_text": other_text if option and option.is_other else None
+            })
+
+    for item in responses_data:
+        item["survey_attempt"] = survey_attempt.id
+    return responses_data
+
+
+def _submit(request, data, idempotency_key, schemas, draft=False, request_hash=None):
+    user = request.user
+    _validate_items(data)
+
+    # Crear diccionario para acceso rápido a respuestas
+    responses_dict = {item["question_id"]: item for item in data}
+
+    survey_id = next((item["survey_id"] for item in data if item.get("survey_id")), None)
+    if not survey_id:
+        raise SubmissionError({"error": "Falta el ID de la encuesta (survey_id)."}, 400)
+
+    # Definición compilada de la encuesta (preguntas, subpreguntas, opciones y reglas en memoria)
+    schema = _get_schema(survey_id, schemas)
+    if schema is None:
+        raise SubmissionError({"error": "Encuesta inválida o no existente."}, 400)
+
+    # Tamizaje con las reglas de elegibilidad de la encuesta, antes de cualquier escritura
+    try:
+        eligibility = evaluate_eligibility(schema, responses_dict)
+    except EligibilityError as e:
+        raise SubmissionError(e.payload, e.status)
+
+    if not eligibility.is_eligible:
+        payload = {"message": eligibility.rejected_by.rejection_message, "rejected": True}
+        attempt, replayed = idempotency.create_attempt(
+            idempotency_key, 200, payload, request_hash, user=user, survey_id=survey_id, **eligibility.attempt_fields()
+        )
+        if attempt is None:
+            return _replay(replayed, request_hash)
+        return SubmissionResult(200, payload)
+
+    if draft:
+        # El borrador ya pasó el tamizaje; sus demás respuestas se guardan a medida que cambian
+        survey_attempt, replayed = idempotency.create_attempt(
+            idempotency_key, 201, _draft_payload, request_hash,
+            user=user, survey_id=survey_id, status=SurveyAttempt.STATUS_DRAFT, **eligibility.attempt_fields()
+        )
+        if survey_attempt is None:
+            return _replay(replayed, request_hash)
+        _save_responses(request, schema, survey_attempt, data, upsert=True)
+        return SubmissionResult(201, _draft_payload(survey_attempt))
+
+    # El resultado se guarda con el intento; si el lote falla, se revierte junto con él
+    survey_attempt, replayed = idempotency.create_attempt(
+        idempotency_key, 201, SUCCESS_PAYLOAD, request_hash,
+        user=user,
+        survey_id=survey_id,
+        success_note=SUCCESS_NOTE,
+        **eligibility.attempt_fields()
+    )
+    if survey_attempt is None:
+        return _replay(replayed, request_hash)
+
+    _save_responses(request, schema, survey_attempt, data)
+    # Contadores de tabulación, en la misma transacción que las respuestas
+    record_attempt_responses(survey_attempt)
+    return SubmissionResult(201, SUCCESS_PAYLOAD)
+
+
+def _save_responses(request, schema, survey_attempt, data, upsert=False):
+    """
+    Valida todo el lote y lo guarda con inserciones masivas, o con upserts en los borradores
+    (ver `ResponseListSerializer`).
+    """
+    responses_data = _prepare_responses(data, schema, request.user, survey_attempt)
+    serializer = ResponseSerializer(
+        data=responses_data, many=True, context={'request': request, 'survey_schema': schema, 'upsert': upsert}
+    )
+    try:
+        serializer.is_valid(raise_exception=True)
+    except DRFValidationError as e:
+        # No se conserva el intento si alguna respuesta del lote es inválida
+        raise SubmissionError({"error": str(e.detail)}, 400)
+    serializer.save()
+    return len(responses_data)
+
+
+def submit_attempt(request, data, idempotency_key=None, schemas=None, draft=False):
+    """
+    Procesa el envío de un intento (`data`, la lista de respuestas) en su propia transacción y
+    devuelve un `SubmissionResult`. Los reintentos con una `idempotency_key` ya usada devuelven el
+    resultado original sin abrir transacción, salvo que `data` sea distinto del primer envío (422).
+    `schemas` es un diccionario opcional para compartir las definiciones de encuesta entre los
+    intentos de un lote. Con `draft=True` el intento aprobado queda en borrador.
+    """
+    request_hash = None
+    if idempotency_key:
+        request_hash = idempotency.body_hash(data)
+        result = idempotency.find_result(request.user.id, idempotency_key)
+        if result is not None:
+            return _replay(result, request_hash)
+
+    try:
+        with transaction.atomic():
+            return _submit(request, data, idempotency_key, schemas, draft=draft, request_hash=request_hash)
+    except SubmissionError as e:
+        return SubmissionResult(e.status, e.payload)
+
+
+def _lock_draft(attempt_id, user):
+    attempt = SurveyAttempt.objects.select_for_update().filter(pk=attempt_id, user=user).first()
+    if attempt is None:
+        raise SubmissionError({"error": "Intento no encontrado."}, 404)
+    if attempt.status != SurveyAttempt.STATUS_DRAFT:
+        raise SubmissionError({"error": "El intento ya fue finalizado."}, 409)
+    schema = survey_schemas.get(attempt.survey_id)
+    if schema is None:
+        raise SubmissionError({"error": "Encuesta inválida o no existente."}, 400)
+    return attempt, schema
+
+
+def save_draft_answers(request, attempt_id, data):
+    """
+    Guarda en el borrador solo las respuestas recibidas, reemplazando las existentes de la misma
+    pregunta y subpregunta.
+    """
+    try:
+        with transaction.atomic():
+            attempt, schema = _lock_draft(attempt_id, request.user)
+            _validate_items(data)
+            saved = _save_responses(request, schema, attempt, data, upsert=True)
+            return SubmissionResult(200, {"attempt_id": attempt.id, "status": attempt.status, "saved": saved})
+    except SubmissionError as e:
+        return SubmissionResult(e.status, e.payload)
+
+
+def finalize_draft(request, attempt_id, data=None):
+    """
+    Finaliza el borrador: guarda las últimas respuestas recibidas (si las hay), cambia el estado
+    sin reescribir las ya guardadas y suma el intento a los contadores de tabulación.
+    """
+    try:
+        with transaction.atomic():
+            attempt, schema = _lock_draft(attempt_id, request.user)
+            if data:
+                _validate_items(data)
+                _save_responses(request, schema, attempt, data, upsert=True)
+            attempt.status = SurveyAttempt.STATUS_COMPLETED
+            attempt.success_note = SUCCESS_NOTE
+            # `update()` sin señales: el intento se suma aquí y no debe marcar los contadores
+            SurveyAttempt.objects.filter(pk=attempt.pk).update(status=attempt.status, success_note=attempt.success_note)
+            record_attempt_responses(attempt)
+            return SubmissionResult(201, SUCCESS_PAYLOAD)
+    except SubmissionError as e:
+        return SubmissionResult(e.status, e.payload)
+
+
+# Campos de `Response` que se devuelven al reanudar, con el nombre usado al enviarlos
+ANSWER_FIELDS = (
+    ('response_text', 'answer'),
+    ('response_number', 'response_number'),
+    ('option_selected_id', 'option_selected'),
+    ('other_text', 'other_text'),
+    ('country_id', 'country'),
+    ('department_id', 'department'),
+    ('municipality_id', 'municipality'),
+)
+
+
+def attempt_answers(attempt_id):
+    """
+    Respuestas de un intento como `{question_id: {subquestion_id: valor}}`, con una consulta a
+    `Response` y otra a la tabla de opciones múltiples. La subpregunta `0` es la pregunta principal
+    y el valor solo incluye los campos con dato, con los mismos nombres que al enviarlos.
+    """
+    rows = Response.objects.filter(survey_attempt_id=attempt_id).order_by('id').values_list(
+        'id', 'question_id', 'subquestion_key', *(field for field, _ in ANSWER_FIELDS)
+    )
+    through_model = Response.options_multiple_selected.through
+    selections = {}
+    for response_id, option_id in through_model.objects.filter(
+        response__survey_attempt_id=attempt_id
+    ).order_by('id').values_list('response_id', 'option_id'):
+        selections.setdefault(response_id, []).append(option_id)
+
+    answers = {}
+    for response_id, question_id, subquestion_key, *values in rows:
+        value = {name: field_value for (_, name), field_value in zip(ANSWER_FIELDS, values) if field_value is not None}
+        if response_id in selections:
+            value['options_multiple_selected'] = selections[response_id]
+        answers.setdefault(question_id, {})[subquestion_key] = value
+    return answers
@@ -0,0 +1,187 @@
+"""
+Mantenimiento de `ResponseSummary`, los contadores materializados de respuestas.
+
+`record_attempt_responses` suma las respuestas de un intento aceptado dentro de la misma
+transacción en que se guardan, y `compute_summary_counts` recalcula los contadores desde
+`Response` (para reconstruirlos o verificarlos). Ambos usan las mismas consultas agregadas,
+así que un intento siempre aporta lo mismo por cualquiera de los dos caminos.
+
+Solo se cuentan respuestas de intentos finalizados (los borradores se suman al finalizarlos).
+El departamento de cada respuesta es el informado en alguna respuesta geográfica del mismo intento.
+
+Las eliminaciones y ediciones fuera del flujo de envío (admin, cascadas) no se restan una a una:
+cambiar una respuesta puede cambiar el departamento de todo su intento, y en una cascada las
+señales llegan por fila. `app_diversa.signals` marca la encuesta con `mark_summaries_stale` (una
+vez por eliminación, aunque sea en cascada) y `refresh_stale_summaries` recalcula sus contadores
+en la siguiente lectura.
+"""
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from .models import Response, ResponseSummary, StaleResponseSummary, SurveyAttempt
+from .tabulation import bump_tabulation_version
+
+SUMMARY_KEY_FIELDS = ('survey_id', 'question_id', 'subquestion_key', 'option_key', 'department_key')
+
+# Máximo de llaves por sentencia UPDATE
+SUMMARY_UPDATE_BATCH_SIZE = 200
+
+
+def _attempt_department(attempt_field):
+    return Subquery(
+        Response.objects.filter(survey_attempt_id=OuterRef(attempt_field), department__isnull=False)
+        .order_by('id').values('department_id')[:1]
+    )
+
+
+def compute_summary_counts(responses=None):
+    """
+    Calcula con tres consultas `GROUP BY` los contadores de las respuestas dadas (por defecto,
+    todas las de intentos finalizados). Devuelve un `Counter` con llaves en el orden de
+    `SUMMARY_KEY_FIELDS`.
+    """
+    if responses is None:
+        responses = Response.objects.all()
+    responses = responses.filter(survey_attempt__status=SurveyAttempt.STATUS_COMPLETED)
+    through_model = Response.options_multiple_selected.through
+    selections = through_model.objects.filter(response__in=responses.values('id'))
+
+    counts = Counter()
+
+    answered = responses.annotate(attempt_department=_attempt_department('survey_attempt_id')).values(
+        'survey_attempt__survey_id', 'question_id', 'subquestion_id', 'attempt_department'
+    ).annotate(total=Count('id')).order_by()
+    for row in answered:
+        counts[(row['survey_attempt__survey_id'], row['question_id'], row['subquestion_id'] or 0, 0,
+                row['attempt_department'] or 0)] += row['total']
+
+    single = responses.filter(option_selected__isnull=False).annotate(
+        attempt_department=_attempt_department('survey_attempt_id')
+    ).values(
+        'survey_attempt__survey_id', 'question_id', 'subquestion_id', 'option_selected_id', 'attempt_department'
+    ).annotate(total=Count('id')).order_by()
+    for row in single:
+        counts[(row['survey_attempt__survey_id'], row['question_id'], row['subquestion_id'] or 0,
+                row['option_selected_id'], row['attempt_department'] or 0)] += row['total']
+
+    multiple = selections.annotate(attempt_department=_attempt_department('response__survey_attempt_id')).values(
+        'response__survey_attempt__survey_id', 'response__question_id', 'response__subquestion_id',
+        'option_id', 'attempt_department'
+    ).annotate(total=Count('id')).order_by()
+    for row in multiple:
+        counts[(row['response__survey_attempt__survey_id'], row['response__question_id'],
+                row['response__subquestion_id'] or 0, row['option_id'], row['attempt_department'] or 0)] += row['total']
+
+    return counts
+
+
+def apply_summary_counts(counts):
+    """
+    Suma (o resta, con valores negativos) los contadores dados a `ResponseSummary`.
+    Las filas que faltan se crean con `ignore_conflicts` y los incrementos se aplican con
+    `F('count') + n`, agrupando en una sola sentencia las llaves con el mismo incremento.
+    """
+    counts = {key: delta for key, delta in counts.items() if delta}
+    if not counts:
+        return
+
+    ResponseSummary.objects.bulk_create(
+        [ResponseSummary(**dict(zip(SUMMARY_KEY_FIELDS, key))) for key in counts],
+        ignore_conflicts=True,
+        batch_size=SUMMARY_UPDATE_BATCH_SIZE,
+    )
+
+    keys_by_delta = defaultdict(list)
+    for key, delta in counts.items():
+        keys_by_delta[delta].append(key)
+    for delta, keys in keys_by_delta.items():
+        for start in range(0, len(keys), SUMMARY_UPDATE_BATCH_SIZE):
+            condition = reduce(or_, (
+                Q(**dict(zip(SUMMARY_KEY_FIELDS, key))) for key in keys[start:start + SUMMARY_UPDATE_BATCH_SIZE]
+            ))
+            ResponseSummary.objects.filter(condition).update(count=F('count') + delta)
+
+
+def record_attempt_responses(attempt):
+    """
+    Suma a los contadores las respuestas de un intento recién guardado.
+    Debe llamarse dentro de la transacción que guarda las respuestas.
+    """
+    apply_summary_counts(compute_summary_counts(Response.objects.filter(survey_attempt_id=attempt.id)))
+    transaction.on_commit(lambda: bump_tabulation_version([attempt.survey_id]))
+
+
+def mark_summaries_stale(survey_ids):
+    """
+    Marca los contadores de las encuestas como desactualizados e invalida sus tabulaciones.
+    """
+    survey_ids = set(survey_ids) - {None}
+    if not survey_ids:
+        return
+    StaleResponseSummary.objects.bulk_create(
+        [StaleResponseSummary(survey_id=survey_id) for survey_id in survey_ids], ignore_conflicts=True
+    )
+    transaction.on_commit(lambda: bump_tabulation_version(survey_ids))
+
+
+def refresh_stale_summaries(survey_id):
+    """
+    Si la encuesta está marcada, recalcula sus contadores desde `Response` y quita la marca.
+    Sin marca cuesta una consulta.
+    """
+    if not StaleResponseSummary.objects.filter(survey_id=survey_id).exists():
+        return
+    with transaction.atomic():
+        # El DELETE bloquea la marca: si otra petición los recalculó mientras tanto, no borra nada
+        if not StaleResponseSummary.objects.filter(survey_id=survey_id).delete()[0]:
+            return
+        counts = compute_summary_counts(Response.objects.filter(survey_attempt__survey_id=survey_id))
+        ResponseSummary.objects.filter(survey_id=survey_id).delete()
+        ResponseSummary.objects.bulk_create(
+            [ResponseSummary(count=total, **dict(zip(SUMMARY_KEY_FIELDS, key))) for key, total in counts.items()],
+            batch_size=SUMMARY_UPDATE_BATCH_SIZE,
+        )
+
+
+def summary_table_counts():
+    """
+    Contadores actualmente guardados en `ResponseSummary`, sin las filas en cero.
+    """
+    return Counter({
+        row[:-1]: row[-1]
+        for row in ResponseSummary.objects.exclude(count=0).values_list(*SUMMARY_KEY_FIELDS, 'count')
+    })
+
+
+def rebuild_response_summaries():
+    """
+    Reconstruye `ResponseSummary` desde `Response`. Devuelve el número de filas creadas.
+    """
+    with transaction.atomic():
+        counts = compute_summary_counts()
+        survey_ids = set(ResponseSummary.objects.values_list('survey_id', flat=True).distinct())
+        survey_ids.update(key[0] for key in counts)
+        ResponseSummary.objects.all().delete()
+        StaleResponseSummary.objects.all().delete()
+        ResponseSummary.objects.bulk_create(
+            [ResponseSummary(count=total, **dict(zip(SUMMARY_KEY_FIELDS, key))) for key, total in counts.items()],
+            batch_size=SUMMARY_UPDATE_BATCH_SIZE,
+        )
+        transaction.on_commit(lambda: bump_tabulation_version(survey_ids))
+    return len(counts)
+
+
+def verify_response_summaries():
+    """
+    Compara `ResponseSummary` con un recálculo completo.
+    Devuelve `{llave: (guardado, esperado)}` con las diferencias encontradas.
+    """
+    expected = compute_summary_counts()
+    stored = summary_table_counts()
+    return {
+        key: (stored.get(key, 0), expected.get(key, 0))
+        for key in set(expected) | set(stored)
+        if stored.get(key, 0) != expected.get(key, 0)
+    }
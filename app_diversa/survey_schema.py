@@ -0,0 +1,208 @@
+"""
+Registro en memoria (por proceso) de la definición compilada de cada encuesta.
+
+Las definiciones (`Survey`, `Chapter`, `Question`, `SubQuestion`, `Option`, `EligibilityRule`) cambian pocas veces
+al mes pero se consultan en cada envío de respuestas. `survey_schemas` compila cada encuesta
+una sola vez en estructuras inmutables de búsqueda y se reconstruye de forma perezosa cuando
+las señales de `app_diversa.signals` avisan de un cambio.
+
+Las señales solo llegan al proceso que hizo el cambio; `SURVEY_SCHEMA_TTL` (segundos) acota
+el tiempo que los demás procesos pueden servir una definición desactualizada.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from django.conf import settings
+from django.db.models import Q
+from .models import Survey, Question, SubQuestion, Option, EligibilityRule
+
+DEFAULT_SURVEY_SCHEMA_TTL = 300
+
+
+@dataclass(frozen=True)
+class QuestionSpec:
+    id: int
+    survey_id: int
+    chapter_id: int
+    order_question: int
+    question_type: str
+    is_multiple: bool
+    is_required: bool
+    is_geographic: bool
+    geography_type: str
+    is_matrix: bool
+
+
+@dataclass(frozen=True)
+class SubQuestionSpec:
+    id: int
+    parent_question_id: int
+    custom_identifier: str
+    subquestion_order: int
+    subquestion_type: str
+    is_multiple: bool
+    is_required: bool
+    is_other: bool
+
+
+@dataclass(frozen=True)
+class OptionSpec:
+    id: int
+    question_id: int
+    subquestion_id: int
+    option_type: str
+    text_option: str
+    is_other: bool
+    order_option: int
+
+
+@dataclass(frozen=True)
+class EligibilityRuleSpec:
+    id: int
+    rule_type: str
+    question_id: int
+    option_id: int
+    min_age: int
+    missing_message: str
+    rejection_message: str
+    rejection_note: str
+
+
+@dataclass(frozen=True)
+class SurveySchema:
+    """
+    Definición compilada de una encuesta. Todos los mapeos son de solo lectura.
+    """
+    survey_id: int
+    questions: MappingProxyType
+    subquestions: MappingProxyType
+    subquestions_by_parent: MappingProxyType
+    options: MappingProxyType
+    eligibility_rules: tuple = ()
+
+    @property
+    def screening_question_ids(self):
+        """
+        Preguntas evaluadas por las reglas de elegibilidad; no se guardan como respuestas.
+        """
+        return frozenset(rule.question_id for rule in self.eligibility_rules)
+
+
+def compile_survey_schema(survey_id):
+    """
+    Construye el `SurveySchema` de una encuesta con una consulta por modelo.
+    Devuelve `None` si la encuesta no existe.
+    """
+    if not Survey.objects.filter(pk=survey_id).exists():
+        return None
+
+    questions = {
+        row['id']: QuestionSpec(is_matrix=row['question_type'] == 'matrix', **row)
+        for row in Question.objects.filter(survey_id=survey_id).values(
+            'id', 'survey_id', 'chapter_id', 'order_question', 'question_type', 'is_multiple',
+            'is_required', 'is_geographic', 'geography_type'
+        )
+    }
+
+    subquestions = {}
+    subquestions_by_parent = {}
+    for row in SubQuestion.objects.filter(parent_question__survey_id=survey_id).order_by('subquestion_order').values(
+        'id', 'parent_question_id', 'custom_identifier', 'subquestion_order', 'subquestion_type',
+        'is_multiple', 'is_required', 'is_other'
+    ):
+        spec = SubQuestionSpec(**row)
+        subquestions[spec.id] = spec
+        subquestions_by_parent.setdefault(spec.parent_question_id, []).append(spec)
+
+    options = {
+        row['id']: OptionSpec(**row)
+        for row in Option.objects.filter(
+            Q(question__survey_id=survey_id) | Q(subquestion__parent_question__survey_id=survey_id)
+        ).values(
+            'id', 'question_id', 'subquestion_id', 'option_type', 'text_option', 'is_other', 'order_option'
+        )
+    }
+
+    eligibility_rules = tuple(
+        EligibilityRuleSpec(**row)
+        for row in EligibilityRule.objects.filter(survey_id=survey_id, is_active=True).order_by('order', 'id').values(
+            'id', 'rule_type', 'question_id', 'option_id', 'min_age', 'missing_message', 'rejection_message',
+            'rejection_note'
+        )
+    )
+
+    return SurveySchema(
+        survey_id=survey_id,
+        questions=MappingProxyType(questions),
+        subquestions=MappingProxyType(subquestions),
+        subquestions_by_parent=MappingProxyType(
+            {parent_id: tuple(specs) for parent_id, specs in subquestions_by_parent.items()}
+        ),
+        options=MappingProxyType(options),
+        eligibility_rules=eligibility_rules,
+    )
+
+
+class SurveySchemaRegistry:
+    """
+    Caché por proceso de `SurveySchema`, compilados bajo demanda.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._schemas = {}
+        self._question_surveys = None
+        self._generation = 0
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'SURVEY_SCHEMA_TTL', DEFAULT_SURVEY_SCHEMA_TTL)
+
+    def _is_fresh(self, loaded_at):
+        return time.monotonic() - loaded_at < self.ttl
+
+    def get(self, survey_id):
+        """
+        Devuelve el `SurveySchema` de la encuesta, o `None` si no existe.
+        """
+        entry = self._schemas.get(survey_id)
+        if entry and self._is_fresh(entry[1]):
+            return entry[0]
+
+        generation = self._generation
+        schema = compile_survey_schema(survey_id)
+        with self._lock:
+            # Si hubo una invalidación mientras se compilaba, no se guarda el resultado
+            if generation == self._generation:
+                self._schemas[survey_id] = (schema, time.monotonic())
+        return schema
+
+    def for_question(self, question_id):
+        """
+        Devuelve el `SurveySchema` de la encuesta a la que pertenece la pregunta, o `None`.
+        """
+        index = self._question_surveys
+        if not index or not self._is_fresh(index[1]):
+            generation = self._generation
+            index = (dict(Question.objects.values_list('id', 'survey_id')), time.monotonic())
+            with self._lock:
+                if generation == self._generation:
+                    self._question_surveys = index
+
+        survey_id = index[0].get(question_id)
+        if survey_id is None:
+            return None
+        return self.get(survey_id)
+
+    def invalidate(self):
+        """
+        Descarta todas las definiciones compiladas; se reconstruyen en el siguiente acceso.
+        """
+        with self._lock:
+            self._schemas = {}
+            self._question_surveys = None
+            self._generation += 1
+
+
+survey_schemas = SurveySchemaRegistry()
@@ -0,0 +1,244 @@
+"""
+Tabulación de respuestas en el servidor: frecuencias por pregunta y tablas cruzadas.
+
+Las frecuencias y la tabla cruzada por departamento se leen de los contadores materializados
+`ResponseSummary` (ver `app_diversa.summaries`), con costo proporcional al número de opciones.
+Las demás tablas cruzadas se calculan con `GROUP BY` sobre `Response.option_selected`, la tabla
+intermedia de `options_multiple_selected` y las llaves geográficas. Las etiquetas salen del
+`SurveySchema` y del nomenclátor geográfico, sin consultas adicionales.
+
+Los resultados se guardan en caché por encuesta. Cada encuesta tiene una versión en la caché
+que `bump_tabulation_version` cambia cuando se guardan respuestas, lo que deja obsoletas todas
+sus tabulaciones a la vez.
+"""
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery, Sum
+from app_geo.gazetteer import geo_gazetteer
+from .models import Response, ResponseSummary, SurveyAttempt
+from .survey_schema import survey_schemas
+
+TABULATED_QUESTION_TYPES = ('closed', 'likert', 'rating', 'multiple', 'matrix')
+
+GEO_DIMENSIONS = ('country', 'department', 'municipality')
+
+
+class QuestionNotFound(LookupError):
+    """
+    La pregunta no existe (o no pertenece a ninguna encuesta).
+    """
+
+
+class InvalidDimension(ValueError):
+    """
+    El parámetro `by` de la tabla cruzada no es una dimensión válida para la pregunta.
+    """
+
+
+def _version_key(survey_id):
+    return f"tabulation-version:{survey_id}"
+
+
+def get_tabulation_version(survey_id):
+    return cache.get_or_set(_version_key(survey_id), time.time_ns(), None)
+
+
+def bump_tabulation_version(survey_ids):
+    """
+    Invalida las tabulaciones de las encuestas indicadas.
+    Se usa la hora en nanosegundos y no un contador, para que una versión perdida por la caché
+    no pueda volver a coincidir con resultados antiguos.
+    """
+    cache.set_many({_version_key(survey_id): time.time_ns() for survey_id in survey_ids}, None)
+
+
+def _cached(survey_id, name, build):
+    key = f"tabulation:{survey_id}:{get_tabulation_version(survey_id)}:{name}"
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, settings.TABULATION_CACHE_TIMEOUT)
+    return result
+
+
+def _get_question(question_id):
+    schema = survey_schemas.for_question(question_id)
+    if schema is None:
+        raise QuestionNotFound("La pregunta no existe.")
+    question = schema.questions[question_id]
+    if question.question_type not in TABULATED_QUESTION_TYPES:
+        raise ValueError(f"Las preguntas de tipo '{question.question_type}' no se tabulan.")
+    return schema, question
+
+
+def _options_for(schema, question_id, subquestion_id=None):
+    """
+    Opciones de una pregunta o subpregunta, en orden. Las subpreguntas sin opciones propias
+    usan las de su pregunta (escalas compartidas de las matrices).
+    """
+    options = [
+        option for option in schema.options.values()
+        if option.subquestion_id == subquestion_id and (subquestion_id or option.question_id == question_id)
+    ]
+    if subquestion_id and not options:
+        return _options_for(schema, question_id)
+    return sorted(options, key=lambda option: (option.order_option or 0, option.id))
+
+
+def _option_counts(question_id, dimension):
+    """
+    Conteos `{(grupo, opción): n}` de opciones únicas y múltiples de una pregunta.
+    `dimension` es una función que recibe el nombre del campo del intento y devuelve la
+    expresión por la que se agrupa.
+    """
+    through_model = Response.options_multiple_selected.through
+    # Los borradores no se tabulan hasta que se finalizan
+    single = Response.objects.filter(question_id=question_id, option_selected__isnull=False).exclude(
+        survey_attempt__status=SurveyAttempt.STATUS_DRAFT
+    ).annotate(group=dimension('survey_attempt_id'))
+    multiple = through_model.objects.filter(response__question_id=question_id).exclude(
+        response__survey_attempt__status=SurveyAttempt.STATUS_DRAFT
+    ).annotate(group=dimension('response__survey_attempt_id'))
+
+    counts = {}
+    for row in single.values('group', 'option_selected_id').annotate(count=Count('id')).order_by():
+        key = (row['group'], row['option_selected_id'])
+        counts[key] = counts.get(key, 0) + row['count']
+    for row in multiple.values('group', 'option_id').annotate(count=Count('id')).order_by():
+        key = (row['group'], row['option_id'])
+        counts[key] = counts.get(key, 0) + row['count']
+    return counts
+
+
+def _summary_counts(survey_id, question_id, group_field):
+    """
+    Suma los contadores de `ResponseSummary` de una pregunta agrupados por `group_field`.
+    Devuelve `{(grupo, option_key): n}`; `option_key = 0` es el total de respuestas.
+    """
+    # Importación diferida: `summaries` importa `bump_tabulation_version` de este módulo
+    from .summaries import refresh_stale_summaries
+    refresh_stale_summaries(survey_id)
+
+    rows = ResponseSummary.objects.filter(question_id=question_id).values(group_field, 'option_key').annotate(
+        total=Sum('count')
+    ).order_by()
+    return {(row[group_field], row['option_key']): row['total'] for row in rows}
+
+
+def _option_rows(options, counts, group=0):
+    return [
+        {"option_id": option.id, "text_option": option.text_option, "count": counts.get((group, option.id), 0)}
+        for option in options
+    ]
+
+
+def question_frequencies(question_id):
+    """
+    Frecuencias de opciones de una pregunta. Las preguntas matriciales devuelven una
+    distribución por subpregunta.
+    """
+    schema, question = _get_question(question_id)
+
+    def build():
+        result = {"question_id": question.id, "question_type": question.question_type}
+
+        counts = _summary_counts(schema.survey_id, question.id, 'subquestion_key')
+
+        if question.is_matrix:
+            result["subquestions"] = [
+                {
+                    "subquestion_id": subquestion.id,
+                    "custom_identifier": subquestion.custom_identifier,
+                    "responses": counts.get((subquestion.id, 0), 0),
+                    "options": _option_rows(_options_for(schema, question.id, subquestion.id), counts, subquestion.id),
+                }
+                for subquestion in schema.subquestions_by_parent.get(question.id, ())
+            ]
+            return result
+
+        result["responses"] = counts.get((0, 0), 0)
+        result["options"] = _option_rows(_options_for(schema, question.id), counts)
+        return result
+
+    return _cached(schema.survey_id, f"frequencies:{question.id}", build)
+
+
+def _dimension_label(schema, by, value):
+    """
+    Nombre legible de un valor de la dimensión de una tabla cruzada.
+    """
+    if value is None:
+        return None
+    if by.startswith('question:'):
+        option = schema.options.get(value)
+        return option.text_option if option else None
+
+    gazetteer = geo_gazetteer.get()
+    if by == 'country':
+        country = gazetteer.country_by_id(value)
+        return country.spanish_name if country else None
+    if by == 'department':
+        department = gazetteer.department_by_id(value)
+        return department.name if department else None
+    municipality = gazetteer.municipality_by_id(value)
+    return municipality.name if municipality else None
+
+
+def crosstab(question_id, by):
+    """
+    Tabla cruzada de las opciones de una pregunta contra `by`, que puede ser una dimensión
+    geográfica ('country', 'department', 'municipality') o `question:<id>` (otra pregunta
+    de selección única). El valor de `by` se toma de las respuestas del mismo intento.
+    """
+    schema, question = _get_question(question_id)
+    if question.is_matrix:
+        raise ValueError("Las preguntas matriciales no admiten tablas cruzadas.")
+
+    if by in GEO_DIMENSIONS:
+        source = Response.objects.filter(**{f"{by}__isnull": False})
+        value_field = f"{by}_id"
+    elif by.startswith('question:'):
+        try:
+            other_id = int(by.split(':', 1)[1])
+        except ValueError:
+            raise InvalidDimension("Dimensión inválida.")
+        other = schema.questions.get(other_id)
+        if other is None or other.is_matrix or other.is_multiple or other.question_type == 'multiple':
+            raise InvalidDimension("La dimensión debe ser otra pregunta de selección única de la misma encuesta.")
+        source = Response.objects.filter(question_id=other_id, option_selected__isnull=False)
+        value_field = 'option_selected_id'
+    else:
+        raise InvalidDimension("Dimensión inválida.")
+
+    def dimension(attempt_field):
+        return Subquery(
+            source.filter(survey_attempt_id=OuterRef(attempt_field)).order_by('id').values(value_field)[:1]
+        )
+
+    def build():
+        if by == 'department':
+            counts = {
+                (department or None, option): total
+                for (department, option), total in _summary_counts(schema.survey_id, question.id, 'department_key').items()
+                if option
+            }
+        else:
+            counts = _option_counts(question.id, dimension=dimension)
+        options = _options_for(schema, question.id)
+        values = sorted({group for group, _ in counts}, key=lambda value: (value is None, value or 0))
+        return {
+            "question_id": question.id,
+            "by": by,
+            "options": [{"option_id": option.id, "text_option": option.text_option} for option in options],
+            "rows": [
+                {
+                    "value": value,
+                    "label": _dimension_label(schema, by, value),
+                    "counts": [counts.get((value, option.id), 0) for option in options],
+                }
+                for value in values
+            ],
+        }
+
+    return _cached(schema.survey_id, f"crosstab:{question.id}:{by}", build)
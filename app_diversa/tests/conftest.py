@@ -0,0 +1,65 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from users.models import CustomUser
+from app_diversa.models import EligibilityRule, Option
+from app_diversa.factories import SurveyFactory, ChapterFactory, QuestionFactory
+from app_diversa.idempotency import idempotency_results
+from app_diversa.survey_schema import survey_schemas
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    # El rollback de cada prueba no dispara señales; se limpian el registro y la caché explícitamente
+    survey_schemas.invalidate()
+    idempotency_results.clear()
+    cache.clear()
+    yield
+    survey_schemas.invalidate()
+    idempotency_results.clear()
+    cache.clear()
+
+
+@pytest.fixture
+def user(db):
+    return CustomUser.objects.create_user(identifier="encuestador", password="clave-segura")
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def survey(db):
+    """
+    Encuesta con las preguntas de tamizaje (ids 1 y 2) y sus reglas de elegibilidad.
+    """
+    survey = SurveyFactory()
+    chapter = ChapterFactory(survey=survey)
+    lived = QuestionFactory(id=1, survey=survey, chapter=chapter, question_type="closed", order_question=1)
+    Option.objects.create(question=lived, text_option="Sí", order_option=1)
+    no = Option.objects.create(question=lived, text_option="No", order_option=2)
+    birth_date = QuestionFactory(id=2, survey=survey, chapter=chapter, question_type="birth_date", order_question=2)
+    EligibilityRule.objects.create(
+        survey=survey, rule_type=EligibilityRule.RULE_REJECT_OPTION, question=lived, option=no, order=1,
+        rejection_note="El usuario no ha vivido en Colombia los últimos 5 años.",
+    )
+    EligibilityRule.objects.create(
+        survey=survey, rule_type=EligibilityRule.RULE_MIN_AGE, question=birth_date, min_age=18, order=2,
+        missing_message="Debe responder la fecha de nacimiento.",
+        rejection_message="No cumple con los requisitos de edad.",
+        rejection_note="El usuario tiene {age} años y no cumple con la edad mínima.",
+    )
+    return survey
+
+
+@pytest.fixture
+def screening_answers(survey):
+    yes = Option.objects.get(question_id=1, text_option="Sí")
+    return [
+        {"question_id": 1, "option_selected": yes.id, "survey_id": survey.id},
+        {"question_id": 2, "answer": "1990-05-17"},
+    ]
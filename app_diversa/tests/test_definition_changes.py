@@ -0,0 +1,79 @@
+import pytest
+from django.test import override_settings
+from app_diversa.models import Option, SubQuestion, SurveyText
+from app_diversa.factories import SurveyFactory, ChapterFactory, QuestionFactory
+
+
+def _changes(api_client, survey, since_version=None):
+    url = f"/app_diversa/v1/surveys/{survey.id}/changes/"
+    if since_version is not None:
+        url += f"?since_version={since_version}"
+    response = api_client.get(url)
+    assert response.status_code == 200, response.data
+    return response.data
+
+
+def _ids(rows):
+    return [row["id"] for row in rows]
+
+
+# Sin margen de sincronización para que los cambios de la prueba entren en la ventana
+@override_settings(DEFINITION_SYNC_LAG=0)
+@pytest.mark.django_db
+def test_changes_feed_returns_only_rows_changed_since_version(api_client):
+    survey = SurveyFactory()
+    other_survey = SurveyFactory()
+    chapter = ChapterFactory(survey=survey)
+    question = QuestionFactory(survey=survey, chapter=chapter, question_type="closed")
+    kept = Option.objects.create(question=question, text_option="Sí")
+    removed = Option.objects.create(question=question, text_option="No")
+    QuestionFactory(survey=other_survey, question_type="open")
+
+    full = _changes(api_client, survey)
+    assert _ids(full["changed"]["questions"]) == [question.id]
+    assert _ids(full["changed"]["options"]) == [kept.id, removed.id]
+    assert full["changed"]["chapters"][0]["survey_id"] == survey.id
+
+    unchanged = _changes(api_client, survey, full["version"])
+    assert all(rows == [] for rows in unchanged["changed"].values())
+    assert all(ids == [] for ids in unchanged["deleted"].values())
+
+    kept.text_option = "Sí, en los últimos 5 años"
+    kept.save()
+    subquestion = SubQuestion.objects.create(id=1, parent_question=question, text_subquestion="Fila")
+    text = SurveyText.objects.create(survey=survey, title="Bienvenida")
+    removed_id = removed.id
+    removed.delete()
+
+    delta = _changes(api_client, survey, unchanged["version"])
+    assert delta["version"] > unchanged["version"]
+    assert _ids(delta["changed"]["options"]) == [kept.id]
+    assert delta["changed"]["options"][0]["text_option"] == "Sí, en los últimos 5 años"
+    assert _ids(delta["changed"]["subquestions"]) == [subquestion.id]
+    assert _ids(delta["changed"]["texts"]) == [text.id]
+    assert delta["changed"]["questions"] == []
+    assert delta["deleted"]["options"] == [removed_id]
+
+
+# Eliminar una pregunta registra también sus opciones eliminadas en cascada
+@override_settings(DEFINITION_SYNC_LAG=0)
+@pytest.mark.django_db
+def test_changes_feed_reports_cascade_deletions(api_client):
+    survey = SurveyFactory()
+    question = QuestionFactory(survey=survey, question_type="closed")
+    option = Option.objects.create(question=question, text_option="Sí")
+    version = _changes(api_client, survey)["version"]
+
+    question_id, option_id = question.id, option.id
+    question.delete()
+
+    delta = _changes(api_client, survey, version)
+    assert delta["deleted"]["questions"] == [question_id]
+    assert delta["deleted"]["options"] == [option_id]
+
+
+@pytest.mark.django_db
+def test_changes_feed_rejects_invalid_version(api_client):
+    survey = SurveyFactory()
+    response = api_client.get(f"/app_diversa/v1/surveys/{survey.id}/changes/?since_version=ayer")
+    assert response.status_code == 400
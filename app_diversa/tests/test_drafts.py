@@ -0,0 +1,157 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from users.models import CustomUser
+from app_diversa.models import Option, Response, SurveyAttempt
+from app_diversa.factories import QuestionFactory
+from app_diversa.summaries import summary_table_counts
+
+ATTEMPTS_URL = "/app_diversa/v1/attempts/"
+
+
+@pytest.fixture
+def questions(survey):
+    open_question = QuestionFactory(survey=survey, question_type="open")
+    multiple = QuestionFactory(survey=survey, question_type="multiple", is_multiple=True)
+    options = [Option.objects.create(question=multiple, text_option=text) for text in ("Uno", "Dos", "Tres")]
+    return open_question, multiple, options
+
+
+def _start_draft(api_client, screening_answers, answers=()):
+    response = api_client.post(ATTEMPTS_URL, screening_answers + list(answers), format="json")
+    assert response.status_code == 201, response.data
+    assert response.data["status"] == SurveyAttempt.STATUS_DRAFT
+    return response.data["attempt_id"]
+
+
+# Cada PATCH reemplaza solo las respuestas enviadas, sobre la misma fila
+@pytest.mark.django_db
+def test_draft_answers_are_upserted(api_client, screening_answers, questions):
+    open_question, multiple, (one, two, three) = questions
+    attempt_id = _start_draft(api_client, screening_answers, [{"question_id": open_question.id, "answer": "primera"}])
+    first_row = Response.objects.get(question=open_question)
+
+    response = api_client.patch(f"{ATTEMPTS_URL}{attempt_id}/answers/", [
+        {"question_id": open_question.id, "answer": "corregida"},
+        {"question_id": multiple.id, "options_multiple_selected": [one.id, two.id]},
+    ], format="json")
+    assert response.status_code == 200, response.data
+    api_client.patch(f"{ATTEMPTS_URL}{attempt_id}/answers/", [
+        {"question_id": multiple.id, "options_multiple_selected": [three.id]},
+    ], format="json")
+
+    assert Response.objects.count() == 2
+    updated = Response.objects.get(question=open_question)
+    assert updated.pk == first_row.pk
+    assert updated.response_text == "corregida"
+    assert updated.normalized_response_text == "corregida"
+    assert list(Response.objects.get(question=multiple).options_multiple_selected.values_list("id", flat=True)) == [three.id]
+
+    # Los borradores no se tabulan
+    assert not summary_table_counts()
+
+
+# Sin upsert nativo ni ids devueltos por `bulk_create` (como en MySQL)
+@pytest.mark.django_db
+def test_draft_upsert_without_native_upsert(monkeypatch, api_client, screening_answers, questions):
+    monkeypatch.setattr(connection.features, "supports_update_conflicts_with_target", False)
+    monkeypatch.setattr(type(connection.features), "can_return_rows_from_bulk_insert", False)
+    open_question, multiple, (one, two, three) = questions
+    attempt_id = _start_draft(api_client, screening_answers, [
+        {"question_id": multiple.id, "options_multiple_selected": [one.id]},
+    ])
+    first_row = Response.objects.get(question=multiple)
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = api_client.patch(f"{ATTEMPTS_URL}{attempt_id}/answers/", [
+            {"question_id": open_question.id, "answer": "nueva"},
+            {"question_id": multiple.id, "options_multiple_selected": [two.id, three.id]},
+        ], format="json")
+
+    assert response.status_code == 200, response.data
+    assert not [q for q in ctx.captured_queries if "ON CONFLICT" in q["sql"] or "DUPLICATE KEY" in q["sql"]]
+    updated = Response.objects.get(question=multiple)
+    assert updated.pk == first_row.pk
+    assert sorted(updated.options_multiple_selected.values_list("id", flat=True)) == [two.id, three.id]
+    assert Response.objects.get(question=open_question).response_text == "nueva"
+
+
+# Finalizar solo cambia el estado: no reescribe respuestas y suma el intento a los contadores
+@pytest.mark.django_db
+def test_finalize_draft_flips_state_without_rewriting(api_client, screening_answers, questions):
+    open_question, _, _ = questions
+    attempt_id = _start_draft(api_client, screening_answers, [{"question_id": open_question.id, "answer": "lista"}])
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = api_client.post(f"{ATTEMPTS_URL}{attempt_id}/finalize/", [], format="json")
+
+    assert response.status_code == 201, response.data
+    assert not [q for q in ctx.captured_queries if '"app_diversa_response"' in q["sql"] and not q["sql"].startswith("SELECT")]
+    attempt = SurveyAttempt.objects.get(pk=attempt_id)
+    assert attempt.status == SurveyAttempt.STATUS_COMPLETED
+    assert attempt.success_note
+    assert sum(summary_table_counts().values()) == 1
+
+    assert api_client.post(f"{ATTEMPTS_URL}{attempt_id}/finalize/", [], format="json").status_code == 409
+    patch = api_client.patch(f"{ATTEMPTS_URL}{attempt_id}/answers/", [
+        {"question_id": open_question.id, "answer": "tarde"},
+    ], format="json")
+    assert patch.status_code == 409
+
+
+@pytest.mark.django_db
+def test_draft_belongs_to_its_user(api_client, screening_answers, questions):
+    open_question, _, _ = questions
+    attempt_id = _start_draft(api_client, screening_answers)
+
+    other_client = APIClient()
+    other_client.force_authenticate(user=CustomUser.objects.create_user(identifier="otra", password="clave-segura"))
+    response = other_client.patch(f"{ATTEMPTS_URL}{attempt_id}/answers/", [
+        {"question_id": open_question.id, "answer": "ajena"},
+    ], format="json")
+
+    assert response.status_code == 404
+    assert not Response.objects.exists()
+
+
+# La llave única (intento, pregunta, subpregunta) se informa como error de validación en los envíos
+@pytest.mark.django_db
+def test_submit_rejects_duplicate_answers(api_client, screening_answers, questions):
+    open_question, _, _ = questions
+    response = api_client.post("/app_diversa/v1/submit-response/", screening_answers + [
+        {"question_id": open_question.id, "answer": "una"},
+        {"question_id": open_question.id, "answer": "otra"},
+    ], format="json")
+
+    assert response.status_code == 400
+    assert not SurveyAttempt.objects.exists()
+
+
+# Reanudar: las respuestas del intento en un mapa compacto, con una consulta por tabla
+@pytest.mark.django_db
+def test_attempt_answers_compact_map(api_client, survey, screening_answers, questions, django_assert_num_queries):
+    open_question, multiple, (one, _, three) = questions
+    attempt_id = _start_draft(api_client, screening_answers, [
+        {"question_id": open_question.id, "answer": "en curso"},
+        {"question_id": multiple.id, "options_multiple_selected": [one.id, three.id]},
+    ])
+
+    # Intento propio (1) + respuestas (1) + opciones múltiples (1)
+    with django_assert_num_queries(3):
+        response = api_client.get(f"{ATTEMPTS_URL}{attempt_id}/answers/")
+
+    assert response.status_code == 200
+    assert response.data == {
+        "attempt_id": attempt_id,
+        "status": SurveyAttempt.STATUS_DRAFT,
+        "answers": {
+            open_question.id: {0: {"answer": "en curso"}},
+            multiple.id: {0: {"options_multiple_selected": [one.id, three.id]}},
+        },
+    }
+
+    latest = api_client.get(f"{ATTEMPTS_URL}latest/?survey={survey.id}")
+    assert latest.data["attempt_id"] == attempt_id
+    assert latest.data["answers"] == response.data["answers"]
+    assert api_client.get(f"{ATTEMPTS_URL}latest/?survey=999999").status_code == 404
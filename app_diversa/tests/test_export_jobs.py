@@ -0,0 +1,76 @@
+import os
+from datetime import timedelta
+import pytest
+from django.core.management import call_command
+from django.utils.timezone import now
+from app_diversa.models import ExportJob, Question, Response
+
+JOBS_URL = "/app_diversa/v1/export-jobs/"
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(settings, tmp_path):
+    settings.EXPORT_SPOOL_DIR = str(tmp_path / "spool")
+    return settings.EXPORT_SPOOL_DIR
+
+
+# Flujo completo: solicitar, procesar con el worker, consultar y descargar
+@pytest.mark.django_db
+def test_export_job_lifecycle(api_client, user, survey):
+    question = Question.objects.get(id=1)
+    Response.objects.bulk_create([Response(user=user, question=question, response_text=f"R{i}") for i in range(5)])
+
+    created = api_client.post(JOBS_URL, {"export_format": "csv"}, format="json")
+    assert created.status_code == 201, created.data
+    assert created.data["status"] == ExportJob.STATUS_PENDING
+    job_url = f"{JOBS_URL}{created.data['id']}/"
+    assert api_client.get(f"{job_url}download/").status_code == 409
+
+    call_command("run_export_worker", "--once")
+
+    job = api_client.get(job_url).data
+    assert job["status"] == ExportJob.STATUS_DONE
+    assert job["row_count"] == 5
+    assert job["size_bytes"] > 0
+    assert job["elapsed_seconds"] is not None
+
+    download = api_client.get(job["download_url"])
+    assert download.status_code == 200
+    assert b"".join(download.streaming_content).decode("utf-8").count("\n") == 6
+
+
+@pytest.mark.django_db
+def test_wide_export_job_requires_survey(api_client):
+    response = api_client.post(JOBS_URL, {"export_format": "csv", "layout": "wide"}, format="json")
+    assert response.status_code == 400
+
+
+# El worker elimina los archivos vencidos
+@pytest.mark.django_db
+def test_expired_exports_are_purged(api_client, user, spool_dir):
+    job = ExportJob.objects.create(user=user, export_format="csv")
+    call_command("run_export_worker", "--once")
+    job.refresh_from_db()
+    path = job.file_path
+    assert os.path.exists(path)
+
+    ExportJob.objects.filter(pk=job.pk).update(expires_at=now() - timedelta(minutes=1))
+    call_command("run_export_worker", "--once")
+
+    job.refresh_from_db()
+    assert job.status == ExportJob.STATUS_EXPIRED
+    assert not os.path.exists(path)
+    assert api_client.get(f"{JOBS_URL}{job.pk}/download/").status_code == 410
+
+
+@pytest.mark.django_db
+def test_export_job_since_id(api_client, user, survey):
+    question = Question.objects.get(id=1)
+    responses = Response.objects.bulk_create([Response(user=user, question=question, response_text=f"R{i}") for i in range(5)])
+
+    created = api_client.post(JOBS_URL, {"export_format": "csv", "since_id": responses[2].id}, format="json")
+    call_command("run_export_worker", "--once")
+
+    job = api_client.get(f"{JOBS_URL}{created.data['id']}/").data
+    assert job["row_count"] == 2
+    assert job["next_cursor"] == str(responses[-1].id)
@@ -0,0 +1,187 @@
+import csv
+import io
+import pytest
+from django.test.utils import override_settings
+from app_diversa.models import Option, Question, Response, SubQuestion, SurveyAttempt
+from app_diversa.factories import QuestionFactory
+
+EXPORT_URL = "/app_diversa/v1/responses/export/{}/"
+
+
+@pytest.fixture
+def responses(user, survey):
+    question = Question.objects.get(id=1)
+    return Response.objects.bulk_create([
+        Response(user=user, question=question, response_text=f"Respuesta {index}") for index in range(25)
+    ])
+
+
+# El CSV se transmite por partes y las filas se leen por lotes
+@pytest.mark.django_db
+@override_settings(EXPORT_CHUNK_SIZE=10)
+def test_csv_export_is_streamed(api_client, responses):
+    response = api_client.get(EXPORT_URL.format("csv"))
+
+    assert response.status_code == 200
+    assert response.streaming
+    rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode("utf-8"))))
+    assert rows[0] == ["ID", "Usuario", "Pregunta", "Respuesta", "Fecha"]
+    assert len(rows) == len(responses) + 1
+    assert rows[1][0] == str(responses[0].id)
+    assert rows[1][1] == "encuestador"
+    assert rows[-1][3] == "Respuesta 24"
+
+
+@pytest.mark.django_db
+def test_pdf_export_still_supported(api_client, responses):
+    response = api_client.get(EXPORT_URL.format("pdf"))
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/pdf"
+
+
+# Exportación ancha: una fila por intento, una columna por pregunta/subpregunta e indicadores por opción
+@pytest.mark.django_db
+@override_settings(EXPORT_CHUNK_SIZE=2)
+def test_wide_export(api_client, user, survey):
+    lived = Question.objects.get(id=1)
+    yes, no = lived.options.order_by("order_option")
+    chapter = lived.chapter
+    multiple = QuestionFactory(survey=survey, chapter=chapter, question_type="multiple", is_multiple=True, order_question=3)
+    first = Option.objects.create(question=multiple, text_option="Uno", order_option=1)
+    second = Option.objects.create(question=multiple, text_option="Dos", order_option=2)
+    matrix = QuestionFactory(survey=survey, chapter=chapter, question_type="matrix", order_question=4)
+    SubQuestion.objects.create(id=501, parent_question=matrix, custom_identifier="4.1", subquestion_order=1,
+                               text_subquestion="Fila 1", subquestion_type="open")
+    SubQuestion.objects.create(id=502, parent_question=matrix, subquestion_order=2,
+                               text_subquestion="Fila 2", subquestion_type="open")
+    # Un identificador igual al orden de otra fila no repite la columna
+    other_matrix = QuestionFactory(survey=survey, chapter=chapter, question_type="matrix", order_question=5)
+    SubQuestion.objects.create(id=504, parent_question=other_matrix, custom_identifier="1", subquestion_order=2,
+                               text_subquestion="Fila 2", subquestion_type="open")
+    SubQuestion.objects.create(id=505, parent_question=other_matrix, subquestion_order=1,
+                               text_subquestion="Fila 3", subquestion_type="open")
+
+    attempts = [SurveyAttempt.objects.create(user=user, survey=survey, has_lived_in_colombia=True) for _ in range(3)]
+    for index, attempt in enumerate(attempts):
+        # `bulk_create` omite `save()`, que exige al menos una opción en las preguntas múltiples
+        _, chosen, _ = Response.objects.bulk_create([
+            Response(user=user, survey_attempt=attempt, question=lived, option_selected=yes if index else no),
+            Response(user=user, survey_attempt=attempt, question=multiple),
+            Response(user=user, survey_attempt=attempt, question=matrix, subquestion_id=501, response_text=f"fila {index}"),
+        ])
+        chosen.options_multiple_selected.set([first, second][:index])
+
+    response = api_client.get(EXPORT_URL.format("csv"), {"layout": "wide", "survey": survey.id})
+
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode("utf-8"))))
+    assert rows[0] == [
+        "ID_INTENTO", "Usuario", "Fecha", "P1", "P2",
+        f"P{multiple.id}_O{first.id}", f"P{multiple.id}_O{second.id}", f"P{matrix.id}_4.1", f"P{matrix.id}_2",
+        f"P{other_matrix.id}_1", f"P{other_matrix.id}_S504",
+    ]
+    assert [row[0] for row in rows[1:]] == [str(attempt.id) for attempt in attempts]
+    assert rows[1][3:] == ["No", "", "0", "0", "fila 0", "", "", ""]
+    assert rows[3][3:] == ["Sí", "", "1", "1", "fila 2", "", "", ""]
+
+
+@pytest.mark.django_db
+def test_wide_export_requires_survey(api_client, survey):
+    assert api_client.get(EXPORT_URL.format("csv"), {"layout": "wide"}).status_code == 400
+    assert api_client.get(EXPORT_URL.format("pdf"), {"layout": "wide", "survey": survey.id}).status_code == 400
+
+
+# El PDF se pagina con encabezados repetidos y ajusta los textos largos
+@pytest.mark.django_db
+def test_pdf_export_is_paginated(api_client, user, survey):
+    question = QuestionFactory(survey=survey, text_question="¿" + "Pregunta muy larga " * 12 + "?")
+    Response.objects.bulk_create([
+        Response(user=user, question=question, response_text=f"Respuesta {index}") for index in range(120)
+    ])
+
+    response = api_client.get(EXPORT_URL.format("pdf"))
+
+    assert response.status_code == 200
+    content = b"".join(response.streaming_content)
+    assert content.startswith(b"%PDF")
+    assert content.count(b"/Type /Page\n") > 1
+
+
+# Exportación incremental por id: solo las respuestas nuevas y el cursor siguiente
+@pytest.mark.django_db
+def test_csv_export_since_id(api_client, responses):
+    response = api_client.get(EXPORT_URL.format("csv"), {"since_id": responses[19].id})
+
+    rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode("utf-8"))))
+    assert [row[0] for row in rows[1:]] == [str(r.id) for r in responses[20:]]
+    assert response["X-Next-Since-Id"] == str(responses[-1].id)
+
+    empty = api_client.get(EXPORT_URL.format("csv"), {"since_id": response["X-Next-Since-Id"]})
+    assert b"".join(empty.streaming_content).decode("utf-8").count("\n") == 1
+    assert empty["X-Next-Since-Id"] == response["X-Next-Since-Id"]
+
+
+# Exportación incremental por fecha de modificación: incluye respuestas editadas
+@pytest.mark.django_db
+def test_csv_export_since_watermark(api_client, responses):
+    first = api_client.get(EXPORT_URL.format("csv"), {"since": "2000-01-01T00:00:00Z"})
+    b"".join(first.streaming_content)
+    cursor = first["X-Next-Since"]
+
+    edited = responses[3]
+    edited.response_text = "Editada"
+    edited.save(update_fields=["response_text", "updated_at"])
+
+    delta = api_client.get(EXPORT_URL.format("csv"), {"since": cursor})
+    rows = list(csv.reader(io.StringIO(b"".join(delta.streaming_content).decode("utf-8"))))
+    assert [row[0] for row in rows[1:]] == [str(edited.id)]
+    assert rows[1][3] == "Editada"
+    assert delta["X-Next-Since"] != cursor
+
+    assert api_client.get(EXPORT_URL.format("csv"), {"since": "ayer"}).status_code == 400
+
+
+# Los bloques por clave `(updated_at, id)` no repiten ni omiten respuestas con la misma fecha
+@pytest.mark.django_db
+@override_settings(EXPORT_CHUNK_SIZE=10)
+def test_csv_export_since_reads_in_blocks(api_client, responses):
+    response = api_client.get(EXPORT_URL.format("csv"), {"since": "2000-01-01T00:00:00Z"})
+
+    rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode("utf-8"))))
+    assert sorted(int(row[0]) for row in rows[1:]) == [r.id for r in responses]
+
+
+# Los borradores no se exportan y el cursor no los salta: se exportan al finalizarse
+@pytest.mark.django_db
+def test_exports_wait_for_open_drafts(api_client, user, survey):
+    question = Question.objects.get(id=1)
+    completed = SurveyAttempt.objects.create(user=user, survey=survey, has_lived_in_colombia=True)
+    draft = SurveyAttempt.objects.create(
+        user=user, survey=survey, has_lived_in_colombia=True, status=SurveyAttempt.STATUS_DRAFT
+    )
+    later = SurveyAttempt.objects.create(user=user, survey=survey, has_lived_in_colombia=True)
+    first, pending, last = Response.objects.bulk_create([
+        Response(user=user, survey_attempt=attempt, question=question, response_text=attempt.status)
+        for attempt in (completed, draft, later)
+    ])
+
+    def export(params):
+        response = api_client.get(EXPORT_URL.format("csv"), params)
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode("utf-8"))))
+        return [int(row[0]) for row in rows[1:]], response
+
+    assert export({})[0] == [first.id, last.id]
+    ids, response = export({"since_id": 0})
+    assert ids == [first.id]
+    assert response["X-Next-Since-Id"] == str(first.id)
+    ids, response = export({"since": "2000-01-01T00:00:00Z"})
+    assert ids == [first.id]
+    since_cursor = response["X-Next-Since"]
+    wide_ids, response = export({"layout": "wide", "survey": survey.id, "since_id": 0})
+    assert wide_ids == [completed.id]
+    assert response["X-Next-Since-Id"] == str(completed.id)
+
+    SurveyAttempt.objects.filter(pk=draft.pk).update(status=SurveyAttempt.STATUS_COMPLETED)
+    assert export({"since_id": first.id})[0] == [pending.id, last.id]
+    assert export({"since": since_cursor})[0] == [pending.id, last.id]
+    assert export({"layout": "wide", "survey": survey.id, "since_id": completed.id})[0] == [draft.id, later.id]
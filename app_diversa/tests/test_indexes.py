@@ -0,0 +1,53 @@
+import pytest
+from django.db import connection
+from django.db.models import Count, Max
+from app_diversa.models import Response, SurveyAttempt
+
+# Los planes se comprueban con el formato de `EXPLAIN QUERY PLAN` de SQLite; en MySQL, con las
+# tablas vacías de las pruebas, el optimizador puede preferir un recorrido completo
+pytestmark = pytest.mark.skipif(connection.vendor != 'sqlite', reason="Planes de consulta de SQLite")
+
+
+def _plan(queryset):
+    return queryset.explain()
+
+
+# Conteos por opción de la tabulación: solo el índice, sin leer la tabla
+@pytest.mark.django_db
+def test_option_counts_use_question_option_index():
+    queryset = Response.objects.filter(question_id=1, option_selected__isnull=False).values(
+        'option_selected_id', 'survey_attempt_id'
+    )
+    assert "COVERING INDEX response_question_option_idx" in _plan(queryset)
+
+
+@pytest.mark.django_db
+def test_geo_filters_use_geo_index():
+    assert "response_geo_idx" in _plan(Response.objects.filter(department_id=5, municipality_id=7))
+
+
+# Orden por defecto del admin de respuestas
+@pytest.mark.django_db
+def test_admin_ordering_uses_created_index():
+    plan = _plan(Response.objects.order_by('-created_at', '-id')[:100])
+    assert "response_created_id_idx" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.django_db
+def test_attempt_lookups_use_composite_indexes():
+    wide_block = SurveyAttempt.objects.filter(
+        survey_id=1, status=SurveyAttempt.STATUS_COMPLETED, id__gt=10
+    ).order_by('id').values_list('id')[:500]
+    assert "attempt_survey_id_idx" in _plan(wide_block)
+    assert "attempt_survey_id_idx" in _plan(SurveyAttempt.objects.filter(survey_id=1).values('survey_id').annotate(last=Max('id')))
+
+    latest = SurveyAttempt.objects.filter(user_id=1, survey_id=1).order_by('-created_at', '-id')[:1]
+    assert "attempt_user_survey_idx" in _plan(latest)
+
+
+@pytest.mark.django_db
+def test_attempt_answers_use_answer_key():
+    # SQLite nombra `sqlite_autoindex_*` al índice de la restricción única
+    plan = _plan(Response.objects.filter(survey_attempt_id=1).values('question_id').annotate(n=Count('id')))
+    assert "COVERING INDEX" in plan and "(survey_attempt_id=?)" in plan
@@ -0,0 +1,78 @@
+import pytest
+from django.db import connections
+from django.test import override_settings
+from AppDANE_SEN import pagination
+from AppDANE_SEN.pagination import ApproximateCountPaginator
+from app_diversa.models import SurveyAttempt
+
+
+@pytest.fixture
+def attempts(user, survey):
+    return [SurveyAttempt.objects.create(user=user, survey=survey, has_lived_in_colombia=True) for _ in range(3)]
+
+
+# Sobre el umbral y sin filtros se usa la estadística de la tabla, sin COUNT(*)
+@pytest.mark.django_db
+@override_settings(APPROXIMATE_COUNT_THRESHOLD=1000)
+def test_unfiltered_count_uses_table_estimate(monkeypatch, attempts, django_assert_num_queries):
+    monkeypatch.setattr(pagination, "estimated_row_count", lambda model, using: 2_000_000)
+    paginator = ApproximateCountPaginator(SurveyAttempt.objects.order_by("-created_at"), 100)
+
+    with django_assert_num_queries(0):
+        assert paginator.count == 2_000_000
+    assert paginator.num_pages == 20_000
+
+
+# Bajo el umbral, con filtros o sin estadística, el total es exacto
+@pytest.mark.django_db
+@override_settings(APPROXIMATE_COUNT_THRESHOLD=1000)
+@pytest.mark.parametrize("estimate, filtered", [(500, False), (None, False), (2_000_000, True)])
+def test_count_is_exact_otherwise(monkeypatch, attempts, estimate, filtered):
+    monkeypatch.setattr(pagination, "estimated_row_count", lambda model, using: estimate)
+    queryset = SurveyAttempt.objects.order_by("-created_at")
+    if filtered:
+        queryset = queryset.filter(status=SurveyAttempt.STATUS_COMPLETED)
+
+    assert ApproximateCountPaginator(queryset, 100).count == 3
+
+
+class _StatisticsCursor:
+    def __init__(self, executed, row):
+        self.executed = executed
+        self.row = row
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        self.executed.append((sql, params))
+
+    def fetchone(self):
+        return self.row
+
+
+# Cada motor lee su propia estadística; los demás cuentan exacto
+@pytest.mark.django_db
+@pytest.mark.parametrize("vendor, row, expected, fragment", [
+    ("mysql", (2_000_000,), 2_000_000, "information_schema.TABLES"),
+    ("mysql", (None,), None, "information_schema.TABLES"),
+    ("postgresql", (2_000_000,), 2_000_000, "pg_class"),
+    ("postgresql", (-1,), None, "pg_class"),
+    ("sqlite", None, None, None),
+])
+def test_estimate_dispatches_by_vendor(monkeypatch, vendor, row, expected, fragment):
+    connection = connections["default"]
+    executed = []
+    monkeypatch.setattr(connection, "vendor", vendor)
+    monkeypatch.setattr(connection, "cursor", lambda: _StatisticsCursor(executed, row))
+
+    assert pagination.estimated_row_count(SurveyAttempt) == expected
+    if fragment is None:
+        assert executed == []
+    else:
+        [(sql, params)] = executed
+        assert fragment in sql
+        assert params == [SurveyAttempt._meta.db_table]
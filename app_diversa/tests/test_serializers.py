@@ -117,3 +117,56 @@ def test_geographic_question():
 
     assert serializer.is_valid(), serializer.errors
     assert int(serializer.validated_data["answer"]) == department.code
+
+# Un lote de 150 respuestas resuelve sus relaciones con una consulta por modelo
+@pytest.mark.django_db
+def test_response_list_resolves_related_fields_in_batch(user, django_assert_max_num_queries):
+    from rest_framework.test import APIRequestFactory
+    from app_diversa.models import SubQuestion, SurveyAttempt
+    from app_diversa.factories import SurveyFactory
+    from app_diversa.survey_schema import survey_schemas
+    from app_geo.models import Municipality
+
+    survey = SurveyFactory()
+    attempt = SurveyAttempt.objects.create(user=user, survey=survey, has_lived_in_colombia=True)
+    department = Department.objects.create(code=5, name="Antioquia", country_numeric_code=170)
+    municipality = Municipality.objects.create(code=5001, name="Medellín", department_code=5)
+
+    payload = []
+    for _ in range(40):
+        question = QuestionFactory(survey=survey, question_type="open")
+        payload.append({"question_id": question.id, "answer": "texto"})
+    for _ in range(40):
+        question = QuestionFactory(survey=survey, question_type="closed")
+        option = Option.objects.create(question=question, text_option="Opción")
+        payload.append({"question_id": question.id, "option_selected": option.id})
+    for _ in range(20):
+        question = QuestionFactory(survey=survey, question_type="multiple", is_multiple=True)
+        options = [Option.objects.create(question=question, text_option=f"Opción {n}") for n in range(3)]
+        payload.append({"question_id": question.id, "options_multiple_selected": [o.id for o in options]})
+    matrix = QuestionFactory(survey=survey, question_type="matrix")
+    for n in range(40):
+        subquestion = SubQuestion.objects.create(id=1000 + n, parent_question=matrix, text_subquestion=f"Fila {n}")
+        option = Option.objects.create(subquestion=subquestion, text_option="Sí")
+        payload.append({"question_id": matrix.id, "subquestion_id": subquestion.id, "option_selected": option.id})
+    for _ in range(10):
+        question = QuestionFactory(survey=survey, question_type="closed", is_geographic=True, geography_type="MUNICIPALITY")
+        payload.append({"question_id": question.id, "department": department.id, "municipality": municipality.id, "answer": "geo"})
+    for item in payload:
+        item["survey_attempt"] = attempt.id
+    assert len(payload) == 150
+
+    schema = survey_schemas.get(survey.id)
+    request = APIRequestFactory().post("/")
+    request.user = user
+    serializer = ResponseSerializer(data=payload, many=True, context={"request": request, "survey_schema": schema})
+
+    # Option, SubQuestion, SurveyAttempt, Department y Municipality: una consulta cada uno
+    with django_assert_max_num_queries(5):
+        assert serializer.is_valid(), [error for error in serializer.errors if error]
+
+    # Referencias inexistentes se siguen informando por elemento
+    payload[0]["option_selected"] = 99999
+    serializer = ResponseSerializer(data=payload, many=True, context={"request": request, "survey_schema": schema})
+    assert not serializer.is_valid()
+    assert "option_selected" in serializer.errors[0]
@@ -0,0 +1,68 @@
+import pytest
+from app_diversa.models import Option, Response, SurveyAttempt
+from app_diversa.factories import QuestionFactory
+
+BATCH_URL = "/app_diversa/v1/submit-response/batch/"
+
+
+def _attempt(screening_answers, answers, key=None):
+    attempt = {"responses": [dict(item) for item in screening_answers] + answers}
+    if key:
+        attempt["idempotency_key"] = key
+    return attempt
+
+
+# Cada intento del lote se guarda o falla por separado, y el resultado conserva el orden
+@pytest.mark.django_db
+def test_batch_reports_partial_failures(api_client, survey, screening_answers):
+    question = QuestionFactory(survey=survey, question_type="open")
+    no = Option.objects.get(question_id=1, text_option="No")
+
+    payload = {"attempts": [
+        _attempt(screening_answers, [{"question_id": question.id, "answer": "primero"}]),
+        _attempt(screening_answers, [{"question_id": 999999, "answer": "pregunta inexistente"}]),
+        {"responses": [{"question_id": 1, "option_selected": no.id, "survey_id": survey.id}]},
+        "no es un intento",
+        _attempt(screening_answers, [{"question_id": question.id, "answer": "último"}]),
+    ]}
+    response = api_client.post(BATCH_URL, payload, format="json")
+
+    assert response.status_code == 200
+    assert [result["status"] for result in response.data["results"]] == [201, 400, 200, 400, 201]
+    assert [result["index"] for result in response.data["results"]] == [0, 1, 2, 3, 4]
+    assert response.data["results"][2]["rejected"] is True
+    assert response.data["saved"] == 2
+
+    # El intento fallido no deja rastro; el rechazado queda registrado
+    assert SurveyAttempt.objects.count() == 3
+    assert sorted(Response.objects.values_list("response_text", flat=True)) == ["primero", "último"]
+
+
+# Reenviar el lote con las mismas llaves no duplica los intentos ya guardados
+@pytest.mark.django_db
+def test_batch_retry_with_idempotency_keys(api_client, survey, screening_answers):
+    question = QuestionFactory(survey=survey, question_type="open")
+    payload = {"attempts": [
+        _attempt(screening_answers, [{"question_id": question.id, "answer": f"cuestionario {n}"}], key=f"equipo-7-{n}")
+        for n in range(3)
+    ]}
+
+    first = api_client.post(BATCH_URL, payload, format="json")
+    retry = api_client.post(BATCH_URL, payload, format="json")
+
+    assert [result["replayed"] for result in first.data["results"]] == [False] * 3
+    assert [result["replayed"] for result in retry.data["results"]] == [True] * 3
+    assert [result["status"] for result in retry.data["results"]] == [201] * 3
+    assert SurveyAttempt.objects.count() == 3
+    assert Response.objects.count() == 3
+
+    payload["attempts"][1]["responses"][-1]["answer"] = "cambiado"
+    changed = api_client.post(BATCH_URL, payload, format="json")
+    assert [result["status"] for result in changed.data["results"]] == [201, 422, 201]
+    assert Response.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_batch_requires_attempts_list(api_client):
+    assert api_client.post(BATCH_URL, [], format="json").status_code == 400
+    assert api_client.post(BATCH_URL, {"attempts": []}, format="json").status_code == 400
@@ -0,0 +1,204 @@
+import pytest
+from datetime import date
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from app_diversa.eligibility import evaluate_eligibility
+from app_diversa.models import EligibilityRule, Option, Response, SurveyAttempt
+from app_diversa.factories import QuestionFactory, SurveyFactory
+from app_diversa.idempotency import idempotency_results
+from app_diversa.survey_schema import survey_schemas
+
+SUBMIT_URL = "/app_diversa/v1/submit-response/"
+
+
+def _inserts_into(queries, table):
+    return [q for q in queries if q["sql"].startswith("INSERT") and f'"{table}"' in q["sql"]]
+
+
+# Las respuestas de un envío se guardan con un único INSERT más uno para las opciones múltiples
+@pytest.mark.django_db
+def test_submit_response_uses_bulk_inserts(api_client, survey, screening_answers):
+    open_questions = [QuestionFactory(survey=survey, question_type="open") for _ in range(20)]
+    closed = QuestionFactory(survey=survey, question_type="closed")
+    other = Option.objects.create(question=closed, text_option="Otro", is_other=True)
+    multiple = QuestionFactory(survey=survey, question_type="multiple", is_multiple=True)
+    first = Option.objects.create(question=multiple, text_option="Uno")
+    second = Option.objects.create(question=multiple, text_option="Dos")
+
+    payload = screening_answers + [
+        {"question_id": question.id, "answer": "Bogotá Región"} for question in open_questions
+    ] + [
+        {"question_id": closed.id, "option_selected": other.id, "other_text": "Añoranza"},
+        {"question_id": multiple.id, "options_multiple_selected": [first.id, second.id]},
+    ]
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = api_client.post(SUBMIT_URL, payload, format="json")
+
+    assert response.status_code == 201, response.data
+    assert len(_inserts_into(ctx.captured_queries, "app_diversa_response")) == 1
+    assert len(_inserts_into(ctx.captured_queries, "app_diversa_response_options_multiple_selected")) == 1
+
+    attempt = SurveyAttempt.objects.get()
+    assert attempt.responses.count() == len(open_questions) + 2
+    assert attempt.responses.filter(normalized_response_text="bogota region").count() == len(open_questions)
+    assert attempt.responses.get(question=closed).normalized_other_text == "anoranza"
+    assert set(
+        attempt.responses.get(question=multiple).options_multiple_selected.values_list("id", flat=True)
+    ) == {first.id, second.id}
+
+
+# Si una respuesta del lote es inválida no se guarda ninguna, ni el intento
+@pytest.mark.django_db
+def test_submit_response_is_atomic(api_client, survey, screening_answers):
+    question = QuestionFactory(survey=survey, question_type="open")
+    multiple = QuestionFactory(survey=survey, question_type="multiple", is_multiple=True)
+
+    payload = screening_answers + [
+        {"question_id": question.id, "answer": "válida"},
+        {"question_id": multiple.id, "options_multiple_selected": []},
+    ]
+    response = api_client.post(SUBMIT_URL, payload, format="json")
+
+    assert response.status_code == 400
+    assert not Response.objects.exists()
+    assert not SurveyAttempt.objects.exists()
+
+
+# El tamizaje sigue las reglas de la encuesta: la opción que rechaza no guarda respuestas
+@pytest.mark.django_db
+def test_submit_response_rejects_with_option_rule(api_client, survey):
+    no = Option.objects.get(question_id=1, text_option="No")
+    response = api_client.post(SUBMIT_URL, [{"question_id": 1, "option_selected": no.id, "survey_id": survey.id}], format="json")
+
+    assert response.status_code == 200
+    assert response.data == {"message": "No cumple con los requisitos para la encuesta.", "rejected": True}
+    attempt = SurveyAttempt.objects.get()
+    assert attempt.has_lived_in_colombia is False
+    assert attempt.rejection_note == "El usuario no ha vivido en Colombia los últimos 5 años."
+    assert not Response.objects.exists()
+
+
+@pytest.mark.django_db
+def test_submit_response_rejects_below_min_age(api_client, survey, screening_answers):
+    screening_answers[1]["answer"] = date.today().replace(year=date.today().year - 10).isoformat()
+    response = api_client.post(SUBMIT_URL, screening_answers, format="json")
+
+    assert response.status_code == 200
+    assert response.data["message"] == "No cumple con los requisitos de edad."
+    attempt = SurveyAttempt.objects.get()
+    assert attempt.has_lived_in_colombia is True
+    assert attempt.rejection_note == "El usuario tiene 10 años y no cumple con la edad mínima."
+
+
+@pytest.mark.django_db
+def test_submit_response_requests_missing_birth_date(api_client, survey, screening_answers):
+    response = api_client.post(SUBMIT_URL, screening_answers[:1], format="json")
+
+    assert response.status_code == 206
+    assert response.data == {"message": "Debe responder la fecha de nacimiento."}
+    assert not SurveyAttempt.objects.exists()
+
+
+# Cada encuesta usa sus propias preguntas de tamizaje, sin ids fijos
+@pytest.mark.django_db
+def test_submit_response_uses_rules_of_each_survey(api_client, survey):
+    other_survey = SurveyFactory()
+    employee = QuestionFactory(survey=other_survey, question_type="closed")
+    yes = Option.objects.create(question=employee, text_option="Sí")
+    no = Option.objects.create(question=employee, text_option="No")
+    EligibilityRule.objects.create(
+        survey=other_survey, rule_type=EligibilityRule.RULE_REJECT_OPTION, question=employee, option=yes,
+        rejection_message="La encuesta no está dirigida a funcionarios.",
+    )
+    question = QuestionFactory(survey=other_survey, question_type="open")
+
+    rejected = api_client.post(
+        SUBMIT_URL, [{"question_id": employee.id, "option_selected": yes.id, "survey_id": other_survey.id}], format="json"
+    )
+    assert rejected.data == {"message": "La encuesta no está dirigida a funcionarios.", "rejected": True}
+
+    accepted = api_client.post(SUBMIT_URL, [
+        {"question_id": employee.id, "option_selected": no.id, "survey_id": other_survey.id},
+        {"question_id": question.id, "answer": "respuesta"},
+    ], format="json")
+    assert accepted.status_code == 201, accepted.data
+    attempt = SurveyAttempt.objects.get(success_note__isnull=False)
+    assert list(attempt.responses.values_list("question_id", flat=True)) == [question.id]
+
+
+# Las reglas compiladas se evalúan sin consultas
+@pytest.mark.django_db
+def test_evaluate_eligibility_runs_in_memory(survey, screening_answers, django_assert_num_queries):
+    schema = survey_schemas.get(survey.id)
+    answers = {item["question_id"]: item for item in screening_answers}
+
+    with django_assert_num_queries(0):
+        result = evaluate_eligibility(schema, answers, today=date(2025, 5, 16))
+
+    assert result.is_eligible
+    assert result.age == 34
+    assert schema.screening_question_ids == {1, 2}
+
+
+# Un reintento con la misma Idempotency-Key devuelve el resultado original sin escribir de nuevo
+@pytest.mark.django_db(transaction=True)
+def test_submit_response_replays_idempotent_retries(api_client, survey, screening_answers, django_assert_num_queries):
+    question = QuestionFactory(survey=survey, question_type="open")
+    payload = screening_answers + [{"question_id": question.id, "answer": "una vez"}]
+
+    first = api_client.post(SUBMIT_URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="envio-1")
+    assert first.status_code == 201
+
+    # La LRU responde sin consultas; sin ella basta una lectura por índice
+    with django_assert_num_queries(0):
+        retry = api_client.post(SUBMIT_URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="envio-1")
+    idempotency_results.clear()
+    with django_assert_num_queries(1):
+        cold_retry = api_client.post(SUBMIT_URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="envio-1")
+
+    for replay in (retry, cold_retry):
+        assert replay.status_code == 201
+        assert replay.data == first.data
+        assert replay["Idempotent-Replayed"] == "true"
+    assert SurveyAttempt.objects.count() == 1
+    assert Response.objects.count() == 1
+
+    other = api_client.post(SUBMIT_URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="envio-2")
+    assert other.status_code == 201
+    assert SurveyAttempt.objects.count() == 2
+
+
+# Reusar la llave con otro cuerpo se rechaza en lugar de devolver el resultado del primer envío
+@pytest.mark.django_db
+def test_idempotency_key_reused_with_different_body(api_client, survey, screening_answers):
+    question = QuestionFactory(survey=survey, question_type="open")
+    payload = screening_answers + [{"question_id": question.id, "answer": "primera"}]
+    assert api_client.post(SUBMIT_URL, payload, format="json", HTTP_IDEMPOTENCY_KEY="envio-1").status_code == 201
+
+    changed = screening_answers + [{"question_id": question.id, "answer": "otra"}]
+    for _ in range(2):
+        response = api_client.post(SUBMIT_URL, changed, format="json", HTTP_IDEMPOTENCY_KEY="envio-1")
+        assert response.status_code == 422
+        assert "Idempotent-Replayed" not in response
+        idempotency_results.clear()
+    assert list(Response.objects.values_list("response_text", flat=True)) == ["primera"]
+
+    # El mismo cuerpo con las llaves en otro orden es el mismo envío
+    reordered = [dict(reversed(list(item.items()))) for item in payload]
+    assert api_client.post(SUBMIT_URL, reordered, format="json", HTTP_IDEMPOTENCY_KEY="envio-1").status_code == 201
+
+
+# Si el lote falla, la llave no queda registrada y el envío corregido se procesa
+@pytest.mark.django_db
+def test_failed_submission_does_not_consume_idempotency_key(api_client, survey, screening_answers):
+    multiple = QuestionFactory(survey=survey, question_type="multiple", is_multiple=True)
+    option = Option.objects.create(question=multiple, text_option="Uno")
+
+    invalid = screening_answers + [{"question_id": multiple.id, "options_multiple_selected": []}]
+    assert api_client.post(SUBMIT_URL, invalid, format="json", HTTP_IDEMPOTENCY_KEY="envio-1").status_code == 400
+
+    valid = screening_answers + [{"question_id": multiple.id, "options_multiple_selected": [option.id]}]
+    response = api_client.post(SUBMIT_URL, valid, format="json", HTTP_IDEMPOTENCY_KEY="envio-1")
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response
@@ -0,0 +1,41 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from app_diversa.models import Option, ResponseSummary, StaleResponseSummary
+from app_diversa.factories import QuestionFactory
+from app_diversa.summaries import compute_summary_counts, summary_table_counts
+
+SUBMIT_URL = "/app_diversa/v1/submit-response/"
+
+
+# Cada envío aceptado suma sus respuestas a los contadores en la misma transacción
+@pytest.mark.django_db
+def test_submission_updates_summaries(api_client, survey, screening_answers):
+    multiple = QuestionFactory(survey=survey, question_type="multiple", is_multiple=True)
+    first = Option.objects.create(question=multiple, text_option="Uno")
+    second = Option.objects.create(question=multiple, text_option="Dos")
+    payload = screening_answers + [{"question_id": multiple.id, "options_multiple_selected": [first.id, second.id]}]
+
+    for _ in range(2):
+        assert api_client.post(SUBMIT_URL, payload, format="json").status_code == 201
+
+    assert ResponseSummary.objects.get(question=multiple, option_key=0).count == 2
+    assert ResponseSummary.objects.get(question=multiple, option_key=first.id).count == 2
+    assert summary_table_counts() == compute_summary_counts()
+    # Los envíos suman directamente; no dejan la encuesta por recalcular
+    assert not StaleResponseSummary.objects.exists()
+    call_command("rebuild_response_summaries", "--verify")
+
+
+@pytest.mark.django_db
+def test_rebuild_fixes_drift(api_client, survey, screening_answers):
+    open_question = QuestionFactory(survey=survey, question_type="open")
+    payload = screening_answers + [{"question_id": open_question.id, "answer": "Medellín"}]
+    assert api_client.post(SUBMIT_URL, payload, format="json").status_code == 201
+    assert ResponseSummary.objects.update(count=99) == 1
+
+    with pytest.raises(CommandError):
+        call_command("rebuild_response_summaries", "--verify")
+
+    call_command("rebuild_response_summaries")
+    call_command("rebuild_response_summaries", "--verify")
@@ -0,0 +1,111 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from app_diversa.models import Option, SubQuestion, Survey, SurveyText
+from app_diversa.factories import SurveyFactory, ChapterFactory, QuestionFactory
+
+
+def _build_survey(chapters, questions_per_chapter):
+    survey = SurveyFactory()
+    SurveyText.objects.create(survey=survey, title="Bienvenida")
+    for _ in range(chapters):
+        chapter = ChapterFactory(survey=survey)
+        for n in range(questions_per_chapter):
+            question = QuestionFactory(
+                survey=survey, chapter=chapter, question_type="matrix", order_question=questions_per_chapter - n
+            )
+            Option.objects.create(question=question, text_option="Opción", order_option=2)
+            subquestion = SubQuestion.objects.create(
+                id=SubQuestion.objects.count() + 1, parent_question=question, text_subquestion="Fila"
+            )
+            Option.objects.create(subquestion=subquestion, text_option="Sí", order_option=1)
+    return survey
+
+
+def _retrieve(api_client, survey):
+    with CaptureQueriesContext(connection) as ctx:
+        response = api_client.get(f"/app_diversa/v1/surveys/{survey.id}/")
+    assert response.status_code == 200
+    return response, len(ctx.captured_queries)
+
+
+# El documento completo se carga con el mismo número de consultas sin importar su tamaño
+@pytest.mark.django_db
+def test_survey_retrieve_query_count_is_constant(api_client):
+    _, small = _retrieve(api_client, _build_survey(chapters=1, questions_per_chapter=1))
+    response, large = _retrieve(api_client, _build_survey(chapters=4, questions_per_chapter=6))
+
+    assert small == large
+    questions = response.json()["questions"]
+    orders = [question["order_question"] for question in questions]
+    assert orders == sorted(orders)
+    assert all(len(question["subquestions"][0]["options"]) == 1 for question in questions)
+
+
+# El documento se sirve con ETag fuerte, responde 304 y cambia de versión al editar la encuesta
+@pytest.mark.django_db
+def test_survey_retrieve_etag(api_client):
+    survey = _build_survey(chapters=1, questions_per_chapter=2)
+    url = f"/app_diversa/v1/surveys/{survey.id}/"
+
+    first = api_client.get(url)
+    etag = first["ETag"]
+    assert first.status_code == 200 and etag.startswith('"')
+
+    with CaptureQueriesContext(connection) as ctx:
+        cached = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert cached.status_code == 304
+    assert cached["ETag"] == etag
+    assert len(ctx.captured_queries) == 1
+
+    option = Option.objects.filter(question__survey=survey).first()
+    option.text_option = "Opción editada"
+    option.save()
+
+    changed = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200
+    assert changed["ETag"] != etag
+    assert "Opción editada" in changed.content.decode()
+
+
+# Guardar una instancia de la encuesta leída antes de un cambio no hace retroceder su versión
+@pytest.mark.django_db
+def test_stale_survey_save_keeps_content_version(api_client):
+    survey = _build_survey(chapters=1, questions_per_chapter=1)
+    stale = Survey.objects.get(pk=survey.pk)
+    url = f"/app_diversa/v1/surveys/{survey.id}/"
+
+    option = Option.objects.filter(question__survey=survey).first()
+    option.text_option = "Opción editada"
+    option.save()
+    etag = api_client.get(url)["ETag"]
+    edited_version = Survey.objects.get(pk=survey.pk).content_version
+
+    stale.description_name = "Nueva descripción"
+    stale.save()
+    assert stale.content_version == edited_version + 1
+    assert Survey.objects.get(pk=survey.pk).content_version == edited_version + 1
+
+    option.text_option = "Otra edición"
+    option.save()
+    changed = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200
+    assert "Otra edición" in changed.content.decode()
+
+
+# Las preguntas geográficas apuntan al catálogo compartido; `?inline_geo=1` conserva la lista embebida
+@pytest.mark.django_db
+def test_geographic_questions_reference_catalog(api_client):
+    from app_geo.models import Department
+
+    Department.objects.create(code=5, name="ANTIOQUIA", country_numeric_code=170)
+    survey = SurveyFactory()
+    QuestionFactory(survey=survey, question_type="closed", is_geographic=True, geography_type="DEPARTMENT")
+    url = f"/app_diversa/v1/surveys/{survey.id}/"
+
+    question = api_client.get(url).json()["questions"][0]
+    assert question["geography_options"] is None
+    assert question["geography_catalog"] == {"type": "DEPARTMENT", "url": "/geo/catalog/department/"}
+
+    inline = api_client.get(url, {"inline_geo": "1"}).json()["questions"][0]
+    assert [option["name"] for option in inline["geography_options"]] == ["ANTIOQUIA"]
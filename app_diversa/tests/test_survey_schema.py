@@ -0,0 +1,34 @@
+import pytest
+from app_diversa.models import Option, SubQuestion
+from app_diversa.factories import QuestionFactory, SurveyFactory
+from app_diversa.survey_schema import survey_schemas
+
+
+# La definición compilada se reutiliza sin consultas y se reconstruye tras un cambio
+@pytest.mark.django_db
+def test_schema_is_cached_and_invalidated(django_assert_num_queries):
+    survey = SurveyFactory()
+    matrix = QuestionFactory(survey=survey, question_type="matrix")
+    subquestion = SubQuestion.objects.create(id=501, parent_question=matrix, text_subquestion="Fila", is_other=True)
+    option = Option.objects.create(subquestion=subquestion, text_option="Sí")
+
+    schema = survey_schemas.get(survey.id)
+    assert schema.questions[matrix.id].is_matrix
+    assert schema.subquestions_by_parent[matrix.id] == (schema.subquestions[501],)
+    assert schema.subquestions[501].is_other
+    assert schema.options[option.id].subquestion_id == 501
+    assert survey_schemas.for_question(matrix.id) is schema
+
+    with django_assert_num_queries(0):
+        assert survey_schemas.get(survey.id) is schema
+        assert survey_schemas.for_question(matrix.id) is schema
+
+    option.text_option = "No"
+    option.save()
+    assert survey_schemas.get(survey.id).options[option.id].text_option == "No"
+
+
+@pytest.mark.django_db
+def test_unknown_survey_has_no_schema():
+    assert survey_schemas.get(987654) is None
+    assert survey_schemas.for_question(987654) is None
@@ -0,0 +1,164 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from app_diversa.models import Option, Question, Response, StaleResponseSummary, SubQuestion, SurveyAttempt
+from app_diversa.factories import QuestionFactory
+from app_diversa.summaries import rebuild_response_summaries, record_attempt_responses
+from app_geo.models import Department
+
+QUESTIONS_URL = "/app_diversa/v1/questions/{}/"
+
+
+@pytest.fixture
+def tabulated(user, survey):
+    """
+    Tres intentos: dos en Antioquia y uno en Atlántico, con la pregunta 1 (Sí/No),
+    una pregunta múltiple y una matricial.
+    """
+    lived = Question.objects.get(id=1)
+    yes, no = lived.options.order_by("order_option")
+    multiple = QuestionFactory(survey=survey, question_type="multiple", is_multiple=True)
+    first = Option.objects.create(question=multiple, text_option="Uno", order_option=1)
+    second = Option.objects.create(question=multiple, text_option="Dos", order_option=2)
+    matrix = QuestionFactory(survey=survey, question_type="matrix")
+    row = SubQuestion.objects.create(id=701, parent_question=matrix, subquestion_order=1,
+                                     text_subquestion="Fila", subquestion_type="likert")
+    low = Option.objects.create(question=matrix, text_option="Bajo", order_option=1)
+    high = Option.objects.create(question=matrix, text_option="Alto", order_option=2)
+    geo = QuestionFactory(survey=survey, question_type="open", is_geographic=True, geography_type="DEPARTMENT")
+    antioquia = Department.objects.create(code=5, name="ANTIOQUIA", country_numeric_code=170)
+    atlantico = Department.objects.create(code=8, name="ATLÁNTICO", country_numeric_code=170)
+
+    for lived_option, department, chosen, scale in (
+        (yes, antioquia, [first, second], high),
+        (no, antioquia, [first], high),
+        (yes, atlantico, [second], low),
+    ):
+        attempt = SurveyAttempt.objects.create(user=user, survey=survey, has_lived_in_colombia=True)
+        _, multiple_response, _, _ = Response.objects.bulk_create([
+            Response(user=user, survey_attempt=attempt, question=lived, option_selected=lived_option),
+            Response(user=user, survey_attempt=attempt, question=multiple),
+            Response(user=user, survey_attempt=attempt, question=matrix, subquestion=row, option_selected=scale),
+            Response(user=user, survey_attempt=attempt, question=geo, department=department),
+        ])
+        multiple_response.options_multiple_selected.set(chosen)
+
+    rebuild_response_summaries()
+    return {"lived": lived, "multiple": multiple, "matrix": matrix, "antioquia": antioquia, "atlantico": atlantico}
+
+
+@pytest.mark.django_db
+def test_frequencies(api_client, tabulated):
+    lived = api_client.get(QUESTIONS_URL.format(1) + "frequencies/").json()
+    assert lived["responses"] == 3
+    assert [(o["text_option"], o["count"]) for o in lived["options"]] == [("Sí", 2), ("No", 1)]
+
+    multiple = api_client.get(QUESTIONS_URL.format(tabulated["multiple"].id) + "frequencies/").json()
+    assert [(o["text_option"], o["count"]) for o in multiple["options"]] == [("Uno", 2), ("Dos", 2)]
+
+    matrix = api_client.get(QUESTIONS_URL.format(tabulated["matrix"].id) + "frequencies/").json()
+    assert matrix["subquestions"][0]["responses"] == 3
+    assert [(o["text_option"], o["count"]) for o in matrix["subquestions"][0]["options"]] == [("Bajo", 1), ("Alto", 2)]
+
+
+@pytest.mark.django_db
+def test_crosstab_by_department(api_client, tabulated):
+    data = api_client.get(QUESTIONS_URL.format(1) + "crosstab/", {"by": "department"}).json()
+    assert [o["text_option"] for o in data["options"]] == ["Sí", "No"]
+    assert [(row["label"], row["counts"]) for row in data["rows"]] == [("ANTIOQUIA", [1, 1]), ("ATLÁNTICO", [1, 0])]
+
+    by_question = api_client.get(
+        QUESTIONS_URL.format(tabulated["multiple"].id) + "crosstab/", {"by": "question:1"}
+    ).json()
+    assert [(row["label"], row["counts"]) for row in by_question["rows"]] == [("Sí", [1, 2]), ("No", [1, 0])]
+
+    invalid = api_client.get(QUESTIONS_URL.format(1) + "crosstab/", {"by": "planeta"})
+    assert invalid.status_code == 400
+    assert invalid.json() == {"by": ["Dimensión inválida."]}
+    assert api_client.get(QUESTIONS_URL.format(1) + "crosstab/", {"by": "question:uno"}).json() == {
+        "by": ["Dimensión inválida."]
+    }
+
+
+# Una pregunta inexistente o un id no numérico responden 404
+@pytest.mark.django_db
+def test_tabulation_of_missing_question(api_client, tabulated):
+    for pk in (999, "abc"):
+        assert api_client.get(QUESTIONS_URL.format(pk) + "frequencies/").status_code == 404
+        assert api_client.get(QUESTIONS_URL.format(pk) + "crosstab/", {"by": "department"}).status_code == 404
+    assert api_client.get(QUESTIONS_URL.format(tabulated["matrix"].id) + "crosstab/", {"by": "department"}).status_code == 400
+
+
+# Las tabulaciones se sirven desde la caché hasta que llega un envío nuevo
+@pytest.mark.django_db
+def test_tabulations_are_cached_until_new_responses(api_client, user, tabulated, django_capture_on_commit_callbacks):
+    url = QUESTIONS_URL.format(1) + "frequencies/"
+    api_client.get(url)
+    with CaptureQueriesContext(connection) as ctx:
+        api_client.get(url)
+    assert not [q for q in ctx.captured_queries if "app_diversa_response" in q["sql"]]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        attempt = SurveyAttempt.objects.create(user=user, survey=tabulated["lived"].survey, has_lived_in_colombia=True)
+        Response.objects.create(user=user, survey_attempt=attempt, question=tabulated["lived"],
+                                option_selected=tabulated["lived"].options.get(text_option="No"))
+        record_attempt_responses(attempt)
+
+    assert api_client.get(url).json()["responses"] == 4
+
+
+# Eliminar o editar respuestas e intentos fuera del envío recalcula los contadores en la siguiente lectura
+@pytest.mark.django_db
+def test_summaries_follow_deletes_and_edits(api_client, tabulated, django_capture_on_commit_callbacks):
+    frequencies = QUESTIONS_URL.format(1) + "frequencies/"
+    crosstab = QUESTIONS_URL.format(1) + "crosstab/"
+    assert api_client.get(frequencies).json()["responses"] == 3
+    lived_responses = list(Response.objects.filter(question=tabulated["lived"]).order_by("id"))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        lived_responses[0].survey_attempt.delete()
+    data = api_client.get(frequencies).json()
+    assert data["responses"] == 2
+    assert [(o["text_option"], o["count"]) for o in data["options"]] == [("Sí", 1), ("No", 1)]
+
+    # Cambiar el departamento de un intento mueve todas sus respuestas en la tabla cruzada
+    with django_capture_on_commit_callbacks(execute=True):
+        geo_response = Response.objects.get(survey_attempt=lived_responses[1].survey_attempt, department__isnull=False)
+        geo_response.department = tabulated["atlantico"]
+        geo_response.save()
+    rows = api_client.get(crosstab, {"by": "department"}).json()["rows"]
+    assert [(row["label"], row["counts"]) for row in rows] == [("ATLÁNTICO", [1, 1])]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        multiple_response = Response.objects.filter(question=tabulated["multiple"]).order_by("id").last()
+        multiple_response.options_multiple_selected.clear()
+    multiple = api_client.get(QUESTIONS_URL.format(tabulated["multiple"].id) + "frequencies/").json()
+    assert [(o["text_option"], o["count"]) for o in multiple["options"]] == [("Uno", 1), ("Dos", 0)]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        attempt = lived_responses[1].survey_attempt
+        attempt.status = SurveyAttempt.STATUS_DRAFT
+        attempt.save()
+    assert api_client.get(frequencies).json()["responses"] == 1
+    assert not StaleResponseSummary.objects.exists()
+
+
+# Una eliminación en cascada marca cada encuesta una vez, no una por fila
+@pytest.mark.django_db
+def test_cascade_delete_marks_survey_once(api_client, user, tabulated, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks() as callbacks, CaptureQueriesContext(connection) as ctx:
+        SurveyAttempt.objects.filter(user=user).delete()
+
+    marks = [q for q in ctx.captured_queries if "app_diversa_staleresponsesummary" in q["sql"]]
+    assert len(marks) == 1
+    assert len(callbacks) == 2
+    for callback in callbacks:
+        callback()
+    assert api_client.get(QUESTIONS_URL.format(1) + "frequencies/").json()["responses"] == 0
+
+    # Al eliminar la encuesta no se marca nada y se descarta la marca que quedara
+    StaleResponseSummary.objects.create(survey_id=tabulated["lived"].survey_id)
+    with CaptureQueriesContext(connection) as ctx:
+        tabulated["lived"].survey.delete()
+    assert not [q for q in ctx.captured_queries if q["sql"].startswith("INSERT") and "staleresponsesummary" in q["sql"]]
+    assert not StaleResponseSummary.objects.exists()
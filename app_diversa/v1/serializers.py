@@ -1,7 +1,23 @@
 from rest_framework import serializers
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models, transaction
+from django.utils.timezone import now
 from datetime import date, datetime
-from ..models import SurveyAttempt, Survey, Question, SubQuestion, Option, Response, Chapter, SurveyText
+from ..models import SurveyAttempt, Survey, Question, SubQuestion, Option, Response, Chapter, SurveyText, ExportJob
+from ..survey_schema import survey_schemas
+from ..exports import parse_since
+from ..tabulation import bump_tabulation_version
+from django.urls import reverse
 from app_geo.models import Country, Department, Municipality
+from app_geo.catalog import GEOGRAPHY_TYPES, get_geo_catalog
+
+def is_inline_geo_requested(request):
+    """
+    Indica si el cliente pidió los catálogos geográficos embebidos (`?inline_geo=1`).
+    """
+    query_params = getattr(request, 'query_params', None) or {}
+    return query_params.get('inline_geo') in ('1', 'true')
+
 
 class SurveyAttemptSerializer(serializers.ModelSerializer):
     """
@@ -79,6 +95,7 @@ class QuestionSerializer(serializers.ModelSerializer):
     subquestions = SubQuestionSerializer(many=True, read_only=True)
     chapter = serializers.PrimaryKeyRelatedField(queryset=Chapter.objects.all(), required=False)
     geography_options = serializers.SerializerMethodField()
+    geography_catalog = serializers.SerializerMethodField()
 
     # Validar los datos adicionales desde `validation_rules`
     def validate(self, data):
@@ -102,7 +119,7 @@ class QuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Question
         fields = [
-            'id', 'order_question', 'text_question', 'note', 'instruction', 'is_geographic', 'geography_type', 'question_type', 'matrix_layout_type','is_required', 'data_type', 'min_value', 'max_value', 'chapter', 'survey', 'is_multiple', 'options', 'geography_options', 'subquestions', 'created_at', 'updated_at'
+            'id', 'order_question', 'text_question', 'note', 'instruction', 'is_geographic', 'geography_type', 'question_type', 'matrix_layout_type','is_required', 'data_type', 'min_value', 'max_value', 'chapter', 'survey', 'is_multiple', 'options', 'geography_options', 'geography_catalog', 'subquestions', 'created_at', 'updated_at'
         ]
 
     def validate_question_type(self, value):
@@ -111,20 +128,27 @@ class QuestionSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f"El tipo de pregunta '{value}' no es válido.")
         return value
 
+    def get_geography_catalog(self, obj):
+        """
+        Referencia al catálogo geográfico compartido que el cliente descarga y guarda aparte.
+        """
+        if obj.is_geographic and obj.geography_type in GEOGRAPHY_TYPES:
+            return {
+                "type": obj.geography_type,
+                "url": reverse('geo-catalog', args=[obj.geography_type.lower()]),
+            }
+        return None
+
     def get_geography_options(self, obj):
+        """
+        Solo se incluye la lista completa de lugares si el cliente la pide con `?inline_geo=1`.
+        """
         if obj.is_geographic and obj.geography_type:  # Verificar si geography_type no es None
-            if obj.geography_type not in ['COUNTRY', 'DEPARTMENT', 'MUNICIPALITY']:
+            if obj.geography_type not in GEOGRAPHY_TYPES:
                 raise serializers.ValidationError("Tipo de lugar inválido.")
 
-            queryset = None
-            if obj.geography_type == 'COUNTRY':
-                queryset = Country.objects.all()
-            elif obj.geography_type == 'DEPARTMENT':
-                queryset = Department.objects.all()
-            elif obj.geography_type == 'MUNICIPALITY':
-                queryset = Municipality.objects.all()
-
-            return queryset.values('id', 'name')
+            if is_inline_geo_requested(self.context.get('request')):
+                return get_geo_catalog(obj.geography_type).rows
         return None
 
     def create(self, validated_data):
@@ -169,6 +193,48 @@ class SurveyTextSerializer(serializers.ModelSerializer):
         model = SurveyText
         fields = ['id', 'survey', 'title', 'description', 'is_active', 'created_at', 'updated_at']
 
+class ExportJobSerializer(serializers.ModelSerializer):
+    """
+    Solicitud y estado de una exportación asíncrona.
+    """
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'export_format', 'layout', 'survey', 'since', 'since_id', 'status', 'next_cursor', 'row_count',
+            'size_bytes', 'elapsed_seconds', 'error', 'created_at', 'started_at', 'finished_at', 'expires_at',
+            'download_url'
+        ]
+        read_only_fields = [
+            'status', 'next_cursor', 'row_count', 'size_bytes', 'elapsed_seconds', 'error', 'created_at', 'started_at',
+            'finished_at', 'expires_at'
+        ]
+
+    def get_download_url(self, obj):
+        if obj.status != ExportJob.STATUS_DONE:
+            return None
+        return reverse('export-job-download', args=[obj.pk])
+
+    def validate(self, data):
+        if data.get('since') and data.get('since_id') is not None:
+            raise serializers.ValidationError({"since": "Use solo uno de los cursores `since` o `since_id`."})
+        if data.get('since'):
+            try:
+                parse_since(data['since'])
+            except ValueError:
+                raise serializers.ValidationError({"since": "Cursor inválido."})
+
+        if data.get('layout') == 'wide':
+            if data.get('since'):
+                raise serializers.ValidationError({"since": "La exportación ancha solo admite el cursor `since_id`."})
+            if not data.get('survey'):
+                raise serializers.ValidationError({"survey": "La exportación ancha requiere una encuesta."})
+            if data.get('export_format') != 'csv':
+                raise serializers.ValidationError({"export_format": "La exportación ancha solo está disponible en CSV."})
+        return data
+
+
 class SurveySerializer(serializers.ModelSerializer):
     chapters = ChapterSerializer(many=True, required=False)
     questions = QuestionSerializer(many=True, required=False)
@@ -254,36 +320,282 @@ class SurveySerializer(serializers.ModelSerializer):
 
         return instance
 
+# Tamaño de lote para las inserciones masivas de respuestas
+BULK_BATCH_SIZE = 500
+
+
+def bulk_insert_responses(instances, options_per_instance):
+    """
+    Persiste las respuestas con un único `bulk_create` y una única inserción masiva en la
+    tabla intermedia de `options_multiple_selected`, dentro de una misma transacción.
+
+    `options_per_instance` es una lista paralela a `instances` con las opciones múltiples de cada una.
+    """
+    with transaction.atomic():
+        Response.objects.bulk_create(instances, batch_size=BULK_BATCH_SIZE)
+
+        pending = [(instance, options) for instance, options in zip(instances, options_per_instance) if options]
+        _assign_missing_pks([instance for instance, _ in pending])
+
+        through_model = Response.options_multiple_selected.through
+        through_model.objects.bulk_create(
+            [
+                through_model(response_id=instance.pk, option_id=option.pk)
+                for instance, options in pending
+                for option in options
+            ],
+            batch_size=BULK_BATCH_SIZE
+        )
+
+        # `bulk_create` no dispara `post_save`; se invalidan aquí las tabulaciones afectadas
+        survey_ids = {
+            schema.survey_id
+            for schema in map(survey_schemas.for_question, {instance.question_id for instance in instances})
+            if schema is not None
+        }
+        transaction.on_commit(lambda: bump_tabulation_version(survey_ids))
+
+    return instances
+
+
+# Campos que reemplaza un upsert de respuestas sobre la fila existente
+UPSERT_FIELDS = [
+    'user', 'response_text', 'normalized_response_text', 'other_text', 'normalized_other_text',
+    'response_number', 'option_selected', 'country', 'department', 'municipality', 'updated_at',
+]
+
+
+def upsert_responses(instances, options_per_instance):
+    """
+    Inserta o reemplaza respuestas de un intento por su llave (survey_attempt, question,
+    subquestion). Las filas existentes se leen con una consulta y se actualizan con un
+    `bulk_update`; las nuevas se insertan con un `bulk_create`. No se usa
+    `bulk_create(update_conflicts=True)`: MySQL no admite `unique_fields` ni devuelve el id de
+    las filas actualizadas. Las opciones múltiples de las respuestas recibidas se reemplazan
+    con un borrado y una inserción masiva. Si el lote trae la misma llave más de una vez, gana
+    la última.
+
+    Quien llama debe tener bloqueado el intento (`select_for_update`) para que dos upserts
+    concurrentes no inserten la misma llave.
+    """
+    latest = {}
+    for instance, options in zip(instances, options_per_instance):
+        latest[(instance.survey_attempt_id, instance.question_id, instance.subquestion_id or 0)] = (instance, options)
+    instances = [instance for instance, _ in latest.values()]
+
+    with transaction.atomic():
+        existing = {
+            (attempt_id, question_id, subquestion_key): pk
+            for pk, attempt_id, question_id, subquestion_key in Response.objects.filter(
+                survey_attempt_id__in={attempt_id for attempt_id, _, _ in latest},
+                question_id__in={question_id for _, question_id, _ in latest},
+            ).values_list('id', 'survey_attempt_id', 'question_id', 'subquestion_key')
+        }
+
+        to_update, to_create = [], []
+        updated_at = now()
+        for key, (instance, _) in latest.items():
+            instance.pk = existing.get(key)
+            if instance.pk is None:
+                to_create.append(instance)
+            else:
+                instance.updated_at = updated_at
+                to_update.append(instance)
+
+        Response.objects.bulk_update(to_update, UPSERT_FIELDS, batch_size=BULK_BATCH_SIZE)
+        Response.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+        _assign_missing_pks(to_create)
+
+        through_model = Response.options_multiple_selected.through
+        through_model.objects.filter(response_id__in=[instance.pk for instance in instances]).delete()
+        through_model.objects.bulk_create(
+            [
+                through_model(response_id=instance.pk, option_id=option.pk)
+                for instance, options in latest.values()
+                for option in options
+            ],
+            batch_size=BULK_BATCH_SIZE
+        )
+
+    return instances
+
+
+def _assign_missing_pks(instances):
+    """
+    Algunos motores (MySQL) no devuelven los ids generados por `bulk_create`.
+    Se recuperan con una sola consulta usando la clave (survey_attempt, question, subquestion),
+    que es única dentro de un envío; ante duplicados gana la fila más reciente.
+    """
+    missing = [instance for instance in instances if instance.pk is None]
+    if not missing:
+        return
+
+    attempt_ids = {instance.survey_attempt_id for instance in missing}
+    rows = Response.objects.filter(
+        user_id__in={instance.user_id for instance in missing},
+        question_id__in={instance.question_id for instance in missing},
+    )
+    if None in attempt_ids:
+        rows = rows.filter(
+            models.Q(survey_attempt_id__in=attempt_ids - {None}) | models.Q(survey_attempt__isnull=True)
+        )
+    else:
+        rows = rows.filter(survey_attempt_id__in=attempt_ids)
+
+    pks = {
+        (attempt_id, question_id, subquestion_id): pk
+        for pk, attempt_id, question_id, subquestion_id in rows.order_by('id').values_list(
+            'id', 'survey_attempt_id', 'question_id', 'subquestion_id'
+        )
+    }
+    for instance in missing:
+        instance.pk = pks.get((instance.survey_attempt_id, instance.question_id, instance.subquestion_id))
+
+
+def _subquestion_pk(validated_data):
+    return validated_data.get("subquestion_id") or getattr(validated_data.get("subquestion"), "pk", None)
+
+
+class BatchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    `PrimaryKeyRelatedField` que toma la instancia de las ya resueltas en lote por
+    `ResponseListSerializer` (`context['resolved_instances']`) en lugar de hacer un
+    `queryset.get(pk=...)` por elemento. Fuera de un lote se comporta como el campo original.
+    """
+
+    def to_internal_value(self, data):
+        model = self.get_queryset().model
+        resolved = self.context.get('resolved_instances', {}).get(model)
+        if resolved is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = model._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in resolved:
+            self.fail('does_not_exist', pk_value=data)
+        return resolved[pk]
+
+
+class ResponseListSerializer(serializers.ListSerializer):
+    """
+    Serializer de lista usado por `ResponseSerializer(many=True)`.
+
+    Antes de validar cada elemento reúne los ids referenciados por todo el lote y resuelve
+    cada modelo relacionado con un único `filter(pk__in=...)`. Luego persiste el lote con
+    `bulk_insert_responses` en lugar de crear cada respuesta y sus opciones por separado.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self._context = {**self._context, 'resolved_instances': self.resolve_related_instances(data)}
+        return super().to_internal_value(data)
+
+    def resolve_related_instances(self, data):
+        """
+        Devuelve `{modelo: {pk: instancia}}` para los campos relacionados del hijo,
+        con una consulta por modelo (los campos que comparten modelo se agrupan).
+        """
+        querysets = {}
+        ids_by_model = {}
+        for field in self.child.fields.values():
+            relation = field.child_relation if isinstance(field, serializers.ManyRelatedField) else field
+            if field.read_only or not isinstance(relation, BatchedPrimaryKeyRelatedField):
+                continue
+
+            queryset = relation.get_queryset()
+            model = queryset.model
+            querysets.setdefault(model, queryset)
+            ids = ids_by_model.setdefault(model, set())
+
+            for item in data:
+                if not isinstance(item, dict):
+                    continue
+                values = item.get(field.field_name)
+                if not isinstance(values, list):
+                    values = [values]
+                for value in values:
+                    if value is None or isinstance(value, bool):
+                        continue
+                    try:
+                        ids.add(model._meta.pk.to_python(value))
+                    except DjangoValidationError:
+                        # El campo informará el error de tipo al validar el elemento
+                        continue
+
+        return {
+            model: {instance.pk: instance for instance in querysets[model].filter(pk__in=ids)} if ids else {}
+            for model, ids in ids_by_model.items()
+        }
+
+    def validate(self, attrs):
+        """
+        Un intento admite una sola respuesta por pregunta (y subpregunta). Con `context['upsert']`
+        las repetidas se permiten: la última reemplaza a las anteriores.
+        """
+        if self.context.get('upsert'):
+            return attrs
+        seen = set()
+        for item in attrs:
+            attempt = item.get('survey_attempt')
+            if attempt is None:
+                continue
+            key = (attempt.pk, item['question_id'], _subquestion_pk(item))
+            if key in seen:
+                raise serializers.ValidationError(
+                    f"Respuesta duplicada para la pregunta {item['question_id']} en el mismo intento."
+                )
+            seen.add(key)
+        return attrs
+
+    def create(self, validated_data):
+        request = self.context.get('request')
+        if not (request and request.user.is_authenticated):
+            raise serializers.ValidationError({"user": "El usuario es obligatorio."})
+
+        # Los borradores reemplazan las respuestas existentes del intento en lugar de insertar
+        persist = upsert_responses if self.context.get('upsert') else bulk_insert_responses
+        instances = [self.child.build_instance(attrs, request.user) for attrs in validated_data]
+        return persist(
+            instances,
+            [attrs.get('options_multiple_selected') or [] for attrs in validated_data]
+        )
+
+
 class ResponseSerializer(serializers.Serializer):
     question_id = serializers.IntegerField(help_text="ID de la pregunta a la que corresponde la respuesta.")
-    subquestion_id = serializers.PrimaryKeyRelatedField(
+    subquestion_id = BatchedPrimaryKeyRelatedField(
         queryset=SubQuestion.objects.all(), allow_null=True, required=False,
         write_only=True,
         help_text="ID de la subpregunta asociada (solo para preguntas tipo matriz)."
     )
-    subquestion = serializers.PrimaryKeyRelatedField(
+    subquestion = BatchedPrimaryKeyRelatedField(
         queryset=SubQuestion.objects.all(), allow_null=True, required=False,
         help_text="Objeto de la subpregunta asociada.", write_only=True
     )
     answer = serializers.CharField(required=False, allow_blank=True, help_text="Texto ingresado en una pregunta abierta.")
-    option_selected = serializers.PrimaryKeyRelatedField(
+    option_selected = BatchedPrimaryKeyRelatedField(
         queryset=Option.objects.all(), allow_null=True, required=False,
         help_text="Opción seleccionada en preguntas cerradas."
     )
-    options_multiple_selected = serializers.PrimaryKeyRelatedField(many=True, queryset=Option.objects.all(), required=False)
-    survey_attempt = serializers.PrimaryKeyRelatedField(
+    options_multiple_selected = BatchedPrimaryKeyRelatedField(many=True, queryset=Option.objects.all(), required=False)
+    survey_attempt = BatchedPrimaryKeyRelatedField(
         queryset=SurveyAttempt.objects.all(), required=False,
         help_text="Intento de la encuesta asociado a esta respuesta."
     )
     other_text = serializers.CharField(required=False, allow_blank=True, help_text="Texto ingresado por el usuario cuando selecciona la opción 'Otro'.")
 
     # Campos geográficos
-    country = serializers.PrimaryKeyRelatedField(queryset=Country.objects.all(), allow_null=True, required=False)
-    department = serializers.PrimaryKeyRelatedField(queryset=Department.objects.all(), allow_null=True, required=False)
-    municipality = serializers.PrimaryKeyRelatedField(queryset=Municipality.objects.all(), allow_null=True, required=False)
+    country = BatchedPrimaryKeyRelatedField(queryset=Country.objects.all(), allow_null=True, required=False)
+    department = BatchedPrimaryKeyRelatedField(queryset=Department.objects.all(), allow_null=True, required=False)
+    municipality = BatchedPrimaryKeyRelatedField(queryset=Municipality.objects.all(), allow_null=True, required=False)
 
     class Meta:
         model = Response
+        list_serializer_class = ResponseListSerializer
         fields = [
             "question_id", "subquestion_id", "subquestion", "answer", "option_selected",
             "options_multiple_selected", 'response_text', "survey_attempt", "country",
@@ -299,6 +611,16 @@ class ResponseSerializer(serializers.Serializer):
             raise serializers.ValidationError("subquestion_id debe ser un número entero")
         return value
 
+    def get_survey_schema(self, question_id):
+        """
+        Devuelve la definición compilada que contiene la pregunta. Usa la del contexto
+        (`survey_schema`) cuando la vista ya la conoce y, si no, la busca en el registro.
+        """
+        schema = self.context.get('survey_schema')
+        if schema is not None and question_id in schema.questions:
+            return schema
+        return survey_schemas.for_question(question_id)
+
     def validate(self, data):
         """
         Validación de los datos antes de guardar la respuesta.
@@ -307,31 +629,31 @@ class ResponseSerializer(serializers.Serializer):
         question_id = data.get("question_id")
         subquestion_id = data.pop("subquestion_id", None)
 
-        try:
-            question = Question.objects.get(id=question_id)
-        except Question.DoesNotExist:
+        # La definición de la encuesta se lee del registro compilado, sin consultar la BD
+        schema = self.get_survey_schema(question_id)
+        question = schema.questions.get(question_id) if schema else None
+        if question is None:
             raise serializers.ValidationError({"question_id": f"ID de pregunta inválido: {question_id} no existe."})
 
-        # Convertimos `subquestion_id` en `subquestion`
+        subquestion = data.get("subquestion")
         if subquestion_id:
-            subquestion = SubQuestion.objects.filter(id=subquestion_id).first()
+            subquestion = schema.subquestions.get(subquestion_id)
             if not subquestion:
                 raise serializers.ValidationError({"subquestion_id": f"La subpregunta con ID {subquestion_id} no existe."})
-            data["subquestion"] = subquestion  # Guardamos la subpregunta en `data`
+            data["subquestion_id"] = subquestion.id
 
         # Validación de preguntas tipo matriz
-        if question.question_type == 'matrix' and not data.get("subquestion"):
+        if question.is_matrix and not subquestion:
             raise serializers.ValidationError({"subquestion_id": "Las preguntas tipo matriz requieren una subpregunta asociada."})
 
         # Si la pregunta es de selección múltiple, `options_multiple_selected` debe tener datos
-        if question.is_multiple and not data.get("options_multiple_selected"):
+        if (question.is_multiple or question.question_type == 'multiple') and not data.get("options_multiple_selected"):
             raise serializers.ValidationError("Debe seleccionar al menos una opción en preguntas de selección múltiple.")
 
         # Validar que al menos una respuesta sea proporcionada
         if not data.get("answer") and not data.get("option_selected") and not data.get("options_multiple_selected"):
             # excepción: si la subpregunta es 'is_other' y hay other_text
-            subq = data.get("subquestion")
-            if not (subq and subq.is_other and data.get("other_text")):
+            if not (subquestion and subquestion.is_other and data.get("other_text")):
                 raise serializers.ValidationError("Debe proporcionar una respuesta válida: texto, número o seleccionar una opción.")
 
         # Validación de opciones is_other
@@ -345,7 +667,6 @@ class ResponseSerializer(serializers.Serializer):
                 )
 
         # Validación de subpregunta is_other
-        subquestion = data.get("subquestion_id")
         if subquestion and subquestion.is_other and not data.get("other_text"):
             raise serializers.ValidationError({"other_text": "Debe proporcionar un texto para la subpregunta 'Otro'."})
 
@@ -388,30 +709,35 @@ class ResponseSerializer(serializers.Serializer):
 
         return data
 
+    def build_instance(self, validated_data, user):
+        """
+        Construye, sin guardarla, la instancia de `Response` a partir de los datos validados.
+        El texto de `answer` se almacena en `response_text` y se calculan los campos normalizados.
+        """
+        response = Response(
+            user=user,
+            question_id=validated_data["question_id"],
+            subquestion_id=_subquestion_pk(validated_data),
+            survey_attempt=validated_data.get("survey_attempt"),
+            response_text=validated_data.get("answer"),
+            other_text=validated_data.get("other_text"),
+            option_selected=validated_data.get("option_selected"),
+            country=validated_data.get("country"),
+            department=validated_data.get("department"),
+            municipality=validated_data.get("municipality"),
+        )
+        response.normalize_texts()
+        return response
+
     def create(self, validated_data):
         """
         Creación de la respuesta asegurando que se asocie a un `survey_attempt`.
         """
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            validated_data['user'] = request.user
-        else:
+        if not (request and request.user.is_authenticated):
             raise serializers.ValidationError({"user": "El usuario es obligatorio."})
-    
-        # Extraer y procesar las opciones múltiples seleccionadas
-        options_multiple_selected = validated_data.pop('options_multiple_selected', [])
-
-        # Extraer subpregunta correctamente
-        subquestion = validated_data.pop('subquestion', None)
-
-        # Crear la instancia de Response
-        response = Response.objects.create(
-            **validated_data,
-            subquestion=subquestion
-        )
-
-        # Asignar opciones múltiples seleccionadas si existen
-        if options_multiple_selected:
-            response.options_multiple_selected.set(options_multiple_selected)
 
+        # `Response.save()` exige las opciones múltiples ya asignadas, por eso se usa la inserción en bloque
+        response = self.build_instance(validated_data, request.user)
+        bulk_insert_responses([response], [validated_data.get('options_multiple_selected') or []])
         return response
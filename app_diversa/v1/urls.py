@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import WelcomeView, SurveyViewSet, QuestionViewSet, OptionViewSet, SubmitResponseView, ChapterViewSet, SurveyTextViewSet, ResponseViewSet, SaveGeographicResponseView, get_message_by_key
+from .views import WelcomeView, SurveyViewSet, QuestionViewSet, OptionViewSet, SubmitResponseView, SubmitResponseBatchView, ChapterViewSet, SurveyTextViewSet, ResponseViewSet, AttemptViewSet, ExportJobViewSet, SaveGeographicResponseView, get_message_by_key
 
 # Configuración del router
 router = DefaultRouter()
@@ -9,16 +9,19 @@ router.register('chapters', ChapterViewSet, basename='chapter')
 router.register('questions', QuestionViewSet, basename='question')
 router.register('options', OptionViewSet, basename='option')
 router.register('survey-texts', SurveyTextViewSet, basename='survey-text')
+router.register('export-jobs', ExportJobViewSet, basename='export-job')
+router.register('attempts', AttemptViewSet, basename='attempt')
 
 # Rutas específicas de la API v1
 urlpatterns = [
     # Rutas individuales (APIView o Function-based Views)
     path('welcome/', WelcomeView.as_view(), name='v1-welcome'),
     path('submit-response/', SubmitResponseView.as_view(), name='v1-submit-response'),
+    path('submit-response/batch/', SubmitResponseBatchView.as_view(), name='v1-submit-response-batch'),
     path('api/save-geographic-response/', SaveGeographicResponseView.as_view(), name='save_geographic_response'),
 
     # Rutas de exportación de respuestas
-    path('responses/export/<str:format>/', ResponseViewSet.as_view({'get': 'export'}), name='export-responses'),
+    path('responses/export/<str:export_format>/', ResponseViewSet.as_view({'get': 'export'}), name='export-responses'),
     
     # Ruta para mostrar mensajes del sistema
     path("messages/<str:key>/", get_message_by_key),
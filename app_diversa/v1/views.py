@@ -1,24 +1,37 @@
-from django.utils.timezone import now
-from dateutil.relativedelta import relativedelta
-from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
-from rest_framework import viewsets, permissions, status
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.db.models import Prefetch
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response as DRFResponse
 from rest_framework.serializers import ValidationError as DRFValidationError
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from ..models import SurveyAttempt, Survey, Question, SubQuestion, Option, Chapter, SurveyText, SystemMessage
+from ..models import SurveyAttempt, Survey, Question, SubQuestion, Option, Chapter, SurveyText, SystemMessage, ExportJob
 from ..models import Response as ModelResponse
-from .serializers import SurveyAttemptSerializer, SurveySerializer, QuestionSerializer, SubQuestionSerializer, OptionSerializer, ResponseSerializer, ChapterSerializer, SurveyTextSerializer
-from app_geo.models import Country, Department, Municipality
-import tablib
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
-from reportlab.lib import colors
-from datetime import date, datetime
+from ..survey_schema import survey_schemas
+from .. import tabulation
+from ..eligibility import EligibilityError, evaluate_eligibility
+from .. import idempotency
+from ..submissions import SubmissionResult, attempt_answers, finalize_draft, save_draft_answers, submit_attempt
+from ..definition_changes import definition_changes, parse_version
+from ..exports import (
+    EXPORT_CONTENT_TYPES, EXPORT_WRITERS, RESPONSE_EXPORT_HEADERS, last_attempt_id, response_export_rows,
+    select_response_delta, stream_csv, wide_export_rows, write_pdf
+)
+from .serializers import is_inline_geo_requested, ExportJobSerializer, SurveyAttemptSerializer, SurveySerializer, QuestionSerializer, SubQuestionSerializer, OptionSerializer, ResponseSerializer, ChapterSerializer, SurveyTextSerializer
+from AppDANE_SEN.pagination import CreatedAtCursorPagination
+from app_geo.catalog import get_geo_catalogs_version
+from app_geo.gazetteer import geo_gazetteer
+import hashlib
+import tempfile
+from datetime import date
 
 
 @api_view(['GET'])
@@ -55,8 +68,9 @@ class SurveyAttemptViewSet(viewsets.ModelViewSet):
     queryset = SurveyAttempt.objects.all()
     serializer_class = SurveyAttemptSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
-    @swagger_auto_schema(operation_description="Lista de intentos de completar encuestas.")
+    @swagger_auto_schema(operation_description="Lista de intentos de completar encuestas, paginada por cursor.")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
@@ -100,6 +114,29 @@ class SurveyAttemptViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
+def survey_document_prefetches():
+    """
+    Plan de precarga del documento completo de una encuesta (`SurveySerializer`):
+    capítulos y preguntas ordenadas por `order_question`, subpreguntas por `subquestion_order`
+    y opciones por `order_option`. Carga la encuesta con un número constante de consultas.
+    """
+    options = Option.objects.select_related('question', 'subquestion').order_by('order_option', 'id')
+    subquestions = SubQuestion.objects.order_by('subquestion_order', 'id').prefetch_related(
+        Prefetch('options', queryset=options)
+    )
+    questions = Question.objects.order_by('order_question', 'id').prefetch_related(
+        Prefetch('options', queryset=options),
+        Prefetch('subquestions', queryset=subquestions),
+    )
+    return (
+        Prefetch('chapters', queryset=Chapter.objects.order_by('id').prefetch_related(
+            Prefetch('questions', queryset=questions)
+        )),
+        Prefetch('questions', queryset=questions),
+        'texts',
+    )
+
+
 class SurveyViewSet(viewsets.ModelViewSet):
     """
     CRUD para encuestas (surveys).
@@ -108,6 +145,22 @@ class SurveyViewSet(viewsets.ModelViewSet):
     serializer_class = SurveySerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_survey_document(self, survey):
+        """
+        Devuelve `(etag, contenido)` del documento JSON de la encuesta. El contenido se renderiza
+        una sola vez por versión (`content_version`) y se guarda en la caché.
+        """
+        cache_key = f"survey-document:{survey.pk}:{survey.content_version}"
+        if is_inline_geo_requested(self.request):
+            cache_key = f"{cache_key}:inline-geo:{get_geo_catalogs_version()}"
+        document = cache.get(cache_key)
+        if document is None:
+            survey = self.get_queryset().prefetch_related(*survey_document_prefetches()).get(pk=survey.pk)
+            content = JSONRenderer().render(self.get_serializer(survey).data)
+            document = (f'"{hashlib.sha256(content).hexdigest()}"', content)
+            cache.set(cache_key, document, settings.SURVEY_DOCUMENT_CACHE_TIMEOUT)
+        return document
+
     @swagger_auto_schema(operation_description="Lista de todas las encuestas.")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
@@ -119,11 +172,32 @@ class SurveyViewSet(viewsets.ModelViewSet):
     @swagger_auto_schema(operation_description="Obtiene una encuesta específica por su ID.")
     def retrieve(self, request, *args, **kwargs):
         survey = self.get_object()
-        serializer = self.get_serializer(survey)
-        data = serializer.data
-        data['questions'] = sorted(
-            data['questions'], key=lambda q: q['order_question'])
-        return Response(data)
+        etag, content = self.get_survey_document(survey)
+
+        # El cliente ya tiene esta versión del documento
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    @swagger_auto_schema(
+        operation_description="Cambios en la definición de la encuesta desde `since_version` (microsegundos). "
+                              "La respuesta incluye la `version` a enviar en la siguiente sincronización.",
+        manual_parameters=[
+            openapi.Parameter('since_version', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=False)
+        ]
+    )
+    @action(detail=True, methods=['get'])
+    def changes(self, request, pk=None):
+        survey = self.get_object()
+        try:
+            since_version = parse_version(request.query_params.get('since_version', 0))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        return Response(definition_changes(survey.pk, since_version))
 
     @swagger_auto_schema(operation_description="Actualiza una encuesta existente.")
     def update(self, request, *args, **kwargs):
@@ -232,6 +306,44 @@ class QuestionViewSet(viewsets.ModelViewSet):
     queryset = Question.objects.prefetch_related('subquestions', 'options')
     serializer_class = QuestionSerializer
 
+    @swagger_auto_schema(operation_description="Frecuencias de las opciones de una pregunta (por subpregunta en las matriciales).")
+    @action(detail=True, methods=['get'])
+    def frequencies(self, request, pk=None):
+        try:
+            return DRFResponse(tabulation.question_frequencies(self._tabulated_question_id(pk)))
+        except tabulation.QuestionNotFound as exc:
+            raise Http404(str(exc))
+        except ValueError as exc:
+            return DRFResponse({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @swagger_auto_schema(
+        operation_description="Tabla cruzada de las opciones de una pregunta contra una dimensión.",
+        manual_parameters=[
+            openapi.Parameter(
+                'by', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+                description="'country', 'department', 'municipality' o 'question:<id>'."
+            )
+        ]
+    )
+    @action(detail=True, methods=['get'])
+    def crosstab(self, request, pk=None):
+        try:
+            return DRFResponse(tabulation.crosstab(self._tabulated_question_id(pk), request.query_params.get('by', '')))
+        except tabulation.QuestionNotFound as exc:
+            raise Http404(str(exc))
+        except tabulation.InvalidDimension as exc:
+            return DRFResponse({"by": [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as exc:
+            return DRFResponse({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @staticmethod
+    def _tabulated_question_id(pk):
+        # Un id no numérico no corresponde a ninguna pregunta
+        try:
+            return int(pk)
+        except ValueError:
+            raise tabulation.QuestionNotFound("La pregunta no existe.")
+
     @swagger_auto_schema(operation_description="Lista de todas las preguntas.")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
@@ -353,10 +465,22 @@ class OptionViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
+def submission_response(result):
+    """
+    Respuesta HTTP de un `SubmissionResult`; los reintentos idempotentes se marcan con un encabezado.
+    """
+    headers = {"Idempotent-Replayed": "true"} if result.replayed else None
+    return Response(result.payload, status=result.status, headers=headers)
+
+
 class SubmitResponseView(APIView):
     """
     Endpoint para registrar respuestas de usuarios a preguntas o subpreguntas, 
     validando primero si cumplen con los requisitos mínimos.
+
+    Con el encabezado `Idempotency-Key`, los reintentos del mismo envío devuelven el resultado
+    original sin volver a validar ni guardar (ver `app_diversa.idempotency`); reusar la llave
+    con un cuerpo distinto responde 422.
     """
     permission_classes = [IsAuthenticated]
 
@@ -365,175 +489,132 @@ class SubmitResponseView(APIView):
         request_body=ResponseSerializer(many=True),
         responses={
             201: openapi.Response(description="Respuestas guardadas correctamente."),
-            400: openapi.Response(description="Error en los datos enviados.")
+            400: openapi.Response(description="Error en los datos enviados."),
+            422: openapi.Response(description="La Idempotency-Key ya se usó con un envío diferente.")
         }
     )
     def post(self, request):
-        user = request.user
-        data = request.data
-
-        # Verificar si data es una lista válida
-        if not isinstance(data, list):
-            return Response({"error": "El cuerpo de la solicitud debe ser una lista de respuestas."}, status=400)
-
-        # Validar que cada elemento de `data` contenga `question_id`
-        for idx, item in enumerate(data):
-            if not isinstance(item, dict):
-                return Response({"error": f"Cada respuesta debe ser un objeto JSON. Error en índice {idx}."}, status=400)
-            if "question_id" not in item:
-                return Response({"error": f"Cada respuesta debe contener 'question_id'. Faltante en índice {idx}."}, status=400)
-
-        # Crear diccionario para acceso rápido a respuestas
-        responses_dict = {item["question_id"]: item for item in data if "question_id" in item}
-
-        # Validar pregunta clave: ¿Ha vivido en Colombia los últimos 5 años?
-        response_colombia = responses_dict.get(1)
-        if not response_colombia:
-            return Response({"error": "Debe responder si ha vivido en Colombia los últimos 5 años."}, status=400)
-
-        option_id = response_colombia.get("option_selected")
-        if not option_id:
-            return Response({"error": "Debe seleccionar una opción válida."}, status=400)
-
-        option = get_object_or_404(Option, id=option_id)
-
-        survey_id = response_colombia.get("survey_id")
-        if not survey_id:
-            return Response({"error": "Falta el ID de la encuesta (survey_id)."}, status=400)
-
-        if option.text_option.lower() == "no":
-            SurveyAttempt.objects.create(
-                user=user,
-                survey_id=survey_id,
-                has_lived_in_colombia=False,
-                rejection_note="El usuario no ha vivido en Colombia los últimos 5 años."
-            )
-            return Response({
-                "message": "No cumple con los requisitos para la encuesta.",
-                "rejected": True
-            }, status=200)
-
-        # Validar fecha de nacimiento si responde "Sí"
-        response_birth_date = responses_dict.get(2)
-        if not response_birth_date:
-            return Response({"message": "Debe responder la fecha de nacimiento."}, status=206)
-
         try:
-            birth_date = datetime.strptime(response_birth_date["answer"], "%Y-%m-%d").date()
-        except ValueError:
-            return Response({"error": "Formato de fecha inválido. Debe ser YYYY-MM-DD."}, status=400)
-
-        today = date.today()
-        if birth_date > today:
-            return Response({"error": "Fecha futura inválida, seleccione una fecha de nacimiento correcta."}, status=400)
-
-        age = today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
-
-        if age < 18:
-            SurveyAttempt.objects.create(
-                user=user,
-                survey_id=survey_id,
-                has_lived_in_colombia=True,
-                birth_date=birth_date,
-                rejection_note=f"El usuario tiene {age} años y no cumple con la edad mínima."
-            )
-            return Response({
-                "message": "No cumple con los requisitos de edad.",
-                "rejected": True
-            }, status=200)
-
-        survey_attempt = SurveyAttempt.objects.create(
-            user=user,
-            survey_id=survey_id,
-            has_lived_in_colombia=True,
-            birth_date=birth_date,
-            success_note="Encuesta diligenciada con éxito"
-        )
-
-        # Procesar respuestas restantes
-        responses_data = [item for item in data if "question_id" in item and item["question_id"] not in [1, 2]]
-
-        # Obtener todas las preguntas y opciones para optimizar consultas
-        questions = {q.id: q for q in Question.objects.all()}
-        options = {o.id: o for o in Option.objects.all()}
-
-        # Validar que cada respuesta es un diccionario y contiene 'question_id'
-        for idx, item in enumerate(data):
-            if not isinstance(item, dict):
-                return Response({"error": f"Cada respuesta debe ser un objeto JSON. Error en índice {idx}."}, status=400)
-            if "question_id" not in item:
-                return Response({"error": f"Cada respuesta debe contener 'question_id'. Faltante en índice {idx}."}, status=400)
-
-        # Filtrar respuestas asegurando que 'question_id' está presente antes de acceder a él
-        responses_data = [item for item in data if item.get("question_id") and item["question_id"] not in [1, 2]]
+            idempotency_key = idempotency.get_idempotency_key(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
 
-        for response_data in responses_data:
-            subquestion_id = response_data.get("subquestion_id", None)
+        return submission_response(submit_attempt(request, request.data, idempotency_key))
 
-            if subquestion_id and isinstance(subquestion_id, SubQuestion):
-                response_data["subquestion_id"] = subquestion_id.id
 
-            if not isinstance(response_data, dict):
-                return Response({"error": "Una de las respuestas no es un objeto JSON válido."}, status=400)
+class SubmitResponseBatchView(APIView):
+    """
+    Endpoint para sincronizar varios intentos completos diligenciados sin conexión.
 
-            question_id = response_data.get("question_id")
+    Cada intento se procesa como un envío individual (tamizaje, intento y respuestas) en su propia
+    transacción: los inválidos no impiden guardar los demás. Las definiciones de encuesta se
+    comparten entre los intentos del lote. Cada intento puede traer su `idempotency_key` para
+    que reenviar el lote completo no duplique los ya guardados.
+    """
+    permission_classes = [IsAuthenticated]
 
+    @swagger_auto_schema(
+        operation_description="Registrar por lotes intentos completos: "
+                              '`{"attempts": [{"idempotency_key": "...", "responses": [...]}, ...]}`.',
+        responses={
+            200: openapi.Response(description="Resultado de cada intento, en el orden recibido."),
+            400: openapi.Response(description="El lote no tiene el formato esperado.")
+        }
+    )
+    def post(self, request):
+        attempts = request.data.get("attempts") if isinstance(request.data, dict) else None
+        if not isinstance(attempts, list) or not attempts:
+            return Response({"error": "El cuerpo debe contener 'attempts', una lista de intentos."}, status=400)
+        if len(attempts) > settings.SUBMIT_BATCH_MAX_ATTEMPTS:
+            return Response(
+                {"error": f"Se admiten máximo {settings.SUBMIT_BATCH_MAX_ATTEMPTS} intentos por lote."}, status=400
+            )
 
-            if question_id is None:
-                return Response({"error": "Una de las respuestas no tiene 'question_id'."}, status=400)
+        schemas = {}
+        results = []
+        for index, attempt in enumerate(attempts):
+            if not isinstance(attempt, dict):
+                result = SubmissionResult(400, {"error": "Cada intento debe ser un objeto JSON."})
+            else:
+                key = attempt.get("idempotency_key")
+                if key is not None and (not isinstance(key, str) or len(key) > idempotency.IDEMPOTENCY_KEY_MAX_LENGTH):
+                    result = SubmissionResult(400, {"error": "La idempotency_key del intento es inválida."})
+                else:
+                    result = submit_attempt(request, attempt.get("responses"), key or None, schemas=schemas)
+            results.append({"index": index, "status": result.status, "replayed": result.replayed, **result.payload})
 
-            # Manejo de opciones `is_other`
-            option_selected_id = response_data.get("option_selected")
-            other_text = response_data.get("other_text", "").strip()
+        return Response({
+            "saved": sum(1 for result in results if result["status"] == 201),
+            "results": results,
+        }, status=200)
 
-            if option_selected_id:
-                option = options.get(option_selected_id)
 
-                if not option:
-                    return Response({"error": f"La opción con ID {option_selected_id} no existe."}, status=400)
+class AttemptViewSet(viewsets.GenericViewSet):
+    """
+    Intentos en borrador: se crean al pasar el tamizaje, reciben las respuestas a medida que el
+    participante avanza (`PATCH answers/`) y se finalizan sin volver a enviarlas (`finalize/`).
+    """
+    permission_classes = [IsAuthenticated]
+    lookup_value_regex = r'\d+'
 
-                if option.is_other and not other_text:
-                    response_data["other_text"] = "Opción Otro sin responder"
-                elif not option.is_other:
-                    response_data.pop("other_text", None)
+    def get_queryset(self):
+        return SurveyAttempt.objects.filter(user=self.request.user)
 
-            # Manejo de subpreguntas `is_other`
-            subquestion_id = response_data.get("subquestion_id")
-            if subquestion_id:
-                subquestion = get_object_or_404(SubQuestion, id=subquestion_id)
-                if subquestion.is_other and not other_text:
-                    response_data["other_text"] = "Opción Otro sin responder"
-                elif not subquestion.is_other:
-                    response_data.pop("other_text", None)
+    @swagger_auto_schema(
+        operation_description="Crea un intento en borrador con las respuestas de tamizaje (y las demás que ya tenga).",
+        request_body=ResponseSerializer(many=True),
+        responses={
+            201: openapi.Response(description="Borrador creado; incluye `attempt_id`."),
+            200: openapi.Response(description="El participante no cumple los requisitos.")
+        }
+    )
+    def create(self, request):
+        try:
+            idempotency_key = idempotency.get_idempotency_key(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
 
-            # Validación de preguntas tipo matriz
-            question = questions.get(question_id)
-            if not question:
-                return Response({"error": f"Pregunta con ID {question_id} no encontrada."}, status=400)
+        return submission_response(submit_attempt(request, request.data, idempotency_key, draft=True))
 
-            if question.question_type == "matrix" and not subquestion_id:
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Respuestas del intento como `{question_id: {subquestion_id: valor}}` (subpregunta 0 = pregunta principal)."
+    )
+    @swagger_auto_schema(
+        method='patch',
+        operation_description="Guarda en el borrador solo las respuestas cambiadas (reemplaza las de la misma pregunta y subpregunta).",
+        request_body=ResponseSerializer(many=True)
+    )
+    @action(detail=True, methods=['get', 'patch'])
+    def answers(self, request, pk=None):
+        if request.method == 'PATCH':
+            return submission_response(save_draft_answers(request, pk, request.data))
 
+        attempt = self.get_object()
+        return Response({"attempt_id": attempt.id, "status": attempt.status, "answers": attempt_answers(attempt.id)})
 
-                response_instance = {
-                    "user": user.id,
-                    "survey_attempt": survey_attempt.id,
-                    "question": question_id,
-                    "subquestion": subquestion_id,
-                    "option_selected": option_selected_id,
-                    "other_text": other_text if option and option.is_other else None
-                }
-                responses_data.append(response_instance)
+    @swagger_auto_schema(
+        operation_description="Último intento del usuario en la encuesta (`?survey=<id>`) con sus respuestas, para reanudarlo.",
+        manual_parameters=[openapi.Parameter('survey', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=True)]
+    )
+    @action(detail=False, methods=['get'])
+    def latest(self, request):
+        survey_id = request.query_params.get('survey')
+        if not survey_id or not survey_id.isdigit():
+            return Response({"error": "El parámetro `survey` es obligatorio."}, status=400)
 
-        try:
-            for item in responses_data:
-                item["survey_attempt"] = survey_attempt.id
+        attempt = self.get_queryset().filter(survey_id=survey_id).order_by('-created_at', '-id').first()
+        if attempt is None:
+            raise Http404("El usuario no tiene intentos en esta encuesta.")
+        return Response({"attempt_id": attempt.id, "status": attempt.status, "answers": attempt_answers(attempt.id)})
 
-            serializer = ResponseSerializer(data=responses_data, many=True, context={'request': request})
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            return Response({"message": "Respuestas guardadas exitosamente."}, status=201)
-        except DRFValidationError as e:
-            return Response({"error": str(e.detail)}, status=400)
+    @swagger_auto_schema(
+        operation_description="Finaliza el borrador. Puede incluir las últimas respuestas cambiadas.",
+        request_body=ResponseSerializer(many=True)
+    )
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        return submission_response(finalize_draft(request, pk, request.data or None))
 
 
 class ResponseViewSet(viewsets.ReadOnlyModelViewSet):
@@ -544,155 +625,124 @@ class ResponseViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ModelResponse.objects.all()
     serializer_class = ResponseSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
-    @swagger_auto_schema(operation_description="Lista todas las respuestas.")
+    @swagger_auto_schema(operation_description="Lista todas las respuestas, paginada por cursor.")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
-    @action(detail=False, methods=['get'], url_path='export/(?P<format>[^/.]+)')
-    def export(self, request, format=None):
+    # El parámetro no se llama `format`: DRF lo interpretaría como sufijo de formato y
+    # respondería 404 al no existir un renderer "csv", "xls" o "pdf".
+    @action(detail=False, methods=['get'], url_path='export/(?P<export_format>[^/.]+)')
+    def export(self, request, export_format=None):
         """
         Exportar respuestas en CSV, XLS o PDF con formato de fecha YYYY/MM/DD.
+        Con `?layout=wide&survey=<id>` se exporta en CSV una fila por intento y una columna por pregunta.
+
+        Exportación incremental: `?since_id=<id>` devuelve solo las respuestas nuevas y
+        `?since=<fecha ISO>[,<id>]` las nuevas o modificadas. El cursor para la siguiente
+        exportación se devuelve en el encabezado `X-Next-Since-Id` o `X-Next-Since`.
         """
-        responses = self.queryset.select_related('user', 'question')
-        data = tablib.Dataset()
-        data.headers = ['ID', 'Usuario', 'Pregunta', 'Respuesta', 'Fecha']
-
-        for response in responses:
-            # Formato YYYY/MM/DD
-            formatted_date = response.created_at.strftime('%Y/%m/%d %H:%M:%S')
-            data.append([
-                response.id,
-                response.user.username,
-                response.question.text_question,
-                response.response_text or response.response_number,
-                formatted_date,
-            ])
-
-        # Exportación en diferentes formatos
-        if format == 'csv':
-            response = HttpResponse(data.export('csv'), content_type='text/csv')
+        since = request.query_params.get('since')
+        since_id = request.query_params.get('since_id')
+        if since and since_id:
+            return DRFResponse({"error": "Use solo uno de los cursores `since` o `since_id`."}, status=400)
+
+        if request.query_params.get('layout') == 'wide':
+            return self.export_wide(request, export_format, since_id)
+
+        if export_format not in EXPORT_WRITERS:
+            return DRFResponse({"error": "Formato no soportado."}, status=400)
+
+        try:
+            delta = select_response_delta(self.queryset, since=since, since_id=since_id)
+        except ValueError:
+            return DRFResponse({"error": "Cursor inválido."}, status=400)
+        rows = response_export_rows(delta.queryset, delta.ordering)
+
+        if export_format == 'csv':
+            # El CSV se transmite fila a fila, sin cargar la tabla completa en memoria
+            response = StreamingHttpResponse(stream_csv(RESPONSE_EXPORT_HEADERS, rows), content_type='text/csv')
             response['Content-Disposition'] = 'attachment; filename="responses.csv"'
-        elif format == 'xls':
-            response = HttpResponse(data.export('xls'), content_type='application/vnd.ms-excel')
-            response['Content-Disposition'] = 'attachment; filename="responses.xls"'
-        elif format == 'pdf':
-            response = HttpResponse(content_type='application/pdf')
-            response['Content-Disposition'] = 'attachment; filename="responses.pdf"'
-            doc = SimpleDocTemplate(response)
-            table_data = [data.headers]  # Incluir encabezados
-            for row in data.dict:
-                table_data.append([
-                    row['ID'], row['Usuario'], row['Pregunta'], row['Respuesta'], row['Fecha']
-                ])
-            table = Table(table_data)
-            style = TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ])
-            table.setStyle(style)
-            elements = [table]
-            doc.build(elements)
+        elif export_format == 'pdf':
+            # El PDF se escribe en un archivo temporal y se envía desde disco
+            pdf_file = tempfile.TemporaryFile()
+            write_pdf(RESPONSE_EXPORT_HEADERS, rows, pdf_file)
+            pdf_file.seek(0)
+            response = FileResponse(pdf_file, as_attachment=True, filename='responses.pdf', content_type='application/pdf')
         else:
-            return DRFResponse({"error": "Formato no soportado."}, status=400)
+            response = HttpResponse(content_type=EXPORT_CONTENT_TYPES[export_format])
+            response['Content-Disposition'] = f'attachment; filename="responses.{export_format}"'
+            EXPORT_WRITERS[export_format](RESPONSE_EXPORT_HEADERS, rows, response)
 
+        if delta.next_cursor is not None:
+            response['X-Next-Since' if since else 'X-Next-Since-Id'] = delta.next_cursor
+        return response
+
+    def export_wide(self, request, export_format, since_id=None):
+        """
+        Exportación ancha (microdatos) de una encuesta, transmitida en CSV.
+        Con `since_id` se exportan solo los intentos posteriores a ese id.
+        """
+        if export_format != 'csv':
+            return DRFResponse({"error": "La exportación ancha solo está disponible en CSV."}, status=400)
+        if request.query_params.get('since'):
+            return DRFResponse({"error": "La exportación ancha solo admite el cursor `since_id`."}, status=400)
+
+        try:
+            schema = survey_schemas.get(int(request.query_params.get('survey')))
+        except (TypeError, ValueError):
+            schema = None
+        if schema is None:
+            return DRFResponse({"error": "Encuesta inválida o no existente."}, status=400)
+
+        try:
+            since_id = int(since_id) if since_id is not None else None
+        except ValueError:
+            return DRFResponse({"error": "Cursor inválido."}, status=400)
+
+        until_id = None
+        if since_id is not None:
+            until_id = max(since_id, last_attempt_id(schema.survey_id, since_id))
+        rows = wide_export_rows(schema, since_id=since_id, until_id=until_id)
+        response = StreamingHttpResponse(stream_csv(next(rows), rows), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="responses_wide_{schema.survey_id}.csv"'
+        if until_id is not None:
+            response['X-Next-Since-Id'] = until_id
         return response
 
     def post(self, request):
         """
-        1. Verifica la pregunta: "¿Ha vivido en Colombia durante los últimos 5 años?"
-        2. Si responde "No", se guarda un intento en `SurveyAttempt` y se rechaza la encuesta.
-        3. Si responde "Sí", se valida la fecha de nacimiento.
-        4. Si es menor de edad, se guarda un intento en `SurveyAttempt` y se rechaza la encuesta.
-        5. Si es mayor de edad, se guardan todas las respuestas en `Response`.
+        1. Evalúa las reglas de elegibilidad de la encuesta (`EligibilityRule`).
+        2. Si alguna no se cumple, se guarda un intento rechazado en `SurveyAttempt`.
+        3. Si las cumple todas, se guardan las demás respuestas en `Response`.
         """
         user = request.user
         data = request.data
-        responses_data = []
-
-        question_live_in_colombia = get_object_or_404(
-            Question, text_question="¿Ha vivido en Colombia durante los últimos 5 años?"
-        )
-        question_date_of_birth = get_object_or_404(
-            Question, text_question="¿Cuál es su fecha de nacimiento?"
-        )
 
         responses_dict = {item["question_id"]: item for item in data}
 
-        # Extraer respuestas clave
-        live_in_colombia_response = responses_dict.get(question_live_in_colombia.id)
-        date_of_birth_response = responses_dict.get(question_date_of_birth.id)
-
-        # Validar si respondió la residencia en Colombia
-        if not live_in_colombia_response:
-            return DRFResponse(
-                {"error": "Debe responder si ha vivido en Colombia los últimos 5 años."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        option_id = live_in_colombia_response.get("option_selected")
-        if not option_id:
-            return DRFResponse(
-                {"error": "Debe seleccionar una opción válida."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        live_in_colombia_opcion = get_object_or_404(Option, id=option_id)
-
-        survey_id = live_in_colombia_response.get("survey_id")
-        if not survey_id or not Survey.objects.filter(id=survey_id).exists():
+        survey_id = next((item["survey_id"] for item in data if item.get("survey_id")), None)
+        schema = survey_schemas.get(survey_id) if survey_id else None
+        if schema is None:
             return DRFResponse({"error": "Encuesta inválida o no existente."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Caso 1: Si responde "No" → Se rechaza la encuesta
-        if live_in_colombia_opcion.text_option.lower() == "no":
-            SurveyAttempt.objects.create(
-                user=user,
-                survey_id=survey_id,
-                has_lived_in_colombia=False,
-                rejection_note="El usuario no ha vivido en Colombia los últimos 5 años."
-            )
-            return DRFResponse({"message": "No cumple con los requisitos para la encuesta."}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            eligibility = evaluate_eligibility(schema, responses_dict)
+        except EligibilityError as e:
+            return DRFResponse(e.payload, status=e.status)
 
-        # Caso 2: Si responde "Sí" pero no proporciona fecha de nacimiento
-        if not date_of_birth_response or not date_of_birth_response.get("answer"):
+        if not eligibility.is_eligible:
+            SurveyAttempt.objects.create(user=user, survey_id=survey_id, **eligibility.attempt_fields())
             return DRFResponse(
-                {"error": "Debe ingresar su fecha de nacimiento en formato YYYY-MM-DD."},
-                status=status.HTTP_400_BAD_REQUEST
+                {"message": eligibility.rejected_by.rejection_message}, status=status.HTTP_403_FORBIDDEN
             )
 
-        try:
-            # Formato corregido a YYYY-MM-DD
-            birth_date = datetime.strptime(date_of_birth_response["answer"], "%Y-%m-%d").date()
-            age = relativedelta(now(), birth_date).years
-
-            if age < 18:
-                SurveyAttempt.objects.create(
-                    user=user,
-                    survey_id=survey_id,
-                    has_lived_in_colombia=True,
-                    birth_date=birth_date,
-                    rejection_note=f"El usuario tiene {age} años y no cumple con el requisito de edad mínima."
-                )
-                return DRFResponse({"message": "No cumple con la edad mínima."}, status=status.HTTP_403_FORBIDDEN)
-
-        except ValueError:
-            return DRFResponse({"error": "Formato de fecha inválido. Debe ser YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Caso 3: Si cumple con los requisitos → Crear intento de encuesta
-        survey_attempt = SurveyAttempt.objects.create(
-            user=user,
-            survey_id=survey_id,
-            has_lived_in_colombia=True,
-            birth_date=birth_date
-        )
+        # Si cumple con los requisitos → Crear intento de encuesta
+        survey_attempt = SurveyAttempt.objects.create(user=user, survey_id=survey_id, **eligibility.attempt_fields())
 
         # Guardar respuestas restantes
-        responses_data = [item for item in data if item["question_id"] not in [question_live_in_colombia.id, question_date_of_birth.id]]
+        responses_data = [item for item in data if item["question_id"] not in schema.screening_question_ids]
 
         serializer = ResponseSerializer(data=responses_data, many=True, context={'request': request})
         if serializer.is_valid():
@@ -703,6 +753,16 @@ class ResponseViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 
+def _as_code(value):
+    """
+    Convierte un código geográfico recibido (número o texto) al entero usado en `app_geo`.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 class SaveGeographicResponseView(APIView):
     """
     Endpoint para guardar respuestas geográficas.
@@ -728,16 +788,21 @@ class SaveGeographicResponseView(APIView):
             department = None
             municipality = None
 
+            # Búsquedas por código en el nomenclátor en memoria
+            gazetteer = geo_gazetteer.get()
+
             if country_code:
                 # Si el país es distinto de "COLOMBIA", solo se guarda el país
-                country = get_object_or_404(Country, numeric_code=country_code)
+                country = gazetteer.country_by_code(_as_code(country_code))
+                if country is None:
+                    raise Http404("País no encontrado.")
 
             if country_code == "COLOMBIA" or department_code:
                 # Obtener departamento y municipio solo si se ha seleccionado un departamento
-                department = get_object_or_404(
-                    Department, code=department_code)
-                municipality = get_object_or_404(
-                    Municipality, code=municipality_code)
+                department = gazetteer.department_by_code(_as_code(department_code))
+                municipality = gazetteer.municipality_by_code(_as_code(municipality_code))
+                if department is None or municipality is None:
+                    raise Http404("Departamento o municipio no encontrado.")
 
             # Guardar la respuesta en la BD
             ModelResponse.objects.create(
@@ -754,6 +819,37 @@ class SaveGeographicResponseView(APIView):
             return Response({"error": str(e)}, status=400)
 
 
+class ExportJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Exportaciones asíncronas: se solicita el trabajo, se consulta su estado y se descarga el archivo
+    cuando el worker (`python manage.py run_export_worker`) lo termina.
+    """
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(user=self.request.user).order_by('-created_at')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @swagger_auto_schema(operation_description="Descarga el archivo de una exportación terminada.")
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status == ExportJob.STATUS_EXPIRED:
+            return DRFResponse({"error": "El archivo de esta exportación ya expiró."}, status=status.HTTP_410_GONE)
+        if job.status != ExportJob.STATUS_DONE:
+            return DRFResponse({"error": "La exportación aún no está lista."}, status=status.HTTP_409_CONFLICT)
+
+        return FileResponse(
+            open(job.file_path, 'rb'),
+            as_attachment=True,
+            filename=job.filename,
+            content_type=EXPORT_CONTENT_TYPES[job.export_format]
+        )
+
+
 class SurveyTextViewSet(viewsets.ModelViewSet):
     """
     ViewSet para realizar operaciones CRUD sobre SurveyText.
@@ -28,12 +28,13 @@ class DepartmentAdmin(admin.ModelAdmin):
     list_display_links = ('name',)  # Permite clic en el nombre
     search_fields = ('name', 'code')  # Habilita búsqueda por nombre o código
     ordering = ('name',)  # Orden alfabético por nombre
+    list_select_related = ('country',)  # País en la misma consulta del listado
 
     def country_name(self, obj):
         """
         Devuelve el nombre del país al que pertenece el departamento.
         """
-        return obj.country.spanish_name if hasattr(obj, 'country') and obj.country else "No asignado"
+        return obj.country.spanish_name if obj.country else "No asignado"
 
     country_name.short_description = "País"
 
@@ -74,7 +75,9 @@ class MunicipalityAdmin(admin.ModelAdmin):
     list_display = ('name', 'code', 'get_department_code', 'get_department_name')
     list_display_links = ('name',)
     search_fields = ('name', 'code')
+    list_filter = (CountryNumericCodeFilter,)
     ordering = ('name',)
+    list_select_related = ('department',)  # Departamento en la misma consulta del listado
 
     def get_department_code(self, obj):
         """
@@ -94,6 +97,6 @@ class MunicipalityAdmin(admin.ModelAdmin):
         """
         Devuelve el nombre del país al que pertenece el municipio.
         """
-        return obj.department.country_name if hasattr(obj.department, 'country_name') else "No asignado"
+        return obj.department.country.spanish_name if obj.department and obj.department.country else "No asignado"
 
     country_name.short_description = "País"
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AppGeoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_geo'
+
+    def ready(self):
+        # Registra los receptores de señales del módulo `signals`
+        from . import signals  # noqa: F401
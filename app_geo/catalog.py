@@ -0,0 +1,80 @@
+"""
+Catálogos geográficos compartidos (países, departamentos y municipios) que usan las preguntas
+geográficas de las encuestas.
+
+Cada catálogo se serializa una sola vez, se guarda en la caché junto con su ETag y se
+invalida desde `app_geo.signals` cuando cambia cualquier modelo de `app_geo`. Lo mismo ocurre
+con el árbol de departamentos y sus municipios que sirve `/geo/departments/`.
+"""
+import hashlib
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+from .models import Country, Department, Municipality
+
+GEOGRAPHY_TYPES = ('COUNTRY', 'DEPARTMENT', 'MUNICIPALITY')
+
+DEPARTMENT_TREE = 'DEPARTMENT_TREE'
+
+GeoCatalog = namedtuple('GeoCatalog', ['geography_type', 'etag', 'content', 'rows'])
+
+
+def _catalog_cache_key(geography_type):
+    return f"geo-catalog:{geography_type}"
+
+
+def _load_rows(geography_type):
+    if geography_type == 'COUNTRY':
+        # `Country` no tiene campo `name`; se expone el nombre en español
+        queryset = Country.objects.order_by('id').values('id', name=F('spanish_name'))
+    elif geography_type == 'DEPARTMENT':
+        queryset = Department.objects.order_by('id').values('id', 'name')
+    else:
+        queryset = Municipality.objects.order_by('id').values('id', 'name')
+    return list(queryset)
+
+
+def get_geo_catalog(geography_type):
+    """
+    Devuelve el `GeoCatalog` del tipo indicado ('COUNTRY', 'DEPARTMENT' o 'MUNICIPALITY').
+    """
+    if geography_type not in GEOGRAPHY_TYPES:
+        raise ValueError(f"Tipo de lugar inválido: {geography_type}")
+
+    catalog = cache.get(_catalog_cache_key(geography_type))
+    if catalog is None:
+        rows = _load_rows(geography_type)
+        content = JSONRenderer().render(rows)
+        catalog = GeoCatalog(geography_type, f'"{hashlib.sha256(content).hexdigest()}"', content, rows)
+        cache.set(_catalog_cache_key(geography_type), catalog, settings.GEO_CATALOG_CACHE_TIMEOUT)
+    return catalog
+
+
+def get_department_tree():
+    """
+    Devuelve, como `GeoCatalog`, la lista de departamentos con sus municipios.
+    Se construye con dos consultas (departamentos y municipios agrupados).
+    """
+    from .serializers import DepartmentSerializer
+
+    catalog = cache.get(_catalog_cache_key(DEPARTMENT_TREE))
+    if catalog is None:
+        rows = list(DepartmentSerializer(Department.objects.order_by('id'), many=True).data)
+        content = JSONRenderer().render(rows)
+        catalog = GeoCatalog(DEPARTMENT_TREE, f'"{hashlib.sha256(content).hexdigest()}"', content, rows)
+        cache.set(_catalog_cache_key(DEPARTMENT_TREE), catalog, settings.GEO_CATALOG_CACHE_TIMEOUT)
+    return catalog
+
+
+def get_geo_catalogs_version():
+    """
+    Huella combinada de los tres catálogos; cambia cuando cambia cualquiera de ellos.
+    """
+    etags = "".join(get_geo_catalog(geography_type).etag for geography_type in GEOGRAPHY_TYPES)
+    return hashlib.sha256(etags.encode()).hexdigest()[:16]
+
+
+def invalidate_geo_catalogs():
+    cache.delete_many([_catalog_cache_key(geography_type) for geography_type in GEOGRAPHY_TYPES + (DEPARTMENT_TREE,)])
@@ -0,0 +1,119 @@
+"""
+Nomenclátor geográfico en memoria (por proceso).
+
+Países, departamentos y municipios se enlazan por códigos enteros (`country_numeric_code`,
+`department_code`) y no por llaves foráneas. Las relaciones `Department.country` y
+`Municipality.department` admiten `select_related`; sin él, se resuelven aquí en lugar de
+costar una consulta por acceso. El catálogo es pequeño (~1.400 filas) y
+se lee constantemente: `geo_gazetteer` lo carga una vez con una consulta por tabla y ofrece
+búsquedas O(1) por id, por código y de padre a hijos.
+
+Las instancias son compartidas entre peticiones y no deben modificarse. El nomenclátor se
+recarga cuando `app_geo.signals` avisa de un cambio; `GEO_GAZETTEER_TTL` (segundos) acota
+el tiempo que otros procesos pueden servir datos desactualizados.
+"""
+import threading
+import time
+from django.conf import settings
+from .models import Country, Department, Municipality
+
+DEFAULT_GEO_GAZETTEER_TTL = 3600
+
+
+class Gazetteer:
+    """
+    Índices de solo lectura sobre las tres tablas geográficas.
+    """
+
+    def __init__(self, countries, departments, municipalities):
+        self._countries_by_id = {country.id: country for country in countries}
+        self._countries_by_code = {country.numeric_code: country for country in countries}
+        self._departments_by_id = {department.id: department for department in departments}
+        self._departments_by_code = {department.code: department for department in departments}
+        self._municipalities_by_id = {municipality.id: municipality for municipality in municipalities}
+        self._municipalities_by_code = {municipality.code: municipality for municipality in municipalities}
+
+        departments_by_country = {}
+        for department in departments:
+            departments_by_country.setdefault(department.country_numeric_code, []).append(department)
+        self._departments_by_country = {code: tuple(items) for code, items in departments_by_country.items()}
+
+        municipalities_by_department = {}
+        for municipality in municipalities:
+            municipalities_by_department.setdefault(municipality.department_code, []).append(municipality)
+        self._municipalities_by_department = {code: tuple(items) for code, items in municipalities_by_department.items()}
+
+    @classmethod
+    def load(cls):
+        return cls(
+            list(Country.objects.order_by('id')),
+            list(Department.objects.order_by('id')),
+            list(Municipality.objects.order_by('id')),
+        )
+
+    def country_by_id(self, pk):
+        return self._countries_by_id.get(pk)
+
+    def country_by_code(self, numeric_code):
+        return self._countries_by_code.get(numeric_code)
+
+    def department_by_id(self, pk):
+        return self._departments_by_id.get(pk)
+
+    def department_by_code(self, code):
+        return self._departments_by_code.get(code)
+
+    def departments_of(self, country_numeric_code):
+        return self._departments_by_country.get(country_numeric_code, ())
+
+    def municipality_by_id(self, pk):
+        return self._municipalities_by_id.get(pk)
+
+    def municipality_by_code(self, code):
+        return self._municipalities_by_code.get(code)
+
+    def municipalities_of(self, department_code):
+        return self._municipalities_by_department.get(department_code, ())
+
+    def by_code(self, model, code):
+        """
+        País, departamento o municipio con el código dado, o `None`.
+        """
+        lookups = {Country: self.country_by_code, Department: self.department_by_code, Municipality: self.municipality_by_code}
+        return lookups[model](code)
+
+
+class GazetteerRegistry:
+    """
+    Mantiene el `Gazetteer` del proceso y lo recarga de forma perezosa.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = None
+        self._generation = 0
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'GEO_GAZETTEER_TTL', DEFAULT_GEO_GAZETTEER_TTL)
+
+    def get(self):
+        entry = self._entry
+        if entry and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+
+        generation = self._generation
+        gazetteer = Gazetteer.load()
+        with self._lock:
+            # Si hubo una invalidación mientras se cargaba, no se guarda el resultado
+            if generation == self._generation:
+                self._entry = (gazetteer, time.monotonic())
+        return gazetteer
+
+    def invalidate(self):
+        with self._lock:
+            self._entry = None
+            self._generation += 1
+
+
+geo_gazetteer = GazetteerRegistry()
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.3 on 2026-10-17 02:39
+
+import app_geo.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_geo', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='country',
+            field=app_geo.models.CodeRelation(editable=False, from_field='country_numeric_code', help_text='País relacionado mediante `country_numeric_code`.', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='departments', to='app_geo.country', to_field='numeric_code'),
+        ),
+        migrations.AddField(
+            model_name='municipality',
+            name='department',
+            field=app_geo.models.CodeRelation(editable=False, from_field='department_code', help_text='Departamento relacionado mediante `department_code`.', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='municipalities', to='app_geo.department', to_field='code'),
+        ),
+        migrations.AlterField(
+            model_name='department',
+            name='country_numeric_code',
+            field=models.PositiveIntegerField(db_index=True, help_text="Código numérico del país al que pertenece este departamento, enlazado por 'numeric_code' de Country."),
+        ),
+        migrations.AlterField(
+            model_name='municipality',
+            name='department_code',
+            field=models.PositiveIntegerField(db_index=True, help_text="Código del departamento al que pertenece este municipio, enlazado con 'code' de Department."),
+        ),
+    ]
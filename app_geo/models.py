@@ -1,4 +1,41 @@
 from django.db import models
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
+
+
+class GazetteerDescriptor(ForwardManyToOneDescriptor):
+    """
+    Acceso a la relación por código. Si la fila no se cargó con `select_related`, se resuelve
+    en el nomenclátor en memoria en lugar de consultar la base de datos.
+    """
+
+    def get_object(self, instance):
+        from .gazetteer import geo_gazetteer
+        code = getattr(instance, self.field.from_fields[0])
+        return geo_gazetteer.get().by_code(self.field.related_model, code)
+
+
+class CodeRelation(models.ForeignObject):
+    """
+    Relación sin columna propia entre un código entero de la fila y el `code` único del padre.
+    Permite filtrar a través de ella (`department__name`), `select_related` y el acceso
+    inverso (`department.municipalities`), sin cambiar las columnas ni los datos existentes.
+    """
+    forward_related_accessor_class = GazetteerDescriptor
+
+    def __init__(self, to, from_field, to_field, **kwargs):
+        kwargs.setdefault('on_delete', models.DO_NOTHING)
+        kwargs.setdefault('null', True)
+        kwargs.setdefault('editable', False)
+        kwargs.pop('from_fields', None)
+        kwargs.pop('to_fields', None)
+        super().__init__(to, from_fields=[from_field], to_fields=[to_field], **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['from_field'] = kwargs.pop('from_fields')[0]
+        kwargs['to_field'] = kwargs.pop('to_fields')[0]
+        return name, path, args, kwargs
+
 
 class Country(models.Model):
     spanish_name = models.CharField(
@@ -37,19 +74,17 @@ class Department(models.Model):
         help_text="Nombre del departamento (Ej: 'Antioquia')."
     )
     country_numeric_code = models.PositiveIntegerField(
+        db_index=True,
         help_text="Código numérico del país al que pertenece este departamento, enlazado por 'numeric_code' de Country."
     )
+    country = CodeRelation(
+        Country, from_field='country_numeric_code', to_field='numeric_code', related_name='departments',
+        help_text="País relacionado mediante `country_numeric_code`."
+    )
 
     def __str__(self):
         return self.name
 
-    @property
-    def country(self):
-        """
-        Devuelve el objeto Country relacionado mediante `country_numeric_code`.
-        """
-        return Country.objects.get(numeric_code=self.country_numeric_code)
-
 class Municipality(models.Model):
     code = models.PositiveIntegerField(
         unique=True,
@@ -60,16 +95,14 @@ class Municipality(models.Model):
         help_text="Nombre del municipio (Ej: 'Medellín')."
     )
     department_code = models.PositiveIntegerField(
+        db_index=True,
         help_text="Código del departamento al que pertenece este municipio, enlazado con 'code' de Department."
     )
+    department = CodeRelation(
+        Department, from_field='department_code', to_field='code', related_name='municipalities',
+        help_text="Departamento relacionado mediante `department_code`."
+    )
 
     def __str__(self):
         return self.name
 
-    @property
-    def department(self):
-        """
-        Devuelve el objeto `Department` relacionado según `department_code`.
-        """
-        return Department.objects.get(code=self.department_code)
-
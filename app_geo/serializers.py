@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Country, Department, Municipality
+from .gazetteer import geo_gazetteer
 
 class CountrySerializer(serializers.ModelSerializer):
     """
@@ -21,6 +22,24 @@ class MunicipalitySerializer(serializers.ModelSerializer):
         fields = ['id', 'code', 'name', 'department_code']
 
 
+class DepartmentListSerializer(serializers.ListSerializer):
+    """
+    Serializa una lista de departamentos cargando sus municipios con una sola consulta.
+    """
+
+    def to_representation(self, data):
+        departments = list(data.all() if hasattr(data, 'all') else data)
+        municipalities_by_department = {}
+        for municipality in Municipality.objects.filter(
+            department_code__in={department.code for department in departments}
+        ).order_by('id').values('department_code', 'code', 'name'):
+            department_code = municipality.pop('department_code')
+            municipalities_by_department.setdefault(department_code, []).append(municipality)
+
+        self._context = {**self._context, 'municipalities_by_department': municipalities_by_department}
+        return super().to_representation(departments)
+
+
 class DepartmentSerializer(serializers.ModelSerializer):
     """
     Serializador para el modelo `Department`.
@@ -32,12 +51,20 @@ class DepartmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Department
         fields = ['id', 'code', 'name', 'municipalities']
+        list_serializer_class = DepartmentListSerializer
 
     def get_municipalities(self, obj):
         """
         Devuelve una lista de municipios relacionados con este departamento.
+        En listas se usan los municipios ya agrupados por `DepartmentListSerializer`.
         """
-        return list(Municipality.objects.filter(department_code=obj.code).values('code', 'name'))
+        municipalities_by_department = self.context.get('municipalities_by_department')
+        if municipalities_by_department is not None:
+            return municipalities_by_department.get(obj.code, [])
+        return [
+            {'code': municipality.code, 'name': municipality.name}
+            for municipality in geo_gazetteer.get().municipalities_of(obj.code)
+        ]
 
 
 class FileUploadSerializer(serializers.Serializer):
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, post_delete
+from .models import Country, Department, Municipality
+from .catalog import invalidate_geo_catalogs
+from .gazetteer import geo_gazetteer
+
+# Modelos geográficos que alimentan los catálogos compartidos
+GEO_MODELS = (Country, Department, Municipality)
+
+
+def invalidate_geo_data(sender, **kwargs):
+    """
+    Descarta los catálogos geográficos en caché y el nomenclátor en memoria cuando cambia
+    un país, departamento o municipio.
+    """
+    invalidate_geo_catalogs()
+    geo_gazetteer.invalidate()
+
+
+for model in GEO_MODELS:
+    post_save.connect(invalidate_geo_data, sender=model, dispatch_uid=f"geo_data_save_{model.__name__}")
+    post_delete.connect(invalidate_geo_data, sender=model, dispatch_uid=f"geo_data_delete_{model.__name__}")
@@ -1,3 +1,111 @@
+from django.core.cache import cache
 from django.test import TestCase
+from .models import Country, Department, Municipality
+from .gazetteer import geo_gazetteer
+from .serializers import DepartmentSerializer
 
-# Create your tests here.
+
+class GeoCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Country.objects.create(spanish_name="Colombia", english_name="Colombia", alpha_3="COL", alpha_2="CO", numeric_code=170)
+        Department.objects.create(code=5, name="ANTIOQUIA", country_numeric_code=170)
+
+    def test_catalog_uses_etag(self):
+        response = self.client.get("/geo/catalog/country/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{"id": Country.objects.get().id, "name": "Colombia"}])
+
+        cached = self.client.get("/geo/catalog/country/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_catalog_is_invalidated_on_change(self):
+        etag = self.client.get("/geo/catalog/department/")["ETag"]
+        Department.objects.create(code=8, name="ATLÁNTICO", country_numeric_code=170)
+
+        response = self.client.get("/geo/catalog/department/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_unknown_catalog(self):
+        self.assertEqual(self.client.get("/geo/catalog/planet/").status_code, 404)
+
+
+
+class GazetteerTests(TestCase):
+    def setUp(self):
+        geo_gazetteer.invalidate()
+        Country.objects.create(spanish_name="Colombia", english_name="Colombia", alpha_3="COL", alpha_2="CO", numeric_code=170)
+        self.department = Department.objects.create(code=5, name="ANTIOQUIA", country_numeric_code=170)
+        self.municipality = Municipality.objects.create(code=5001, name="MEDELLÍN", department_code=5)
+
+    def test_lookups_do_not_query(self):
+        geo_gazetteer.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.department.country.spanish_name, "Colombia")
+            self.assertEqual(self.municipality.department.name, "ANTIOQUIA")
+            self.assertEqual(
+                DepartmentSerializer(self.department).data["municipalities"],
+                [{"code": 5001, "name": "MEDELLÍN"}]
+            )
+
+    def test_reloads_on_change(self):
+        self.assertEqual(len(geo_gazetteer.get().municipalities_of(5)), 1)
+        Municipality.objects.create(code=5002, name="ABEJORRAL", department_code=5)
+        self.assertEqual(len(geo_gazetteer.get().municipalities_of(5)), 2)
+        self.assertIsNone(geo_gazetteer.get().department_by_code(99))
+
+
+class DepartmentTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for code, name in ((5, "ANTIOQUIA"), (8, "ATLÁNTICO"), (11, "BOGOTÁ, D.C.")):
+            Department.objects.create(code=code, name=name, country_numeric_code=170)
+            Municipality.objects.create(code=code * 1000 + 1, name=f"CAPITAL {code}", department_code=code)
+
+    def test_list_loads_municipalities_in_one_query(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/geo/departments/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+        self.assertEqual(response.json()[0]["municipalities"], [{"code": 5001, "name": "CAPITAL 5"}])
+
+        with self.assertNumQueries(0):
+            cached = self.client.get("/geo/departments/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_tree_is_invalidated_on_change(self):
+        self.client.get("/geo/departments/")
+        Municipality.objects.create(code=5002, name="ABEJORRAL", department_code=5)
+        self.assertEqual(len(self.client.get("/geo/departments/").json()[0]["municipalities"]), 2)
+
+
+class CodeRelationTests(TestCase):
+    def setUp(self):
+        geo_gazetteer.invalidate()
+        Country.objects.create(spanish_name="Colombia", english_name="Colombia", alpha_3="COL", alpha_2="CO", numeric_code=170)
+        for code, name in ((5, "ANTIOQUIA"), (8, "ATLÁNTICO")):
+            Department.objects.create(code=code, name=name, country_numeric_code=170)
+            Municipality.objects.create(code=code * 1000 + 1, name=f"CAPITAL {code}", department_code=code)
+
+    def test_relations_allow_joins_and_select_related(self):
+        self.assertEqual(
+            list(Municipality.objects.filter(department__name="ANTIOQUIA").values_list("code", flat=True)), [5001]
+        )
+        self.assertEqual(Municipality.objects.filter(department__country__alpha_2="CO").count(), 2)
+        self.assertEqual(list(Department.objects.get(code=8).municipalities.values_list("code", flat=True)), [8001])
+
+        with self.assertNumQueries(1):
+            names = [(municipality.name, municipality.department.country.spanish_name) for municipality in
+                     Municipality.objects.select_related("department__country").order_by("code")]
+        self.assertEqual(names, [("CAPITAL 5", "Colombia"), ("CAPITAL 8", "Colombia")])
+
+    def test_lookup_by_department_uses_index(self):
+        plan = Municipality.objects.filter(department_code=5).explain()
+        self.assertIn("INDEX app_geo_municipality_department_code", plan)
+
+    def test_viewset_filters_by_department_code(self):
+        response = self.client.get("/geo/municipalities/", {"department_code": 8})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([municipality["code"] for municipality in response.json()], [8001])
+        self.assertEqual(self.client.get("/geo/municipalities/", {"department_code": "x"}).status_code, 400)
@@ -16,6 +16,9 @@ urlpatterns = [
     
     path('municipalities/by-department/<int:department_id>/', views.get_municipalities, name='get_municipalities'),
 
+    # Catálogos geográficos compartidos por las preguntas geográficas (country, department o municipality)
+    path('catalog/<str:geography_type>/', views.get_geo_catalog_view, name='geo-catalog'),
+
 
     # Endpoint para cargar archivos JSON o CSV
     path('upload/', FileUploadView.as_view(), name='file-upload'),
@@ -10,7 +10,11 @@ from rest_framework import status
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 import json
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from .catalog import get_department_tree, get_geo_catalog
+from .gazetteer import geo_gazetteer
 
 
 def get_departments(request):
@@ -28,16 +32,17 @@ def get_municipalities(request, department_id):
     Devuelve una lista de municipios según el id del departamento.
     """
     try:
-        department = Department.objects.filter(id=department_id).first()
+        gazetteer = geo_gazetteer.get()
+        department = gazetteer.department_by_id(department_id)
         if not department:
             return Response(
                 {"error": "El departamento con el id proporcionado no existe."},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        municipalities = Municipality.objects.filter(department_code=department.code)
+        municipalities = gazetteer.municipalities_of(department.code)
 
-        if not municipalities.exists():
+        if not municipalities:
             return Response(
                 {"message": "No se encontraron municipios para este departamento."},
                 status=status.HTTP_404_NOT_FOUND
@@ -55,6 +60,34 @@ def get_municipalities(request, department_id):
         )
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_geo_catalog_view(request, geography_type):
+    """
+    Devuelve el catálogo compartido (id y nombre) de países, departamentos o municipios.
+    Las preguntas geográficas de las encuestas apuntan a este recurso en lugar de incluirlo.
+    """
+    try:
+        catalog = get_geo_catalog(geography_type.upper())
+    except ValueError:
+        return Response({"error": "Tipo de lugar inválido."}, status=status.HTTP_404_NOT_FOUND)
+
+    return catalog_response(request, catalog)
+
+
+def catalog_response(request, catalog):
+    """
+    Respuesta HTTP para un `GeoCatalog` ya serializado, con soporte de ETag (304).
+    """
+    if catalog.etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(catalog.content, content_type='application/json')
+    response['ETag'] = catalog.etag
+    response['Cache-Control'] = f'public, max-age={settings.GEO_CATALOG_CACHE_TIMEOUT}'
+    return response
+
+
 class CountryViewSet(ModelViewSet):
     """
     API para gestionar países.
@@ -79,6 +112,11 @@ class DepartmentViewSet(ModelViewSet):
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
 
+    @swagger_auto_schema(operation_summary="Listar los departamentos con sus municipios.")
+    def list(self, request, *args, **kwargs):
+        # El árbol completo se sirve desde la caché; se invalida en `app_geo.signals`
+        return catalog_response(request, get_department_tree())
+
 class MunicipalityViewSet(ModelViewSet):
     """
     API para gestionar municipios.
@@ -90,7 +128,10 @@ class MunicipalityViewSet(ModelViewSet):
     def get_queryset(self):
         department_code = self.request.query_params.get('department_code')
         if department_code:
-            return Municipality.objects.filter(department__code=department_code)
+            # Búsqueda por el índice de `department_code`, sin unir con `Department`
+            if not department_code.isdigit():
+                raise ValidationError({"department_code": "Debe ser un código numérico."})
+            return Municipality.objects.filter(department_code=department_code)
         return Municipality.objects.all()
 
     serializer_class = MunicipalitySerializer
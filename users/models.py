@@ -121,6 +121,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    class Meta:
+        indexes = [
+            # Cursor de la paginación del listado (`CreatedAtCursorPagination`)
+            models.Index(fields=['created_at', 'id'], name='user_created_id_idx'),
+        ]
+
     def __str__(self):
         """
         Representación en texto del modelo.
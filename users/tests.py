@@ -1,4 +1,6 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
 from users.models import CustomUser
 
 class CustomUserTests(TestCase):
@@ -11,3 +13,30 @@ class CustomUserTests(TestCase):
         user.delete()
         self.assertTrue(user.is_deleted)
         self.assertFalse(user.is_active)
+
+
+@override_settings(API_PAGE_SIZE=2, API_MAX_PAGE_SIZE=3)
+class UserListPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(identifier="admin", password="123456", name="admin")
+        self.client.force_authenticate(self.user)
+        for number in range(4):
+            CustomUser.objects.create_user(identifier=f"usuario{number}", password="123456", name=f"usuario{number}")
+        CustomUser.objects.create_user(identifier="eliminado", password="123456").delete()
+
+    def test_list_is_paginated_by_cursor(self):
+        names = []
+        url = reverse("user-list")
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data["results"]), 2)
+            names += [user["name"] for user in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(names, ["usuario3", "usuario2", "usuario1", "usuario0", "admin"])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(reverse("user-list"), {"page_size": 100})
+        self.assertEqual(len(response.data["results"]), 3)
@@ -7,6 +7,7 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from AppDANE_SEN.pagination import CreatedAtCursorPagination
 from .serializers import UserSerializer
 from ..models import CustomUser
 from django.db.models import Q
@@ -155,15 +156,17 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def list(self, request, *args, **kwargs):
         """
-        Lista todos los usuarios.
+        Lista los usuarios, paginados por cursor (`?cursor=`, `?page_size=`).
         """
         # Excluir eliminados
         queryset = self.queryset.filter(is_deleted=False)
-        serializer = self.serializer_class(queryset, many=True)
-        return DRFResponse(serializer.data)
+        page = self.paginate_queryset(queryset)
+        serializer = self.serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def retrieve(self, request, pk=None, *args, **kwargs):
         """